@@ -0,0 +1,126 @@
+"""
+In-process caches for request authentication.
+
+Every authenticated request used to run jwt.decode and then SELECT the user
+row. Tokens live for days, so this module keeps a bounded LRU of verified
+tokens (keyed by a hash of the token, honouring its exp claim) and a short
+TTL cache of user rows. Steady-state authentication then needs no database
+round trip.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+try:
+    from monitoring import auth_cache_requests_total
+except ImportError:
+    # Fallback if monitoring not available
+    auth_cache_requests_total = None
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
+
+class _LRUCache:
+    """Thread-safe LRU of values with a per-entry expiry timestamp."""
+
+    def __init__(self, name: str, maxsize: int, clock: Callable[[], float] = time.time):
+        self.name = name
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _record(self, result: str) -> None:
+        if auth_cache_requests_total:
+            auth_cache_requests_total.labels(cache=self.name, result=result).inc()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self._record("hit")
+                    return value
+                del self._entries[key]
+        self._record("miss")
+        return None
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Store a value until expires_at, evicting the least recently used entry."""
+        if self.maxsize <= 0 or expires_at <= self._clock():
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = _LRUCache("token", AUTH_TOKEN_CACHE_SIZE)
+user_cache = _LRUCache("user", AUTH_USER_CACHE_SIZE)
+
+
+def _token_key(token: str) -> str:
+    # Never keep raw bearer tokens in memory longer than the request needs them
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def get_cached_token(token: str) -> Optional[dict]:
+    """Return the verified claims for a token seen before, if still unexpired."""
+    return token_cache.get(_token_key(token))
+
+
+def cache_token(token: str, payload: dict) -> None:
+    """
+    Remember a verified token until its exp claim.
+
+    Tokens without an exp claim are not cached.
+    """
+    exp = payload.get("exp")
+    if exp is None:
+        return
+    token_cache.set(_token_key(token), payload, float(exp))
+
+
+def get_cached_user(user_id: str) -> Optional[dict]:
+    """Return the cached user row for an id, if fresh."""
+    user = user_cache.get(user_id)
+    return dict(user) if user is not None else None
+
+
+def cache_user(user: dict) -> None:
+    """Cache a user row for AUTH_USER_CACHE_TTL seconds."""
+    user_cache.set(user["id"], dict(user), time.time() + AUTH_USER_CACHE_TTL)
+
+
+def invalidate_user_cache(user_id: Optional[str] = None) -> None:
+    """
+    Drop cached user rows after a user mutation.
+
+    Args:
+        user_id: User to drop; clears every cached user when omitted
+    """
+    if user_id is None:
+        user_cache.clear()
+    else:
+        user_cache.delete(user_id)
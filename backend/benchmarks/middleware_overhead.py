@@ -0,0 +1,158 @@
+"""
+Per-request middleware overhead benchmark.
+
+Calls a trivial route (no database, a small JSON body) directly through the
+ASGI interface, without a server or sockets, in three stacks:
+
+    bare        the route only
+    previous    the two @app.middleware("http") layers the backend used to
+                run (monitoring, then security headers)
+    current     request_middleware.RequestMiddleware
+
+and prints the time per request and the overhead over the bare stack:
+
+    python benchmarks/middleware_overhead.py --requests 20000
+
+Request log lines are suppressed unless --log is given, so the numbers show
+the middleware itself rather than the JSON log formatter.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+
+from monitoring import log_error, log_request, record_http_request  # noqa: E402
+from request_context import track_request  # noqa: E402
+from request_middleware import RequestMiddleware  # noqa: E402
+from security_middleware import SECURITY_HEADERS  # noqa: E402
+
+PATH = "/bench/health"
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": PATH,
+    "raw_path": PATH.encode(),
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"localhost"), (b"user-agent", b"bench"), (b"accept", b"*/*")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("127.0.0.1", 8000),
+}
+
+
+def _route(app: FastAPI) -> FastAPI:
+    @app.get(PATH)
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def bare_app() -> FastAPI:
+    return _route(FastAPI())
+
+
+def previous_app() -> FastAPI:
+    """The middleware as it was: two BaseHTTPMiddleware layers."""
+    app = _route(FastAPI())
+
+    @app.middleware("http")
+    async def monitoring_middleware(request: Request, call_next):
+        start_time = time.perf_counter()
+        with track_request() as db_stats:
+            try:
+                response = await call_next(request)
+                duration = time.perf_counter() - start_time
+                record_http_request(request, response.status_code, duration, db_stats.queries)
+                log_request(request, response.status_code, duration, db_stats)
+                return response
+            except Exception as e:
+                duration = time.perf_counter() - start_time
+                record_http_request(request, 500, duration, db_stats.queries)
+                log_error(e, {"method": request.method, "path": request.url.path})
+                raise
+
+    @app.middleware("http")
+    async def add_security_headers(request: Request, call_next):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS.items():
+            response.headers[name] = value
+        if "server" in response.headers:
+            del response.headers["server"]
+        return response
+
+    return app
+
+
+def current_app() -> FastAPI:
+    app = _route(FastAPI())
+    app.add_middleware(RequestMiddleware)
+    return app
+
+
+async def _request(app: FastAPI) -> None:
+    sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    await app(dict(SCOPE), receive, send)
+
+
+async def run(app: FastAPI, requests: int, rounds: int) -> List[float]:
+    """Microseconds per request, one figure per round."""
+    for _ in range(200):  # warm up: route lookup, label cache
+        await _request(app)
+    per_round = max(1, requests // rounds)
+    results = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(per_round):
+            await _request(app)
+        results.append((time.perf_counter() - started) / per_round * 1e6)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--log", action="store_true", help="Keep the per-request log lines")
+    args = parser.parse_args()
+
+    if not args.log:
+        logging.getLogger("viruj_erp").setLevel(logging.WARNING)
+
+    baseline = None
+    for name, factory in (("bare", bare_app), ("previous", previous_app), ("current", current_app)):
+        micros = statistics.median(asyncio.run(run(factory(), args.requests, args.rounds)))
+        if baseline is None:
+            baseline = micros
+            print(f"{name:<10} {micros:8.1f} us/request")
+        else:
+            print(f"{name:<10} {micros:8.1f} us/request   overhead {micros - baseline:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
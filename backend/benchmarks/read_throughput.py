@@ -0,0 +1,122 @@
+"""
+Read-endpoint throughput benchmark.
+
+Drives the read-heavy list endpoints (review queues, GRN lists, sample
+lists) with many concurrent clients against a running server and reports
+throughput and latency percentiles. Run it against two builds (for example
+the sync and async handlers) to compare them:
+
+    RATE_LIMIT_ENABLED=false uvicorn main:app --port 8000 &
+    python benchmarks/read_throughput.py --url http://localhost:8000 --clients 200
+
+Tokens are minted locally, so SECRET_KEY must match the server's.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import httpx
+from jose import jwt
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+ALGORITHM = "HS256"
+
+# (path, user id of a role allowed to read it) from the seeded users
+DEFAULT_ENDPOINTS = [
+    ("/api/grn", "qa-man-1"),
+    ("/api/grn/pending-qa", "qa-man-1"),
+    ("/api/quality-samples/unassigned", "qc-man-1"),
+    ("/api/quality-samples/assigned", "qc-man-1"),
+    ("/api/quality-tests/review?stage=qc", "qc-man-1"),
+    ("/api/quality-tests/review?stage=qa-manager", "qa-man-1"),
+]
+
+
+def _token(user_id: str) -> str:
+    expire = datetime.utcnow() + timedelta(hours=1)
+    return jwt.encode({"sub": user_id, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+async def _client_loop(
+    client: httpx.AsyncClient,
+    requests: List[tuple],
+    offset: int,
+    deadline: float,
+    latencies: List[float],
+    errors: Dict[int, int],
+) -> None:
+    index = offset
+    while time.perf_counter() < deadline:
+        path, headers = requests[index % len(requests)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            status_code = 0
+        latencies.append(time.perf_counter() - started)
+        if status_code != 200:
+            errors[status_code] = errors.get(status_code, 0) + 1
+
+
+async def run(url: str, clients: int, duration: float, warmup: float) -> dict:
+    """Run the benchmark and return throughput and latency statistics."""
+    requests = [
+        (f"{path}{'&' if '?' in path else '?'}limit=50", {"Authorization": f"Bearer {_token(user)}"})
+        for path, user in DEFAULT_ENDPOINTS
+    ]
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(
+                *(_client_loop(client, requests, i, deadline, [], {}) for i in range(clients))
+            )
+
+        latencies: List[float] = []
+        errors: Dict[int, int] = {}
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(_client_loop(client, requests, i, deadline, latencies, errors) for i in range(clients))
+        )
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to measure")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds to warm up")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.clients, args.duration, args.warmup))
+    print(
+        f"clients={result['clients']} requests={result['requests']} "
+        f"throughput={result['throughput_rps']:.1f} req/s "
+        f"p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+        f"errors={result['errors']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Serialization microbenchmark for the GRN list and review-queue payloads.
+
+Compares the previous response path (positional dict building, Pydantic
+response_model validation, jsonable_encoder and stdlib json) with the
+precompiled row serializers and FastJSONResponse. Uses synthetic rows, so no
+database is needed:
+
+    python benchmarks/serialization_payloads.py --rows 1000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Callable, List
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from main import GRN_COLUMNS, GRN_ROW, REVIEW_QUEUE_ROW  # noqa: E402
+from schemas import GRNResponse  # noqa: E402
+from serialization import FastJSONResponse, column_names  # noqa: E402
+
+REVIEW_QUEUE_COLUMNS = (
+    "id", "test_name", "method", "status", "submitted_on", "result_data",
+    "manager_notes", "reviewed_by", "assigned_to", "sample_id", "entry_code",
+    "product_name", "batch_number", "sample_type", "sample_date", "due_date",
+    "priority", "analyst_name", "reviewer_name", "qa_officer_id",
+    "qa_officer_name", "qa_officer_notes", "qa_officer_recommendation",
+    "qa_manager_decision", "qa_manager_decision_notes", "material_disposition",
+    "updated_at",
+)
+
+
+def grn_rows(count: int) -> List[tuple]:
+    now = datetime.now(timezone.utc)
+    items = [
+        {"description": "Lactose monohydrate", "stock_code": "LM-01", "status": "GRN",
+         "quantity": 25.0, "price": 12.5, "vat_rate": 5.0, "nominal": None, "account": None}
+    ] * 3
+    return [
+        (
+            uuid4(), uuid4(), f"1025{i:03d}", f"GRN-25-{i:03d}", "PO-1001", "DC-77",
+            Decimal("75.000"), "Received in good condition", "Awaiting QA", "scm-wh-1",
+            "James Wilson", now, now, "Acme Chemicals", "12 Industrial Estate", "Pune",
+            "+91 20 5555 0100", "Goods Received", date(2025, 10, 1), date(2025, 10, 2),
+            "2025-10", "REF-9", None, items, Decimal("937.50"), Decimal("46.88"),
+            Decimal("984.38"),
+        )
+        for i in range(count)
+    ]
+
+
+def review_rows(count: int) -> List[tuple]:
+    now = datetime.now(timezone.utc)
+    return [
+        (
+            uuid4(), "Assay", "HPLC", "Submitted for Review", now,
+            {"value": 99.2, "unit": "%", "limit": "98.0-102.0"}, None, None, "qc-op-1",
+            uuid4(), f"1025{i:03d}", "Lactose monohydrate", f"B-{i}", "Raw Material",
+            date(2025, 10, 1), date(2025, 10, 8), "Normal", "Priya Sharma", None, None,
+            None, None, None, None, None, None, now,
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_grn(row: tuple) -> dict:
+    # Positional dict building as the handlers did before the serializers
+    keys = column_names(GRN_COLUMNS)
+    record = {key: row[index] for index, key in enumerate(keys)}
+    record["id"] = str(row[0])
+    record["gate_entry_id"] = str(row[1])
+    for key in ("quantity_received", "net_total", "vat_total", "gross_total"):
+        record[key] = float(record[key]) if record[key] is not None else None
+    return record
+
+
+def legacy_review(row: tuple) -> dict:
+    return {
+        "id": str(row[0]), "test_name": row[1], "method": row[2], "status": row[3],
+        "submitted_on": str(row[4]) if row[4] else None, "result_data": row[5],
+        "manager_notes": row[6], "reviewed_by": str(row[7]) if row[7] else None,
+        "assigned_to": str(row[8]) if row[8] else None,
+        "sample": {
+            "id": str(row[9]), "entry_code": row[10], "product_name": row[11],
+            "batch_number": row[12], "sample_type": row[13],
+            "sample_date": str(row[14]) if row[14] else None,
+            "due_date": str(row[15]) if row[15] else None, "priority": row[16],
+        },
+        "analyst": {"id": str(row[8]) if row[8] else None, "name": row[17]},
+        "reviewer_name": row[18],
+        "qa_officer": {"id": str(row[19]) if row[19] else None, "name": row[20]},
+        "qa_officer_notes": row[21], "qa_officer_recommendation": row[22],
+        "qa_manager_decision": row[23], "qa_manager_decision_notes": row[24],
+        "material_disposition": row[25],
+    }
+
+
+def bench(label: str, func: Callable[[], bytes], repeat: int) -> float:
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"  {label:<34} {best * 1000:8.2f} ms")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    grn = grn_rows(args.rows)
+    grn_adapter = TypeAdapter(List[GRNResponse])
+    grn_serialize = GRN_ROW.compile(column_names(GRN_COLUMNS))
+
+    def grn_before() -> bytes:
+        payload = grn_adapter.validate_python([legacy_grn(row) for row in grn])
+        return JSONResponse(jsonable_encoder(payload)).body
+
+    def grn_after() -> bytes:
+        return FastJSONResponse([grn_serialize(row) for row in grn]).body
+
+    review = review_rows(args.rows)
+    review_serialize = REVIEW_QUEUE_ROW.compile(REVIEW_QUEUE_COLUMNS)
+
+    def review_before() -> bytes:
+        return JSONResponse(jsonable_encoder([legacy_review(row) for row in review])).body
+
+    def review_after() -> bytes:
+        return FastJSONResponse([review_serialize(row) for row in review]).body
+
+    for name, before, after in (
+        ("GRN list", grn_before, grn_after),
+        ("Review queue", review_before, review_after),
+    ):
+        print(f"{name} ({args.rows} rows, {len(after()) // 1024} KiB)")
+        old = bench("response_model + jsonable_encoder", before, args.repeat)
+        new = bench("compiled serializer + orjson", after, args.repeat)
+        print(f"  speedup {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Workflow transaction latency benchmark.
+
+Runs the request-sampling transaction (guard the GRN, update the gate entry,
+create the sample and its default tests, notify QC managers, commit) the way
+it used to run, one statement and one round trip at a time, and the way the
+endpoint runs it now, in pipeline mode with prepared statements. Each
+iteration seeds a gate entry and GRN in the same transaction and rolls back,
+so the database is left unchanged.
+
+On a local socket round trips are almost free; pass --rtt-ms to route the
+connection through an in-process proxy that adds network latency:
+
+    python benchmarks/workflow_roundtrips.py --iterations 200 --rtt-ms 1
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg  # noqa: E402
+from psycopg.conninfo import conninfo_to_dict, make_conninfo  # noqa: E402
+
+from database_optimization import DATABASE_URL, pipelined  # noqa: E402
+from main import DEFAULT_SAMPLE_TESTS, GRN_COLUMNS  # noqa: E402
+from notifications import fan_out_to_role, notify_role  # noqa: E402
+
+UPDATE_GRN = f"""
+    UPDATE goods_receipt_notes
+    SET status = 'Sampling Requested',
+        remarks = COALESCE(remarks, '') || %s,
+        updated_at = NOW()
+    WHERE id = %s AND status = 'Awaiting QA'
+    RETURNING {GRN_COLUMNS};
+"""
+UPDATE_GATE = """
+    UPDATE gate_entries
+    SET status = 'Sampling Requested'
+    WHERE id = (SELECT gate_entry_id FROM goods_receipt_notes WHERE id = %s);
+"""
+INSERT_SAMPLE = """
+    INSERT INTO quality_samples (
+        id, grn_id, entry_code, product_name, batch_number, sample_type, sample_date,
+        due_date, status, requested_by, requested_by_name, priority, created_at, updated_at
+    )
+    SELECT %s, %s, entry_code,
+        (SELECT material_name FROM gate_entries WHERE id = gate_entry_id),
+        entry_code, 'FG', CURRENT_DATE, CURRENT_DATE + INTERVAL '3 days', 'Pending',
+        %s, %s, 'Medium', NOW(), NOW()
+    FROM goods_receipt_notes
+    WHERE id = %s;
+"""
+INSERT_TEST = """
+    INSERT INTO quality_tests (id, sample_id, test_name, method, status, created_at, updated_at)
+    SELECT %s, id, %s, %s, 'Not Started', NOW(), NOW()
+    FROM quality_samples
+    WHERE id = %s;
+"""
+
+
+class LatencyProxy:
+    """TCP proxy adding half the requested round-trip time in each direction."""
+
+    def __init__(self, target_host: str, target_port: int, rtt_ms: float):
+        self.target = (target_host, target_port)
+        self.delay = rtt_ms / 2000
+        self.port: Optional[int] = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, client_reader, client_writer) -> None:
+        server_reader, server_writer = await asyncio.open_connection(*self.target)
+        await asyncio.gather(
+            self._pipe(client_reader, server_writer),
+            self._pipe(server_reader, client_writer),
+        )
+
+    async def _pipe(self, reader, writer) -> None:
+        # Chunks keep their order and are each delayed, without serializing
+        # the delay of chunks sent back to back
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                due, data = await queue.get()
+                if not data:
+                    writer.close()
+                    return
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+                writer.write(data)
+                await writer.drain()
+
+        delivery = asyncio.ensure_future(deliver())
+        while True:
+            data = await reader.read(65536)
+            queue.put_nowait((time.monotonic() + self.delay, data))
+            if not data:
+                break
+        await delivery
+
+
+def seed(cur) -> str:
+    """Insert a gate entry and a GRN awaiting QA; returns the GRN id."""
+    gate_id, grn_id = str(uuid4()), str(uuid4())
+    code = uuid4().hex[:12]
+    cur.execute(
+        """
+        INSERT INTO gate_entries (id, entry_code, material_name, vehicle_number, status)
+        VALUES (%s, %s, 'Lactose monohydrate', 'BENCH-01', 'Awaiting QA');
+        """,
+        (gate_id, code),
+    )
+    cur.execute(
+        """
+        INSERT INTO goods_receipt_notes (id, gate_entry_id, entry_code, grn_code, po_number, status)
+        VALUES (%s, %s, %s, %s, 'PO-BENCH', 'Awaiting QA');
+        """,
+        (grn_id, gate_id, code, "GRN-" + code),
+    )
+    return grn_id
+
+
+def sequential(conn: psycopg.Connection, grn_id: str) -> None:
+    """The previous implementation: every statement waits for its result."""
+    sample_id = str(uuid4())
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, gate_entry_id, entry_code, status, remarks FROM goods_receipt_notes WHERE id = %s;",
+            (grn_id,),
+        )
+        cur.fetchone()
+        cur.execute(UPDATE_GRN, ("\nQA Notes: bench", grn_id))
+        cur.fetchone()
+        cur.execute(UPDATE_GATE, (grn_id,))
+        cur.execute(INSERT_SAMPLE, (sample_id, grn_id, "qa-man-1", "QA Manager", grn_id))
+        fan_out_to_role(cur, "QC Manager", "Sampling request raised", "Benchmark entry")
+        for test_name, method in DEFAULT_SAMPLE_TESTS:
+            cur.execute(INSERT_TEST, (str(uuid4()), test_name, method, sample_id))
+
+
+def pipelined_workflow(conn: psycopg.Connection, grn_id: str) -> None:
+    """The current implementation: a batch, the block exit and the COMMIT (here: ROLLBACK)."""
+    sample_id = str(uuid4())
+    with pipelined(conn) as pipeline:
+        grn_cur = conn.cursor()
+        grn_cur.execute(UPDATE_GRN, ("\nQA Notes: bench", grn_id), prepare=True)
+        cur = conn.cursor()
+        cur.execute(UPDATE_GATE, (grn_id,), prepare=True)
+        cur.execute(INSERT_SAMPLE, (sample_id, grn_id, "qa-man-1", "QA Manager", grn_id), prepare=True)
+        cur.executemany(
+            INSERT_TEST,
+            [(str(uuid4()), test_name, method, sample_id) for test_name, method in DEFAULT_SAMPLE_TESTS],
+        )
+        grn_cur.fetchone()
+        notify_role(None, "QC Manager", "Sampling request raised", "Benchmark entry", pipeline=pipeline)
+
+
+def run(conn: psycopg.Connection, workflow: Callable, iterations: int) -> List[float]:
+    latencies = []
+    for _ in range(iterations):
+        with conn.cursor() as cur:
+            grn_id = seed(cur)
+        started = time.perf_counter()
+        workflow(conn, grn_id)
+        conn.rollback()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{name:<12} median {statistics.median(ordered):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default=DATABASE_URL)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated network round trip")
+    args = parser.parse_args()
+
+    url = args.url
+    if args.rtt_ms > 0:
+        params = conninfo_to_dict(url)
+        proxy = LatencyProxy(params.get("host", "localhost"), int(params.get("port", 5432)), args.rtt_ms)
+        url = make_conninfo(url, host="127.0.0.1", port=proxy.port)
+
+    with psycopg.connect(url) as conn:
+        for name, workflow in (("sequential", sequential), ("pipelined", pipelined_workflow)):
+            run(conn, workflow, 5)  # warm up, prepare statements
+            report(name, run(conn, workflow, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
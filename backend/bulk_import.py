@@ -0,0 +1,522 @@
+"""
+Bulk import of historical gate entries and GRNs.
+
+Onboarding a plant means loading its gate entry and GRN history. Creating
+those one POST at a time costs a code allocation, an INSERT and a
+notification fan-out per document, behind a 20/minute rate limit.
+run_import instead works through the input in batches of IMPORT_BATCH_SIZE
+rows:
+
+- rows are validated with the create schemas plus the historical fields
+  (SecurityLogImport, GRNImport); invalid rows are rejected and reported
+  without stopping the import,
+- document codes are allocated one block per period, in created_at order,
+- the rows are loaded with COPY,
+- no notifications are sent: the documents are history, not work to do.
+
+Each batch commits together with its job's checkpoint (import_jobs), the
+number of input rows consumed so far. An import that fails part-way is
+resumed by running it again with the same job id and the same input; the
+rows before the checkpoint are skipped.
+
+Usage (from the backend directory):
+    python bulk_import.py gate-entries gate_entries.csv --user admin@viruj.com
+    python bulk_import.py grns grns.ndjson --user admin@viruj.com --job <job id>
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, status
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from pydantic import BaseModel, ValidationError
+
+from cache import invalidate_tags
+from database_optimization import get_db_connection
+from document_numbers import (
+    GATE_ENTRY_SERIES,
+    GRN_SERIES,
+    allocate_numbers,
+    entry_code_period,
+    format_entry_code,
+    format_grn_code,
+    grn_code_period,
+)
+from schemas import GRNImport, SecurityLogImport
+
+try:
+    from monitoring import import_rows_total, log_info
+except ImportError:
+    # Fallback if monitoring not available
+    import_rows_total = None
+    log_info = None
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Rejected rows listed on a job; rows_rejected counts all of them
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+JOB_COLUMNS = """
+    id, kind, status, checkpoint, rows_total, rows_loaded, rows_rejected,
+    errors, error, created_at, updated_at
+"""
+
+GATE_ENTRY_COPY = """
+    COPY gate_entries (
+        id, entry_code, material_name, material_category, po_number,
+        vehicle_name, vehicle_number, driver_name, driver_contact,
+        supplier_name, document_number, quantity, uom, remarks, seal_intact,
+        status, plant_id, created_by, created_by_name, created_at
+    ) FROM STDIN
+"""
+
+GRN_COPY = """
+    COPY goods_receipt_notes (
+        id, gate_entry_id, entry_code, grn_code, po_number, delivery_challan,
+        quantity_received, remarks, status, created_by, created_by_name,
+        created_at, updated_at, supplier_name, supplier_address,
+        supplier_location, supplier_contact, document_status, document_date,
+        delivery_date, period, reference, comment, items, net_total,
+        vat_total, gross_total
+    ) FROM STDIN
+"""
+
+Batch = List[Tuple[int, Dict[str, Any]]]
+RowError = Dict[str, Any]
+
+
+def _reject(errors: List[RowError], index: int, message: str) -> None:
+    errors.append({"row": index + 1, "error": message})
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def _allocate_codes(
+    cur,
+    series: str,
+    rows: Sequence[Union[SecurityLogImport, GRNImport]],
+    period_of: Callable[[datetime], str],
+    format_code: Callable[[str, int], str],
+) -> List[str]:
+    """
+    Allocate one block of codes per period, numbered in created_at order.
+
+    Periods are locked in sorted order, so concurrent imports cannot
+    deadlock on the counter rows.
+    """
+    positions_by_period: Dict[str, List[int]] = defaultdict(list)
+    for position, row in enumerate(rows):
+        positions_by_period[period_of(row.created_at)].append(position)
+
+    codes: List[str] = [""] * len(rows)
+    for period in sorted(positions_by_period):
+        positions = sorted(positions_by_period[period], key=lambda position: rows[position].created_at)
+        block = allocate_numbers(cur, series, period, len(positions))
+        for position, seq in zip(positions, block):
+            codes[position] = format_code(period, seq)
+    return codes
+
+
+def _existing_ids(cur, table: str, ids: List[UUID]) -> set:
+    if not ids:
+        return set()
+    cur.execute(f"SELECT id FROM {table} WHERE id = ANY(%s);", (ids,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def _load_gate_entries(cur, rows: List[Tuple[int, SecurityLogImport]], user: dict, errors: List[RowError]) -> int:
+    existing = _existing_ids(cur, "gate_entries", [row.id for _, row in rows if row.id is not None])
+    accepted: List[SecurityLogImport] = []
+    seen = set()
+    for index, row in rows:
+        if row.id is not None:
+            if row.id in existing or row.id in seen:
+                _reject(errors, index, "id: gate entry already exists")
+                continue
+            seen.add(row.id)
+        accepted.append(row)
+    if not accepted:
+        return 0
+
+    codes = _allocate_codes(cur, GATE_ENTRY_SERIES, accepted, entry_code_period, format_entry_code)
+    with cur.copy(GATE_ENTRY_COPY) as copy:
+        for row, entry_code in zip(accepted, codes):
+            copy.write_row(
+                (
+                    row.id or uuid4(),
+                    entry_code,
+                    row.material_name.strip(),
+                    row.material_category,
+                    row.po_number,
+                    row.vehicle_name,
+                    row.vehicle_number,
+                    row.driver_name,
+                    row.driver_contact,
+                    row.supplier_name,
+                    row.document_number,
+                    row.quantity,
+                    row.uom,
+                    row.remarks,
+                    row.seal_intact,
+                    row.status,
+                    row.plant_id or user.get("plant_id"),
+                    user["id"],
+                    user["name"],
+                    row.created_at,
+                )
+            )
+    return len(accepted)
+
+
+def _load_grns(cur, rows: List[Tuple[int, GRNImport]], user: dict, errors: List[RowError]) -> int:
+    existing = _existing_ids(cur, "goods_receipt_notes", [row.id for _, row in rows if row.id is not None])
+    # The referenced gate entries, locked so a concurrent POST /api/grn
+    # cannot receive them between this check and the status update below
+    cur.execute(
+        """
+        SELECT g.id, g.entry_code, g.status,
+               EXISTS (SELECT 1 FROM goods_receipt_notes n WHERE n.gate_entry_id = g.id)
+        FROM gate_entries g
+        WHERE g.id = ANY(%s)
+        FOR UPDATE OF g;
+        """,
+        (list({row.gate_entry_id for _, row in rows}),),
+    )
+    gate_entries = {row[0]: row[1:] for row in cur.fetchall()}  # id -> (entry_code, status, has GRN)
+
+    accepted: List[Tuple[GRNImport, str]] = []
+    seen_ids = set()
+    received = set()
+    for index, row in rows:
+        gate_entry = gate_entries.get(row.gate_entry_id)
+        if gate_entry is None:
+            _reject(errors, index, "gate_entry_id: gate entry not found")
+        elif gate_entry[2] or row.gate_entry_id in received:
+            _reject(errors, index, "gate_entry_id: GRN already created for this entry")
+        elif gate_entry[1] != "Awaiting GRN":
+            _reject(errors, index, f"gate_entry_id: gate entry is {gate_entry[1]}, not Awaiting GRN")
+        elif row.id is not None and (row.id in existing or row.id in seen_ids):
+            _reject(errors, index, "id: GRN already exists")
+        else:
+            received.add(row.gate_entry_id)
+            if row.id is not None:
+                seen_ids.add(row.id)
+            accepted.append((row, gate_entry[0]))
+    if not accepted:
+        return 0
+
+    codes = _allocate_codes(cur, GRN_SERIES, [row for row, _ in accepted], grn_code_period, format_grn_code)
+    with cur.copy(GRN_COPY) as copy:
+        for (row, entry_code), grn_code in zip(accepted, codes):
+            items, net_total, vat_total, gross_total = row.priced_items()
+            document_date = row.document_date or row.created_at.date()
+            copy.write_row(
+                (
+                    row.id or uuid4(),
+                    row.gate_entry_id,
+                    entry_code,
+                    grn_code,
+                    row.po_number.strip(),
+                    row.delivery_challan.strip() if row.delivery_challan else None,
+                    row.quantity_received,
+                    row.remarks,
+                    row.status,
+                    user["id"],
+                    user["name"],
+                    row.created_at,
+                    row.created_at,
+                    row.supplier_name,
+                    row.supplier_address,
+                    row.supplier_location,
+                    row.supplier_contact,
+                    row.document_status or "Goods Received",
+                    document_date,
+                    row.delivery_date or document_date,
+                    row.period,
+                    row.reference,
+                    row.comment,
+                    json.dumps(items),
+                    net_total,
+                    vat_total,
+                    gross_total,
+                )
+            )
+    # As when a GRN is created: the gate entry moves on to QA, in the same
+    # transaction, so POST /api/grn refuses a second GRN for it
+    cur.execute(
+        "UPDATE gate_entries SET status = 'Awaiting QA' WHERE id = ANY(%s);",
+        ([row.gate_entry_id for row, _ in accepted],),
+    )
+    return len(accepted)
+
+
+# kind -> (row schema, batch loader, cache tags to invalidate)
+IMPORT_KINDS = {
+    "gate_entries": (SecurityLogImport, _load_gate_entries, ()),
+    "grns": (GRNImport, _load_grns, ("grn",)),
+}
+
+
+def _batches(rows: Iterable[Dict[str, Any]], start: int, size: int) -> Iterator[Batch]:
+    batch: Batch = []
+    for index, row in enumerate(rows):
+        if index < start:
+            continue
+        batch.append((index, row))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _start_job(conn, job_id: UUID, kind: str, user: dict, rows_total: Optional[int]) -> dict:
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(
+            """
+            INSERT INTO import_jobs (id, kind, rows_total, created_by, created_by_name)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (id) DO NOTHING;
+            """,
+            (job_id, kind, rows_total, user["id"], user["name"]),
+        )
+        cur.execute(
+            f"""
+            UPDATE import_jobs
+            SET status = 'running', error = NULL, updated_at = NOW()
+            WHERE id = %s AND kind = %s AND status <> 'completed'
+            RETURNING {JOB_COLUMNS};
+            """,
+            (job_id, kind),
+        )
+        job = cur.fetchone()
+        if job is None:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM import_jobs WHERE id = %s;", (job_id,))
+            job = cur.fetchone()
+    if job["kind"] != kind:
+        # Another kind's job id: left as it was
+        conn.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Import job {job_id} is a {job['kind']} import",
+        )
+    conn.commit()
+    return job
+
+
+def _load_batch(conn, job: dict, batch: Batch, schema: type, load: Callable, user: dict) -> dict:
+    validated: List[Tuple[int, BaseModel]] = []
+    errors: List[RowError] = []
+    for index, raw in batch:
+        try:
+            validated.append((index, schema.model_validate(raw)))
+        except ValidationError as e:
+            _reject(errors, index, _describe(e))
+
+    with conn.cursor() as cur:
+        loaded = load(cur, validated, user, errors) if validated else 0
+    errors.sort(key=lambda error: error["row"])
+    room = max(0, IMPORT_MAX_REPORTED_ERRORS - len(job["errors"]))
+
+    with conn.cursor(row_factory=dict_row) as cur:
+        # The checkpoint moves in the batch's transaction; a concurrent run
+        # of the same job finds it already moved and stops
+        cur.execute(
+            f"""
+            UPDATE import_jobs
+            SET checkpoint = %s,
+                rows_loaded = rows_loaded + %s,
+                rows_rejected = rows_rejected + %s,
+                errors = errors || %s,
+                updated_at = NOW()
+            WHERE id = %s AND checkpoint = %s AND status = 'running'
+            RETURNING {JOB_COLUMNS};
+            """,
+            (batch[-1][0] + 1, loaded, len(batch) - loaded, Jsonb(errors[:room]), job["id"], job["checkpoint"]),
+        )
+        updated = cur.fetchone()
+    if updated is None:
+        conn.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Import job {job['id']} is being run elsewhere",
+        )
+    conn.commit()
+
+    if import_rows_total:
+        import_rows_total.labels(kind=job["kind"], outcome="loaded").inc(loaded)
+        import_rows_total.labels(kind=job["kind"], outcome="rejected").inc(len(batch) - loaded)
+    return updated
+
+
+def _finish_job(conn, job_id: UUID, error: Optional[Exception] = None) -> Optional[dict]:
+    with conn.cursor(row_factory=dict_row) as cur:
+        if error is None:
+            cur.execute(
+                f"""
+                UPDATE import_jobs
+                SET status = 'completed', rows_total = checkpoint, updated_at = NOW()
+                WHERE id = %s
+                RETURNING {JOB_COLUMNS};
+                """,
+                (job_id,),
+            )
+        else:
+            cur.execute(
+                f"""
+                UPDATE import_jobs
+                SET status = 'failed', error = %s, updated_at = NOW()
+                WHERE id = %s AND status = 'running'
+                RETURNING {JOB_COLUMNS};
+                """,
+                (str(error)[:1000], job_id),
+            )
+        job = cur.fetchone()
+    conn.commit()
+    return job
+
+
+def run_import(
+    kind: str,
+    rows: Iterable[Dict[str, Any]],
+    user: dict,
+    job_id: Optional[UUID] = None,
+    rows_total: Optional[int] = None,
+    on_batch: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Validate and load historical gate entries or GRNs.
+
+    Args:
+        kind: "gate_entries" or "grns"
+        rows: Input rows (field name -> value), in the same order on every run
+        user: Importing user ("id", "name", optionally "plant_id"), recorded
+            as the creator
+        job_id: Job to resume, or the id for a new job
+        rows_total: Number of input rows, when known up front
+        on_batch: Called with the job after each committed batch
+
+    Returns:
+        The job (import_jobs row); a completed job is returned as is
+
+    Raises:
+        HTTPException: 409 when the job belongs to another kind of import or
+            is being run elsewhere
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"Unknown import kind {kind!r}")
+    schema, load, cache_tags = IMPORT_KINDS[kind]
+    job_id = job_id or uuid4()
+
+    with get_db_connection() as conn:
+        job = _start_job(conn, job_id, kind, user, rows_total)
+        if job["status"] == "completed":
+            return job
+        try:
+            for batch in _batches(rows, job["checkpoint"], IMPORT_BATCH_SIZE):
+                job = _load_batch(conn, job, batch, schema, load, user)
+                if on_batch:
+                    on_batch(job)
+        except HTTPException:
+            raise
+        except Exception as e:
+            conn.rollback()
+            try:
+                _finish_job(conn, job_id, e)
+            except Exception:
+                pass  # The checkpoint is committed; the job can be resumed regardless
+            raise
+        job = _finish_job(conn, job_id)
+
+    if cache_tags:
+        invalidate_tags(*cache_tags)
+    if log_info:
+        log_info(
+            "Import completed",
+            kind=kind,
+            job_id=str(job_id),
+            rows_loaded=job["rows_loaded"],
+            rows_rejected=job["rows_rejected"],
+        )
+    return job
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read import rows from a CSV file (with a header row) or an NDJSON file.
+
+    Empty CSV cells become None; a CSV items column holds the line items as
+    a JSON array.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                row = {name: (value if value != "" else None) for name, value in record.items()}
+                if isinstance(row.get("items"), str):
+                    try:
+                        row["items"] = json.loads(row["items"])
+                    except ValueError:
+                        pass  # Rejected by validation, with the row number
+                yield row
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import historical gate entries or GRNs.")
+    parser.add_argument("kind", choices=["gate-entries", "grns"])
+    parser.add_argument("path", help="CSV file with a header row, or NDJSON file")
+    parser.add_argument("--user", required=True, help="Email of the user recorded as the creator")
+    parser.add_argument("--job", type=UUID, help="Resume this import job")
+    args = parser.parse_args(argv)
+
+    with get_db_connection(read_only=True) as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute("SELECT id, name, plant_id FROM users WHERE email = %s;", (args.user,))
+            user = cur.fetchone()
+    if user is None:
+        print(f"No user with email {args.user}", file=sys.stderr)
+        return 2
+
+    job_id = args.job or uuid4()
+    print(f"Import job {job_id}", file=sys.stderr)
+
+    def progress(job: dict) -> None:
+        print(
+            f"  {job['checkpoint']} rows: {job['rows_loaded']} loaded, {job['rows_rejected']} rejected",
+            file=sys.stderr,
+        )
+
+    try:
+        job = run_import(args.kind.replace("-", "_"), read_rows(args.path), user, job_id, on_batch=progress)
+    except HTTPException as e:
+        print(e.detail, file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"Import failed: {e}\nResume with --job {job_id}", file=sys.stderr)
+        return 1
+
+    for error in job["errors"]:
+        print(f"  row {error['row']}: {error['error']}", file=sys.stderr)
+    if job["rows_rejected"] > len(job["errors"]):
+        print(f"  ({job['rows_rejected'] - len(job['errors'])} more rejected rows)", file=sys.stderr)
+    print(f"{job['rows_loaded']} loaded, {job['rows_rejected']} rejected", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
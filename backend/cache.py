@@ -3,24 +3,114 @@ Caching utilities using Redis.
 
 This module provides caching functionality to improve API performance
 by reducing database load and response times.
+
+Cached entries register under tags ("users", "user:{id}", "grn"); mutations
+call invalidate_tags() to drop exactly the entries they affect. Each tag has
+a generation counter, so a value computed before an invalidation is never
+written back afterwards.
+
+The client is synchronous. Async callers run its commands in the threadpool
+(run_in_threadpool), so a slow or unreachable Redis never blocks the event
+loop.
 """
 
+import asyncio
+import inspect
 import json
 import hashlib
-from typing import Optional, Any, Callable
+import threading
+import time
+from typing import Optional, Any, Callable, Dict, List, Sequence, Tuple, Union
 from functools import wraps
+from uuid import uuid4
+
 import redis
 import os
+from starlette.background import BackgroundTasks
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+
+from request_context import count_cache
+
+try:
+    from monitoring import cache_hits_total, cache_misses_total
+except ImportError:
+    # Fallback if monitoring not available
+    cache_hits_total = None
+    cache_misses_total = None
 
 # Redis connection
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Seconds between reconnect attempts while Redis is unreachable
+REDIS_RETRY_INTERVAL = float(os.getenv("REDIS_RETRY_INTERVAL", "10"))
 redis_client: Optional[redis.Redis] = None
+_redis_retry_at = 0.0
+
+# Framework objects never identify a cached result (Request's repr differs per call)
+_FRAMEWORK_TYPES = (HTTPConnection, Response, BackgroundTasks)
+# Parameter injected by Depends(get_current_user)
+USER_PARAM = "current_user"
+
+# Release the stampede lock only if we still own it
+_UNLOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# How often waiters poll Redis for the value another worker is computing
+LOCK_POLL_INTERVAL = 0.05
+
+TAG_PREFIX = "tag:"
+TAG_GENERATION_PREFIX = "tag-gen:"
+
+# Store a value and register it under its tags, unless one of the tags was
+# invalidated since the caller read the generations.
+# KEYS: key, tag sets..., generation keys...; ARGV: payload, ttl, generations...
+_STORE_SCRIPT = """
+local n = (#KEYS - 1) / 2
+for i = 1, n do
+    if (redis.call('get', KEYS[1 + n + i]) or '0') ~= ARGV[2 + i] then
+        return 0
+    end
+end
+local ttl = tonumber(ARGV[2])
+redis.call('setex', KEYS[1], ttl, ARGV[1])
+for i = 1, n do
+    redis.call('sadd', KEYS[1 + i], KEYS[1])
+    if redis.call('ttl', KEYS[1 + i]) < ttl then
+        redis.call('expire', KEYS[1 + i], ttl)
+    end
+end
+return 1
+"""
+
+# Drop every entry registered under a tag and bump its generation.
+# KEYS: tag set, generation key
+_INVALIDATE_SCRIPT = """
+redis.call('incr', KEYS[2])
+local members = redis.call('smembers', KEYS[1])
+for i = 1, #members, 500 do
+    redis.call('unlink', unpack(members, i, math.min(i + 499, #members)))
+end
+redis.call('del', KEYS[1])
+return #members
+"""
 
 
 def get_redis_client() -> redis.Redis:
-    """Get or create Redis client."""
-    global redis_client
+    """
+    Get or create Redis client.
+
+    After a failed connect, returns None without trying again for
+    REDIS_RETRY_INTERVAL seconds, so callers do not each wait out the
+    connect timeout while Redis is down.
+    """
+    global redis_client, _redis_retry_at
     if redis_client is None:
+        if time.monotonic() < _redis_retry_at:
+            return None
         try:
             redis_client = redis.from_url(
                 REDIS_URL,
@@ -33,112 +123,405 @@ def get_redis_client() -> redis.Redis:
             redis_client.ping()
         except (redis.ConnectionError, redis.TimeoutError) as e:
             print(f"Warning: Redis connection failed: {e}. Caching disabled.")
+            redis_client = None
+            _redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
             return None
     return redis_client
 
 
 def cache_key(prefix: str, *args, **kwargs) -> str:
     """Generate cache key from prefix and arguments."""
-    key_data = f"{prefix}:{str(args)}:{str(sorted(kwargs.items()))}"
+    key_data = json.dumps([prefix, args, kwargs], sort_keys=True, default=str)
     key_hash = hashlib.md5(key_data.encode()).hexdigest()
     return f"{prefix}:{key_hash}"
 
 
-def cached(ttl: int = 300, key_prefix: str = "cache"):
+def _key_builder(
+    func: Callable,
+    key_prefix: str,
+    key_params: Optional[Sequence[str]],
+    vary_on_user: Union[bool, str],
+    tags: Sequence[str] = (),
+) -> Callable[..., Tuple[str, List[str]]]:
+    """
+    Build the cache-key and tag function for a decorated endpoint.
+
+    Arguments are bound to the endpoint's signature, so positional and
+    keyword calls produce the same key. Framework objects (Request, Response,
+    BackgroundTasks) are always ignored; the authenticated user contributes
+    only the field named by vary_on_user (its id by default).
+
+    Args:
+        func: Decorated function
+        key_prefix: Prefix for cache keys
+        key_params: Parameters to key on (default: all non-framework parameters)
+        vary_on_user: current_user field to key on (True for "id", False for none)
+        tags: Tag templates formatted with the bound arguments ("user:{user_id}")
+    """
+    signature = inspect.signature(func)
+    user_field = "id" if vary_on_user is True else vary_on_user
+    unknown = set(key_params or ()) - set(signature.parameters)
+    if unknown:
+        raise ValueError(f"{func.__name__}: unknown cache key parameters {sorted(unknown)}")
+
+    def build(*args, **kwargs) -> Tuple[str, List[str]]:
+        bound = signature.bind_partial(*args, **kwargs)
+        bound.apply_defaults()
+        parts: Dict[str, Any] = {}
+        for name, value in bound.arguments.items():
+            if name == USER_PARAM:
+                if user_field and isinstance(value, dict):
+                    parts[name] = value.get(user_field)
+                continue
+            if key_params is not None and name not in key_params:
+                continue
+            if isinstance(value, _FRAMEWORK_TYPES):
+                continue
+            parts[name] = value
+        key = cache_key(key_prefix, func.__name__, **parts)
+        return key, [tag.format(**bound.arguments) for tag in tags]
+
+    return build
+
+
+def _read(client: redis.Redis, key: str) -> Optional[str]:
+    try:
+        return client.get(key)
+    except Exception as e:
+        print(f"Cache read error: {e}")
+        return None
+
+
+def _connect_and_read(key: str) -> Tuple[Optional[redis.Redis], Optional[str]]:
+    """get_redis_client and _read in one call, for a single threadpool hop."""
+    client = get_redis_client()
+    if client is None:
+        return None, None
+    return client, _read(client, key)
+
+
+def _encode(result: Any) -> Optional[str]:
+    """Serialize a result; Responses are stored with their body and headers."""
+    if isinstance(result, Response):
+        if result.status_code != 200 or not isinstance(result.body, bytes):
+            return None
+        return json.dumps({
+            "__response__": {
+                "body": result.body.decode("utf-8"),
+                "headers": [
+                    [name, value]
+                    for name, value in result.headers.items()
+                    if name != "content-length"
+                ],
+            }
+        })
+    return json.dumps(result, default=str)
+
+
+def _decode(payload: str) -> Any:
+    value = json.loads(payload)
+    if isinstance(value, dict) and "__response__" in value:
+        stored = value["__response__"]
+        return Response(content=stored["body"].encode("utf-8"), headers=dict(stored["headers"]))
+    return value
+
+
+def _tag_keys(tags: Sequence[str]) -> Tuple[List[str], List[str]]:
+    return (
+        [f"{TAG_PREFIX}{tag}" for tag in tags],
+        [f"{TAG_GENERATION_PREFIX}{tag}" for tag in tags],
+    )
+
+
+def _generations(client: redis.Redis, tags: Sequence[str]) -> List[str]:
+    """Read tag generations before computing a value (see _STORE_SCRIPT)."""
+    if not tags:
+        return []
+    try:
+        return [value or "0" for value in client.mget(_tag_keys(tags)[1])]
+    except Exception as e:
+        print(f"Cache read error: {e}")
+        return []
+
+
+def _write(
+    client: redis.Redis,
+    key: str,
+    ttl: int,
+    result: Any,
+    tags: Sequence[str] = (),
+    generations: Sequence[str] = (),
+) -> Optional[str]:
+    try:
+        payload = _encode(result)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        print(f"Cache write error: {e}")
+        return None
+    if payload is None:
+        return None
+    try:
+        if tags:
+            if len(generations) != len(tags):
+                return payload
+            tag_sets, generation_keys = _tag_keys(tags)
+            client.eval(
+                _STORE_SCRIPT,
+                1 + 2 * len(tags),
+                key,
+                *tag_sets,
+                *generation_keys,
+                payload,
+                ttl,
+                *generations,
+            )
+        else:
+            client.setex(key, ttl, payload)
+    except Exception as e:
+        print(f"Cache write error: {e}")
+    return payload
+
+
+def _acquire_lock(client: redis.Redis, key: str, token: str, timeout: float) -> bool:
+    """Take the cross-worker lock for computing key (True if Redis is unusable)."""
+    try:
+        return bool(client.set(f"lock:{key}", token, nx=True, px=int(timeout * 1000)))
+    except Exception as e:
+        print(f"Cache lock error: {e}")
+        return True
+
+
+def _release_lock(client: redis.Redis, key: str, token: str) -> None:
+    try:
+        client.eval(_UNLOCK_SCRIPT, 1, f"lock:{key}", token)
+    except Exception as e:
+        print(f"Cache unlock error: {e}")
+
+
+def _record(prefix: str, hit: bool) -> None:
+    count_cache(hit)
+    counter = cache_hits_total if hit else cache_misses_total
+    if counter:
+        counter.labels(cache_key=prefix).inc()
+
+
+class _Flight:
+    """One in-process computation of a cache key that others can wait on."""
+
+    __slots__ = ("done", "payload")
+
+    def __init__(self, done):
+        self.done = done
+        self.payload: Optional[str] = None
+
+
+def cached(
+    ttl: int = 300,
+    key_prefix: str = "cache",
+    key_params: Optional[Sequence[str]] = None,
+    vary_on_user: Union[bool, str] = True,
+    tags: Sequence[str] = (),
+    lock_timeout: float = 10.0,
+):
     """
     Decorator to cache function results (works with both sync and async functions).
-    
+
+    A cold key is computed once: concurrent callers in the same process wait
+    for the first one, and other workers wait on a short Redis lock (up to
+    lock_timeout) and then read the stored value. Hits and misses are counted
+    per key_prefix in cache_hits_total / cache_misses_total.
+
+    Handlers may return a Response (e.g. FastJSONResponse list pages); 200
+    responses are stored with their body and headers and replayed verbatim.
+
     Args:
         ttl: Time to live in seconds (default: 5 minutes)
         key_prefix: Prefix for cache keys
+        key_params: Parameters that identify the result (default: all
+            parameters except framework objects)
+        vary_on_user: Cache separately per authenticated user (current_user).
+            Pass a field name ("role") to share entries between users with
+            the same value, or False only for results that are the same for
+            every user; permission checks in the handler do not run on a hit
+        tags: Tags the entry registers under, formatted with the bound
+            arguments ("user:{user_id}"); see invalidate_tags. Read such
+            results from the primary (get_db_connection(write=False)): a
+            lagging replica could store the value from before an
+            invalidation for the whole ttl
+        lock_timeout: Seconds to wait for another caller computing the same key
     """
     def decorator(func: Callable) -> Callable:
-        import inspect
         is_async = inspect.iscoroutinefunction(func)
-        
+        build_key = _key_builder(func, key_prefix, key_params, vary_on_user, tags)
+        flights: Dict[str, _Flight] = {}
+        flights_lock = threading.Lock()
+
         if is_async:
+            # Every Redis call below runs in the threadpool (see module docstring)
+            async def compute(client: redis.Redis, key: str, entry_tags, args, kwargs) -> Any:
+                token = uuid4().hex
+                deadline = time.monotonic() + lock_timeout
+                while not await run_in_threadpool(_acquire_lock, client, key, token, lock_timeout):
+                    # Another worker is computing this key
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+                    cached_value = await run_in_threadpool(_read, client, key)
+                    if cached_value:
+                        return _decode(cached_value), cached_value
+                    if time.monotonic() >= deadline:
+                        token = None
+                        break
+                try:
+                    generations = await run_in_threadpool(_generations, client, entry_tags)
+                    result = await func(*args, **kwargs)
+                    payload = await run_in_threadpool(
+                        _write, client, key, ttl, result, entry_tags, generations
+                    )
+                    return result, payload
+                finally:
+                    if token:
+                        await run_in_threadpool(_release_lock, client, key, token)
+
             @wraps(func)
             async def async_wrapper(*args, **kwargs):
-                client = get_redis_client()
+                key, entry_tags = build_key(*args, **kwargs)
+                client, cached_value = await run_in_threadpool(_connect_and_read, key)
                 if client is None:
                     return await func(*args, **kwargs)
-                
-                # Generate cache key
-                key = cache_key(key_prefix, func.__name__, *args, **kwargs)
-                
-                # Try to get from cache
-                try:
-                    cached_value = client.get(key)
-                    if cached_value:
-                        return json.loads(cached_value)
-                except Exception as e:
-                    print(f"Cache read error: {e}")
-                
-                # Execute function
-                result = await func(*args, **kwargs)
-                
-                # Store in cache
+                if cached_value:
+                    _record(key_prefix, True)
+                    return _decode(cached_value)
+                _record(key_prefix, False)
+
+                flight = flights.get(key)
+                if flight is not None:
+                    try:
+                        await asyncio.wait_for(flight.done.wait(), lock_timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    if flight.payload:
+                        return _decode(flight.payload)
+                    return await func(*args, **kwargs)
+
+                flight = flights[key] = _Flight(asyncio.Event())
                 try:
-                    client.setex(key, ttl, json.dumps(result, default=str))
-                except Exception as e:
-                    print(f"Cache write error: {e}")
-                
-                return result
+                    result, flight.payload = await compute(client, key, entry_tags, args, kwargs)
+                    return result
+                finally:
+                    del flights[key]
+                    flight.done.set()
             return async_wrapper
         else:
+            def compute(client: redis.Redis, key: str, entry_tags, args, kwargs) -> Any:
+                token = uuid4().hex
+                deadline = time.monotonic() + lock_timeout
+                while not _acquire_lock(client, key, token, lock_timeout):
+                    # Another worker is computing this key
+                    time.sleep(LOCK_POLL_INTERVAL)
+                    cached_value = _read(client, key)
+                    if cached_value:
+                        return _decode(cached_value), cached_value
+                    if time.monotonic() >= deadline:
+                        token = None
+                        break
+                try:
+                    generations = _generations(client, entry_tags)
+                    result = func(*args, **kwargs)
+                    return result, _write(client, key, ttl, result, entry_tags, generations)
+                finally:
+                    if token:
+                        _release_lock(client, key, token)
+
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
                 client = get_redis_client()
                 if client is None:
                     return func(*args, **kwargs)
-                
-                # Generate cache key
-                key = cache_key(key_prefix, func.__name__, *args, **kwargs)
-                
-                # Try to get from cache
-                try:
-                    cached_value = client.get(key)
-                    if cached_value:
-                        return json.loads(cached_value)
-                except Exception as e:
-                    print(f"Cache read error: {e}")
-                
-                # Execute function
-                result = func(*args, **kwargs)
-                
-                # Store in cache
+
+                key, entry_tags = build_key(*args, **kwargs)
+                cached_value = _read(client, key)
+                if cached_value:
+                    _record(key_prefix, True)
+                    return _decode(cached_value)
+                _record(key_prefix, False)
+
+                with flights_lock:
+                    flight = flights.get(key)
+                    leader = flight is None
+                    if leader:
+                        flight = flights[key] = _Flight(threading.Event())
+                if not leader:
+                    flight.done.wait(lock_timeout)
+                    if flight.payload:
+                        return _decode(flight.payload)
+                    return func(*args, **kwargs)
+
                 try:
-                    client.setex(key, ttl, json.dumps(result, default=str))
-                except Exception as e:
-                    print(f"Cache write error: {e}")
-                
-                return result
+                    result, flight.payload = compute(client, key, entry_tags, args, kwargs)
+                    return result
+                finally:
+                    with flights_lock:
+                        del flights[key]
+                    flight.done.set()
             return sync_wrapper
     return decorator
 
 
+def invalidate_tags(*tags: str) -> int:
+    """
+    Invalidate every cache entry registered under any of the tags.
+
+    Cost is proportional to the entries in the tags, not the keyspace.
+
+    Args:
+        tags: Tags to invalidate (e.g., "users", "user:123")
+
+    Returns:
+        Number of entries deleted
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+
+    deleted = 0
+    try:
+        tag_sets, generation_keys = _tag_keys(tags)
+        for tag_set, generation_key in zip(tag_sets, generation_keys):
+            deleted += client.eval(_INVALIDATE_SCRIPT, 2, tag_set, generation_key)
+    except Exception as e:
+        print(f"Cache invalidation error: {e}")
+    return deleted
+
+
 def invalidate_cache(pattern: str) -> int:
     """
     Invalidate cache entries matching pattern.
-    
+
+    Fallback for entries without tags: walks the keyspace incrementally with
+    SCAN rather than KEYS, so Redis is never blocked, but it still visits
+    every key. Prefer invalidate_tags.
+
     Args:
         pattern: Redis key pattern (e.g., "user:*")
-        
+
     Returns:
         Number of keys deleted
     """
     client = get_redis_client()
     if client is None:
         return 0
-    
+
+    deleted = 0
     try:
-        keys = client.keys(pattern)
-        if keys:
-            return client.delete(*keys)
-        return 0
+        batch = []
+        for key in client.scan_iter(match=pattern, count=1000):
+            batch.append(key)
+            if len(batch) >= 500:
+                deleted += client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += client.unlink(*batch)
     except Exception as e:
         print(f"Cache invalidation error: {e}")
-        return 0
+    return deleted
 
 
 def clear_cache() -> bool:
@@ -146,11 +529,10 @@ def clear_cache() -> bool:
     client = get_redis_client()
     if client is None:
         return False
-    
+
     try:
         client.flushdb()
         return True
     except Exception as e:
         print(f"Cache clear error: {e}")
         return False
-
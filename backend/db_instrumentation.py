@@ -0,0 +1,328 @@
+"""
+Database statement instrumentation.
+
+Connections handed out by get_db_connection / get_async_db_connection use
+the cursor classes below, so every statement the handlers run is timed
+without changes at the call sites. Statements are grouped by fingerprint
+(literals and placeholders replaced, whitespace collapsed) so metrics stay
+bounded. Each request's statement count and database time are added to its
+RequestContext (request_context), and statements over DB_SLOW_QUERY_MS are logged,
+optionally with their EXPLAIN plan. Parameters are never logged.
+
+In pipeline mode (database_optimization.pipelined) execute() only queues the
+statement, so statements are counted but not timed one by one: the batch is
+recorded as a single PIPELINE sample (see track_pipeline).
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+import psycopg
+from psycopg.pq import TransactionStatus
+
+from request_context import count_query, timed
+
+try:
+    from monitoring import (
+        db_query_duration_seconds,
+        db_statement_duration_seconds,
+        db_statement_info,
+        db_statement_rows,
+        log_warning,
+    )
+except ImportError:
+    # Fallback if monitoring not available
+    db_query_duration_seconds = None
+    db_statement_duration_seconds = None
+    db_statement_info = None
+    db_statement_rows = None
+    log_warning = None
+
+# Statements slower than this are logged
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Attach EXPLAIN output (plan only, the statement is not re-run) to slow-query logs
+DB_SLOW_QUERY_EXPLAIN = os.getenv("DB_SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+# Explain a given fingerprint at most once per interval
+DB_SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("DB_SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+# Distinct fingerprints with their own metric series; later ones share "other"
+DB_METRICS_MAX_STATEMENTS = int(os.getenv("DB_METRICS_MAX_STATEMENTS", "1000"))
+
+EXPLAINABLE_VERBS = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE"}
+_STATEMENT_CACHE_SIZE = 4096
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"%(?:\([^)]+\))?[sbt]")
+_NUMBERS = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Statement(NamedTuple):
+    fingerprint: str
+    text: str
+    verb: str
+
+
+_statements: Dict[str, Statement] = {}
+# fingerprint -> (duration, query_type duration, rows) metric children
+_metric_children: Dict[str, tuple] = {}
+_last_explained: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def normalize(query: str) -> str:
+    """Return the statement with comments, literals and placeholders normalized."""
+    text = _COMMENTS.sub(" ", query)
+    text = _STRINGS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _LISTS.sub("?", text)
+    return _WHITESPACE.sub(" ", text).strip().rstrip(";").strip()
+
+
+def fingerprint(query: str) -> Statement:
+    """Return the (cached) fingerprint of a statement."""
+    statement = _statements.get(query)
+    if statement is None:
+        text = normalize(query)
+        digest = hashlib.sha1(text.encode()).hexdigest()[:12]
+        verb = text.split(" ", 1)[0].upper() if text else "UNKNOWN"
+        statement = Statement(digest, text, verb)
+        if len(_statements) >= _STATEMENT_CACHE_SIZE:
+            _statements.clear()
+        _statements[query] = statement
+    return statement
+
+
+def _metrics_for(statement: Statement) -> Optional[tuple]:
+    """Return the labelled metric children for a statement (None without monitoring)."""
+    children = _metric_children.get(statement.fingerprint)
+    if children is not None or db_statement_duration_seconds is None:
+        return children
+    with _lock:
+        children = _metric_children.get(statement.fingerprint)
+        if children is not None:
+            return children
+        label = statement.fingerprint
+        if len(_metric_children) >= DB_METRICS_MAX_STATEMENTS:
+            label = "other"
+        else:
+            db_statement_info.labels(fingerprint=label, statement=statement.text[:300]).set(1)
+        children = (
+            db_statement_duration_seconds.labels(fingerprint=label, verb=statement.verb),
+            db_query_duration_seconds.labels(query_type=statement.verb),
+            db_statement_rows.labels(fingerprint=label),
+        )
+        if label != "other":
+            _metric_children[statement.fingerprint] = children
+    return children
+
+
+def _query_text(cursor, query: Any) -> str:
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    return query.as_string(cursor)
+
+
+def _record(cursor, query: Any, duration: float) -> Optional[tuple]:
+    """Record metrics for one statement; returns (text, statement) if it was slow."""
+    try:
+        text = _query_text(cursor, query)
+    except Exception:
+        return None
+    statement = fingerprint(text)
+    children = _metrics_for(statement)
+    if children is not None:
+        duration_metric, query_type_metric, rows_metric = children
+        duration_metric.observe(duration)
+        query_type_metric.observe(duration)
+        if cursor.rowcount >= 0:
+            rows_metric.observe(cursor.rowcount)
+
+    count_query(duration)
+
+    if duration * 1000 >= DB_SLOW_QUERY_MS:
+        return text, statement
+    return None
+
+
+def _record_queued(cursor, query: Any) -> None:
+    """Count a statement queued in pipeline mode; its time is the batch's."""
+    try:
+        statement = fingerprint(_query_text(cursor, query))
+    except Exception:
+        return
+    queued = getattr(cursor.connection, "_queued_statements", None)
+    if queued is not None:
+        queued.append(statement.fingerprint)
+    count_query(0.0)
+
+
+def _in_pipeline(cursor) -> bool:
+    return getattr(cursor.connection, "_pipeline", None) is not None
+
+
+@contextmanager
+def track_pipeline(connection) -> Iterator[None]:
+    """
+    Record a pipelined batch as one sample.
+
+    Wraps the pipeline block: its wall time (queueing, the syncs of fetches
+    inside the block and the final sync) is observed as query_type PIPELINE,
+    added to the request's database time and logged when slow, with the
+    fingerprints of the statements in the batch.
+    """
+    queued: List[str] = []
+    connection._queued_statements = queued
+    started = time.perf_counter()
+    try:
+        with timed("db_time"):
+            yield
+    finally:
+        connection._queued_statements = None
+        duration = time.perf_counter() - started
+        if db_query_duration_seconds is not None and queued:
+            db_query_duration_seconds.labels(query_type="PIPELINE").observe(duration)
+        if queued and duration * 1000 >= DB_SLOW_QUERY_MS and log_warning:
+            log_warning(
+                "Slow query",
+                fingerprint="pipeline",
+                statement=f"pipeline of {len(queued)} statements",
+                fingerprints=queued,
+                duration_ms=round(duration * 1000, 2),
+            )
+
+
+def _should_explain(connection, statement: Statement) -> bool:
+    if not DB_SLOW_QUERY_EXPLAIN or statement.verb not in EXPLAINABLE_VERBS:
+        return False
+    if connection.info.transaction_status == TransactionStatus.INERROR:
+        return False
+    now = time.monotonic()
+    with _lock:
+        last = _last_explained.get(statement.fingerprint)
+        if last is not None and now - last < DB_SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        _last_explained[statement.fingerprint] = now
+    return True
+
+
+def _log_slow(statement: Statement, duration: float, rows: int, plan: Optional[str]) -> None:
+    if log_warning:
+        log_warning(
+            "Slow query",
+            fingerprint=statement.fingerprint,
+            statement=statement.text[:2000],
+            duration_ms=round(duration * 1000, 2),
+            rows=rows,
+            plan=plan,
+        )
+
+
+def _format_plan(rows) -> str:
+    return "\n".join(row[0] for row in rows)[:8000]
+
+
+class InstrumentedCursor(psycopg.Cursor):
+    """Client-side cursor recording per-statement metrics."""
+
+    def execute(self, query, params=None, **kwargs):
+        if _in_pipeline(self):
+            _record_queued(self, query)
+            return super().execute(query, params, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            self._after(query, params, time.perf_counter() - started)
+
+    def executemany(self, query, params_seq, **kwargs):
+        if _in_pipeline(self):
+            _record_queued(self, query)
+            return super().executemany(query, params_seq, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, params_seq, **kwargs)
+        finally:
+            self._after(query, None, time.perf_counter() - started, explain=False)
+
+    def _after(self, query, params, duration: float, explain: bool = True) -> None:
+        slow = _record(self, query, duration)
+        if slow is None:
+            return
+        text, statement = slow
+        plan = None
+        if explain and _should_explain(self.connection, statement):
+            try:
+                with psycopg.Cursor(self.connection) as explain:
+                    explain.execute("EXPLAIN " + text, params)
+                    plan = _format_plan(explain.fetchall())
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+        _log_slow(statement, duration, self.rowcount, plan)
+
+
+class InstrumentedServerCursor(psycopg.ServerCursor):
+    """Named (server-side) cursor recording the DECLARE time; used by exports."""
+
+    def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            duration = time.perf_counter() - started
+            slow = _record(self, query, duration)
+            if slow is not None:
+                _log_slow(slow[1], duration, self.rowcount, None)
+
+
+class InstrumentedAsyncCursor(psycopg.AsyncCursor):
+    """Async client-side cursor recording per-statement metrics."""
+
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            await self._after(query, params, time.perf_counter() - started)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            await self._after(query, None, time.perf_counter() - started, explain=False)
+
+    async def _after(self, query, params, duration: float, explain: bool = True) -> None:
+        slow = _record(self, query, duration)
+        if slow is None:
+            return
+        text, statement = slow
+        plan = None
+        if explain and _should_explain(self.connection, statement):
+            try:
+                async with psycopg.AsyncCursor(self.connection) as explain:
+                    await explain.execute("EXPLAIN " + text, params)
+                    plan = _format_plan(await explain.fetchall())
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+        _log_slow(statement, duration, self.rowcount, plan)
+
+
+def instrument_connection(conn: psycopg.Connection) -> None:
+    """Pool ``configure`` hook: make the connection hand out instrumented cursors."""
+    conn.cursor_factory = InstrumentedCursor
+    conn.server_cursor_factory = InstrumentedServerCursor
+
+
+async def instrument_async_connection(conn: psycopg.AsyncConnection) -> None:
+    """Async pool ``configure`` hook."""
+    conn.cursor_factory = InstrumentedAsyncCursor
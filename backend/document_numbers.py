@@ -0,0 +1,90 @@
+"""
+Document number allocation.
+
+This module hands out gate entry and GRN numbers from a per-period counter
+table. Each allocation is a single upsert on one (series, period) row, so it
+is O(1), never scans the document tables and cannot produce duplicates.
+"""
+
+from datetime import datetime
+
+from database_optimization import get_db_connection
+
+GATE_ENTRY_SERIES = "gate_entry"
+GRN_SERIES = "grn"
+
+
+def allocate_numbers(cur, series: str, period: str, count: int = 1) -> range:
+    """
+    Allocate ``count`` consecutive numbers in the caller's transaction.
+
+    The counter row stays locked until the caller commits, so numbers are
+    gapless when the business transaction rolls back.
+
+    Args:
+        cur: Cursor of the transaction that will use the numbers
+        series: Document series (e.g. "gate_entry")
+        period: Period key (e.g. "1025" for October 2025)
+        count: How many numbers to allocate
+
+    Returns:
+        Range of allocated sequence numbers
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    cur.execute(
+        """
+        INSERT INTO document_counters (series, period, last_value, updated_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (series, period)
+        DO UPDATE SET last_value = document_counters.last_value + EXCLUDED.last_value,
+                      updated_at = NOW()
+        RETURNING last_value;
+        """,
+        (series, period, count),
+    )
+    last_value = cur.fetchone()[0]
+    return range(last_value - count + 1, last_value + 1)
+
+
+def reserve_block(series: str, period: str, size: int) -> range:
+    """
+    Reserve a block of numbers in its own transaction (for bulk imports).
+
+    The block is committed immediately, so concurrent single allocations
+    continue after it and never collide with the imported rows.
+
+    Args:
+        series: Document series
+        period: Period key
+        size: Number of numbers to reserve
+
+    Returns:
+        Range of reserved sequence numbers
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            block = allocate_numbers(cur, series, period, size)
+        conn.commit()
+    return block
+
+
+def entry_code_period(created_at: datetime) -> str:
+    """Period key for gate entry codes (month and year, MMYY)."""
+    return created_at.strftime("%m%y")
+
+
+def grn_code_period(created_at: datetime) -> str:
+    """Period key for GRN codes (two digit year)."""
+    return created_at.strftime("%y")
+
+
+def format_entry_code(period: str, seq: int) -> str:
+    """Format a gate entry code, e.g. 1025001."""
+    return f"{period}{seq:03d}"
+
+
+def format_grn_code(period: str, seq: int) -> str:
+    """Format a GRN code, e.g. GRN-25-001."""
+    return f"GRN-{period}-{seq:03d}"
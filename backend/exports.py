@@ -0,0 +1,164 @@
+"""
+Streaming export utilities.
+
+This module streams large result sets as NDJSON or CSV straight from a
+psycopg server-side (named) cursor, so memory use stays constant and the
+first rows reach the client while the rest are still being read.
+
+The connection is checked out and the query run before the response
+starts, so an exhausted pool (503) or a failing query is still reported
+with its own status rather than as a truncated 200.
+"""
+
+import csv
+import io
+import itertools
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Union
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from database_optimization import get_db_connection
+from serialization import RowSerializer
+
+try:
+    from monitoring import export_rows_total
+except ImportError:
+    # Fallback if monitoring not available
+    export_rows_total = None
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+EXPORT_CHUNK_ROWS = 500
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_query(
+    query: str,
+    params: Sequence[Any],
+    serialize: Union[RowSerializer, Callable[[tuple], dict]],
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[list]:
+    """
+    Yield serialized records in chunks from a server-side cursor.
+
+    Args:
+        query: SELECT statement to run
+        params: Query parameters
+        serialize: RowSerializer used as the cursor's row factory, or a
+            function converting one row tuple to a record dict
+        chunk_rows: Rows fetched from the server per round trip
+
+    Yields:
+        Lists of at most chunk_rows records
+    """
+    row_serializer = serialize if isinstance(serialize, RowSerializer) else None
+    cursor_options = {"row_factory": row_serializer.row_factory} if row_serializer else {}
+    with get_db_connection(read_only=True) as conn:
+        with conn.cursor(name=f"export_{uuid4().hex}", **cursor_options) as cur:
+            cur.itersize = chunk_rows
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield rows if row_serializer else [serialize(row) for row in rows]
+
+
+def ndjson_chunks(batches: Iterable[list], export_name: str) -> Iterator[bytes]:
+    """Encode record batches as newline-delimited JSON."""
+    for records in batches:
+        yield "".join(
+            json.dumps(record, default=_json_default) + "\n" for record in records
+        ).encode("utf-8")
+        if export_rows_total:
+            export_rows_total.labels(export=export_name, format="ndjson").inc(len(records))
+
+
+def csv_chunks(batches: Iterable[list], export_name: str) -> Iterator[bytes]:
+    """Encode record batches as CSV; the header comes from the first record."""
+    writer = None
+    buffer = io.StringIO()
+    for records in batches:
+        for record in records:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(record.keys()))
+                writer.writeheader()
+            writer.writerow({key: _csv_value(value) for key, value in record.items()})
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+        if export_rows_total:
+            export_rows_total.labels(export=export_name, format="csv").inc(len(records))
+
+
+def export_response(
+    export_name: str,
+    export_format: str,
+    query: str,
+    params: Sequence[Any],
+    serialize: Union[RowSerializer, Callable[[tuple], dict]],
+    filename: Optional[str] = None,
+) -> StreamingResponse:
+    """
+    Build a streaming NDJSON or CSV response for a query.
+
+    Args:
+        export_name: Name used for metrics and the default file name
+        export_format: "ndjson" or "csv"
+        query: SELECT statement to run
+        params: Query parameters
+        serialize: RowSerializer or function converting one row tuple to a
+            record dict
+        filename: Download file name (defaults to export_name + extension)
+
+    Raises:
+        HTTPException: 400 for an unknown format, 503 when the pool is
+            exhausted (see get_db_connection)
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid export format. Use 'ndjson' or 'csv'.",
+        )
+
+    rows = iter_query(query, params, serialize)
+    # Check out the connection and run the query now, while errors can still
+    # become a status code (see module docstring)
+    first = next(rows, None)
+    batches = itertools.chain([first], rows) if first is not None else iter(())
+    encoder = ndjson_chunks if export_format == "ndjson" else csv_chunks
+    filename = filename or f"{export_name}.{export_format}"
+    return StreamingResponse(
+        encoder(batches, export_name),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        # Returns the connection even if the client disconnects mid-stream
+        background=BackgroundTask(rows.close),
+    )
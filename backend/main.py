@@ -1,35 +1,92 @@
+import time
+
+# Worker boot time is measured from here (see record_boot_time)
+_BOOT_STARTED = time.perf_counter()
+_STARTUP_STARTED = _BOOT_STARTED
+
 import os
 import json
 from datetime import datetime, timedelta
+from operator import itemgetter
 from pathlib import Path
 from typing import Optional, List, Any
 from uuid import uuid4
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, status, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import psycopg
-from psycopg.errors import UndefinedTable
-import time
 
 # Import monitoring and caching
 from monitoring import (
-    log_request,
+    app_boot_seconds,
     log_error,
     log_info,
-    http_requests_total,
-    http_request_duration_seconds,
     get_metrics_response,
+    password_rehashes_total,
+    start_log_listener,
+    stop_log_listener,
+)
+from cache import cached, invalidate_tags
+from database_optimization import (
+    background_maintenance,
+    close_async_connection_pool,
+    get_async_db_connection,
+    PREPARE,
+    get_db_connection,
+    open_async_connection_pool,
+    pipelined,
+)
+from migrations.runner import MigrationError, MigrationRunner
+from document_numbers import (
+    GATE_ENTRY_SERIES,
+    GRN_SERIES,
+    allocate_numbers,
+    entry_code_period,
+    format_entry_code,
+    format_grn_code,
+    grn_code_period,
 )
-from cache import cached, invalidate_cache
-from database_optimization import get_db_connection, create_indexes, analyze_tables
 from security_middleware import sanitize_string
+from request_middleware import RequestMiddleware
+from request_context import query_budget, set_user, timed
+from password_hashing import password_hasher
+from auth_cache import (
+    cache_token,
+    cache_user,
+    get_cached_token,
+    get_cached_user,
+    invalidate_user_cache,
+)
+from exports import export_response
+from bulk_import import run_import
+from reference_cache import reference_cache
+from notifications import notify_role
+import quality_workflow
+from quality_workflow import apply_transition
+from serialization import (
+    FastJSONResponse,
+    RowSerializer,
+    as_float,
+    as_int,
+    as_json_list,
+    as_str,
+    as_text,
+    column_names,
+    json_page,
+)
+from pagination import (
+    DEFAULT_PAGE_SIZE,
+    Keyset,
+    clamp_page_size,
+    paginate,
+)
 
 # Import models and schemas
 from schemas import (
@@ -42,8 +99,11 @@ from schemas import (
     SecurityLogCreate,
     SecurityLogResponse,
     GRNCreate,
+    GRNItem,
     GRNResponse,
     GRNPendingQAResponse,
+    ImportJobResponse,
+    ImportRequest,
     SamplingRequest,
     SampleAssignmentRequest,
     TestCreateRequest,
@@ -70,6 +130,11 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
+# Apply pending migrations at startup (local development). Deployments run
+# `python -m migrations.runner upgrade` once before starting the workers.
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "false").lower() == "true"
+
+migration_runner = MigrationRunner(DATABASE_URL)
 
 app = FastAPI(
     title="Viruj Chematrix API",
@@ -78,7 +143,11 @@ app = FastAPI(
 )
 
 # Rate limiting setup
-limiter = Limiter(key_func=get_remote_address)
+# RATE_LIMIT_ENABLED=false turns limits off (load tests, benchmarks)
+limiter = Limiter(
+    key_func=get_remote_address,
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false",
+)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -153,85 +222,16 @@ async def global_exception_handler(request: Request, exc: Exception):
         )
 
 
-# Request/Response middleware for monitoring
-@app.middleware("http")
-async def monitoring_middleware(request: Request, call_next):
-    """Middleware for request/response monitoring and metrics."""
-    start_time = time.time()
-    
-    try:
-        response = await call_next(request)
-        duration = time.time() - start_time
-        
-        # Record metrics
-        http_requests_total.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status_code=response.status_code
-        ).inc()
-        
-        http_request_duration_seconds.labels(
-            method=request.method,
-            endpoint=request.url.path
-        ).observe(duration)
-        
-        # Log request
-        log_request(request, response, duration)
-        
-        return response
-    except Exception as e:
-        duration = time.time() - start_time
-        log_error(e, {
-            "method": request.method,
-            "path": request.url.path,
-            "duration_ms": duration * 1000,
-        })
-        raise
-
+# Timing, metrics, request logging and security headers (outermost layer)
+app.add_middleware(RequestMiddleware)
 
-# Security headers middleware
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    """Add security headers to all responses."""
-    response = await call_next(request)
-    
-    # Security headers
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "img-src 'self' data: https:; "
-        "font-src 'self' data:; "
-        "connect-src 'self'"
-    )
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = (
-        "geolocation=(), microphone=(), camera=()"
-    )
-    
-    # Remove server header (optional, but good for security)
-    if "server" in response.headers:
-        del response.headers["server"]
-    
-    return response
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+    """Verify a password against its hash (on the bounded hashing executor)."""
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -246,32 +246,47 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
     """Get current authenticated user from JWT token."""
+    with timed("auth_time"):
+        user = await _load_user(credentials.credentials)
+    set_user(user["id"])
+    return user
+
+
+async def _load_user(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    payload = get_cached_token(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        cache_token(token, payload)
+
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
 
-    # Get user from database
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    user_dict = get_cached_user(user_id)
+    if user_dict is not None:
+        return user_dict
+
+    # Get user from database. The row is cached until the next invalidation,
+    # so read the primary: a lagging replica could return it as it was before
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 "SELECT id, name, email, role, department, plant_id, is_active FROM users WHERE id = %s",
                 (user_id,),
             )
-            row = cur.fetchone()
+            row = await cur.fetchone()
             if row is None:
                 raise credentials_exception
 
@@ -285,12 +300,21 @@ def get_current_user(
                 "plant_id": row[5],
                 "is_active": row[6],
             }
-            return user_dict
+    cache_user(user_dict)
+    return user_dict
+
+
+@app.on_event("startup")
+def start_logging() -> None:
+    """Write log records from a background thread (runs first)."""
+    start_log_listener()
 
 
 @app.on_event("startup")
 def startup_event() -> None:
     """Initialize application on startup."""
+    global _STARTUP_STARTED
+    _STARTUP_STARTED = time.perf_counter()
     log_info("Application starting up")
     
     # Verify database connection
@@ -304,45 +328,77 @@ def startup_event() -> None:
         log_error(e, {"context": "startup", "component": "database"})
         raise
     
-    # Create indexes if they don't exist
+    # The schema is owned by migrations/; workers only check it is current
     try:
-        create_indexes()
-        log_info("Database indexes created/verified")
-    except Exception as e:
-        log_error(e, {"context": "startup", "component": "indexes"})
-    
-    # Analyze tables for query optimization
-    try:
-        analyze_tables()
-        log_info("Database tables analyzed")
-    except Exception as e:
-        log_error(e, {"context": "startup", "component": "analyze"})
+        if DB_MIGRATE_ON_STARTUP:
+            applied = migration_runner.upgrade()
+            if applied:
+                log_info("Migrations applied", migrations=[migration.path.name for migration in applied])
+        with get_db_connection() as conn:
+            migration_runner.check(conn)
+            conn.commit()
+        log_info("Schema verified", version=migration_runner.head)
+    except MigrationError as e:
+        log_error(e, {"context": "startup", "component": "schema"})
+        raise
 
-    # Ensure operational tables exist
-    try:
-        ensure_gate_entries_table()
-        log_info("Gate entry table verified")
-    except Exception as e:
-        log_error(e, {"context": "startup", "component": "gate_entries_table"})
+    # Scheduled ANALYZE runs in the background
+    background_maintenance.start()
+    reference_cache.start()
 
-    try:
-        ensure_grn_table()
-        log_info("GRN table verified")
-    except Exception as e:
-        log_error(e, {"context": "startup", "component": "grn_table"})
 
-    try:
-        ensure_quality_samples_table()
-        ensure_quality_tests_table()
-        log_info("Quality samples tables verified")
-    except Exception as e:
-        log_error(e, {"context": "startup", "component": "quality_samples_table"})
+@app.on_event("startup")
+async def open_async_db_pool() -> None:
+    """Open the async connection pool used by the async read endpoints."""
+    await open_async_connection_pool()
+
+
+def _restart_boot_clock() -> None:
+    # Workers forked by serve.py inherit the imported app; their boot starts at the fork
+    global _BOOT_STARTED
+    _BOOT_STARTED = time.perf_counter()
+
+
+os.register_at_fork(after_in_child=_restart_boot_clock)
+
+
+@app.on_event("startup")
+async def record_boot_time() -> None:
+    """Export how long this worker took to become ready (runs last)."""
+    ready = time.perf_counter()
+    phases = {
+        "import": _STARTUP_STARTED - _BOOT_STARTED,
+        "startup": ready - _STARTUP_STARTED,
+        "total": ready - _BOOT_STARTED,
+    }
+    for phase, seconds in phases.items():
+        app_boot_seconds.labels(phase=phase).set(seconds)
+    log_info("Worker ready", **{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in phases.items()})
 
 
 @app.on_event("shutdown")
-def shutdown_event() -> None:
+async def shutdown_event() -> None:
     """Cleanup on application shutdown."""
     log_info("Application shutting down")
+    await close_async_connection_pool()
+
+
+@app.on_event("shutdown")
+def stop_reference_cache() -> None:
+    """Stop listening for reference table changes."""
+    reference_cache.stop()
+
+
+@app.on_event("shutdown")
+def stop_background_maintenance() -> None:
+    """Stop the ANALYZE thread."""
+    background_maintenance.stop()
+
+
+@app.on_event("shutdown")
+def stop_logging() -> None:
+    """Write out queued log records (runs last)."""
+    stop_log_listener()
 
 
 # Meta endpoints
@@ -359,7 +415,7 @@ def root() -> dict[str, str]:
 def health_check() -> HealthResponse:
     """Simple health endpoint to confirm API + DB connectivity."""
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(write=False) as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT current_user;")
                 (current_user,) = cur.fetchone()
@@ -381,71 +437,82 @@ def metrics():
 # Authentication endpoints
 @app.post("/api/auth/login", response_model=LoginResponse, tags=["authentication"])
 @limiter.limit("5/minute")  # Rate limit: 5 requests per minute
-def login(request: Request, login_data: LoginRequest) -> LoginResponse:
+async def login(request: Request, login_data: LoginRequest) -> LoginResponse:
     """Authenticate user and return JWT token."""
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            # For demo: check if password is 'demo123' (in production, use hashed passwords)
-            cur.execute(
+    # The connection goes back to the pool before the (slow) password check
+    async with get_async_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 """
-                SELECT id, name, email, role, department, plant_id, is_active 
+                SELECT id, name, email, role, department, plant_id, is_active, hashed_password
                 FROM users 
                 WHERE email = %s AND is_active = true
                 """,
                 (login_data.email.lower(),),
             )
-            row = cur.fetchone()
+            row = await cur.fetchone()
+        await conn.rollback()
 
-            if row is None:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid email or password",
-                )
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password",
+        )
 
-            # Get hashed password from database
-            cur.execute(
-                "SELECT hashed_password FROM users WHERE email = %s",
-                (login_data.email.lower(),),
+    user_id, name, email, role, department, plant_id, is_active, hashed_password = row
+
+    # Demo mode: accept 'demo123' as password (for backward compatibility)
+    # In production, always verify against hashed_password
+    if hashed_password:
+        # Verify off the request path; rehash if the stored cost is outdated
+        valid, new_hash = await password_hasher.verify_and_update_async(
+            login_data.password, hashed_password
+        )
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid email or password",
             )
-            password_row = cur.fetchone()
-            
-            # Demo mode: accept 'demo123' as password (for backward compatibility)
-            # In production, always verify against hashed_password
-            if password_row and password_row[0]:
-                # Verify against hashed password
-                if not verify_password(login_data.password, password_row[0]):
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid email or password",
+        if new_hash:
+            async with get_async_db_connection() as conn:
+                async with conn.cursor() as cur:
+                    # Only replace the hash we verified, never a concurrent change
+                    await cur.execute(
+                        """
+                        UPDATE users SET hashed_password = %s
+                        WHERE id = %s AND hashed_password = %s
+                        """,
+                        (new_hash, user_id, hashed_password),
                     )
-            elif login_data.password != "demo123":
-                # Fallback for demo mode
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid email or password",
-                )
-
-            user_id, name, email, role, department, plant_id, is_active = row
-
-            # Create access token
-            access_token = create_access_token(data={"sub": user_id})
+                    if cur.rowcount:
+                        password_rehashes_total.inc()
+                await conn.commit()
+    elif login_data.password != "demo123":
+        # Fallback for demo mode
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password",
+        )
 
-            user_response = UserResponse(
-                id=user_id,
-                name=name,
-                email=email,
-                role=role,
-                department=department,
-                plant_id=plant_id,
-                is_active=is_active,
-                created_at=datetime.utcnow(),
-            )
+    # Create access token
+    access_token = create_access_token(data={"sub": user_id})
+
+    user_response = UserResponse(
+        id=user_id,
+        name=name,
+        email=email,
+        role=role,
+        department=department,
+        plant_id=plant_id,
+        is_active=is_active,
+        created_at=datetime.utcnow(),
+    )
 
-            return LoginResponse(
-                access_token=access_token,
-                token_type="bearer",
-                user=user_response,
-            )
+    return LoginResponse(
+        access_token=access_token,
+        token_type="bearer",
+        user=user_response,
+    )
 
 
 @app.get("/api/auth/me", response_model=UserResponse, tags=["authentication"])
@@ -470,44 +537,55 @@ def logout() -> MessageResponse:
 
 
 # Users endpoints
+def _load_active_users(cur) -> dict:
+    cur.execute(
+        """
+        SELECT id, name, email, role, department, plant_id, is_active 
+        FROM users 
+        WHERE is_active = true
+        ORDER BY role, name
+        """
+    )
+    users = [
+        {
+            "id": row[0],
+            "name": row[1],
+            "email": row[2],
+            "role": row[3],
+            "department": row[4],
+            "plant_id": row[5],
+            "is_active": row[6],
+        }
+        for row in cur.fetchall()
+    ]
+    return {"list": users, "by_id": {str(user["id"]): user for user in users}}
+
+
+def get_active_users() -> dict:
+    """Active users as {"list": [...], "by_id": {...}} from the in-process reference cache."""
+    return reference_cache.get("active_users", ("users",), _load_active_users)
+
+
+# Users changed in any worker: drop the authenticated-user rows too
+reference_cache.subscribe("users", invalidate_user_cache)
+
+
 @app.get("/api/users", tags=["users"])
 @limiter.limit("100/minute")  # Rate limit: 100 requests per minute
-@cached(ttl=300, key_prefix="users")  # Cache for 5 minutes
 def get_users(request: Request) -> list[dict]:
     """Get all active users."""
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, name, email, role, department, plant_id, is_active 
-                FROM users 
-                WHERE is_active = true
-                ORDER BY role, name
-                """
-            )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": row[0],
-                    "name": row[1],
-                    "email": row[2],
-                    "role": row[3],
-                    "department": row[4],
-                    "plant_id": row[5],
-                    "is_active": row[6],
-                }
-                for row in rows
-            ]
+    return FastJSONResponse(get_active_users()["list"])
 
 
 @app.get("/api/users/{user_id}", tags=["users"])
 @limiter.limit("100/minute")  # Rate limit: 100 requests per minute
-@cached(ttl=600, key_prefix="user")  # Cache for 10 minutes
+@cached(ttl=600, key_prefix="user", key_params=("user_id",), tags=("user:{user_id}",))  # Cache for 10 minutes
 def get_user(request: Request, user_id: str) -> dict:
     """Get user by ID."""
     user_id = sanitize_string(user_id, max_length=50)
     
-    with get_db_connection() as conn:
+    # Tag-cached: filled from the primary (see cached)
+    with get_db_connection(write=False) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -534,6 +612,68 @@ def get_user(request: Request, user_id: str) -> dict:
 
 
 
+# Column lists shared by the list and export queries (order matches the serializers)
+SECURITY_LOG_COLUMNS = """
+    id, entry_code, material_name, material_category, po_number, vehicle_name,
+    vehicle_number, driver_name, driver_contact, supplier_name, document_number,
+    quantity, uom, remarks, seal_intact, status, plant_id, created_by,
+    created_by_name, created_at
+"""
+GRN_COLUMNS = """
+    id, gate_entry_id, entry_code, grn_code, po_number, delivery_challan,
+    quantity_received, remarks, status, created_by, created_by_name, created_at,
+    updated_at, supplier_name, supplier_address, supplier_location, supplier_contact,
+    document_status, document_date, delivery_date, period, reference, comment,
+    items, net_total, vat_total, gross_total
+"""
+GRN_HISTORY_ROLES = [
+    "Warehouse Manager",
+    "QA Manager",
+    "QA Head",
+    "QC Manager",
+    "Plant Head",
+    "Management",
+    "System Admin",
+]
+QC_HISTORY_ROLES = [
+    "QC Manager",
+    "QC Head",
+    "QA Manager",
+    "QA Head",
+    "Plant Head",
+    "Management",
+    "System Admin",
+]
+
+# Keyset pagination orderings for list endpoints
+SECURITY_LOG_KEYSET = Keyset("security_logs", (("created_at", "timestamptz"), ("id", "uuid")))
+GRN_HISTORY_KEYSET = Keyset("grn_history", (("created_at", "timestamptz"), ("id", "uuid")))
+GRN_PENDING_QA_KEYSET = Keyset(
+    "grn_pending_qa",
+    (("grn.created_at", "timestamptz"), ("grn.id", "uuid")),
+    descending=False,
+)
+UNASSIGNED_SAMPLES_KEYSET = Keyset(
+    "unassigned_samples", (("s.created_at", "timestamptz"), ("s.id", "uuid"))
+)
+ASSIGNED_SAMPLES_KEYSET = Keyset(
+    "assigned_samples", (("s.created_at", "timestamptz"), ("s.id", "uuid"))
+)
+MY_TESTS_KEYSET = Keyset(
+    "my_tests",
+    (
+        ("COALESCE(s.due_date, DATE '9999-12-31')", "date"),
+        ("t.created_at", "timestamptz"),
+        ("t.id", "uuid"),
+    ),
+    descending=False,
+)
+REVIEW_QUEUE_KEYSET = Keyset("review_queue", (("t.updated_at", "timestamptz"), ("t.id", "uuid")))
+WAREHOUSE_DECISIONS_KEYSET = Keyset(
+    "warehouse_decisions", (("t.updated_at", "timestamptz"), ("t.id", "uuid"))
+)
+
+
 def _serialize_user_with_timestamps(row: tuple) -> dict:
     return {
         'id': row[0],
@@ -547,407 +687,316 @@ def _serialize_user_with_timestamps(row: tuple) -> dict:
         'updated_at': row[8],
     }
 
-def _serialize_security_log(row: tuple) -> dict:
-    return {
-        "id": str(row[0]),
-        "entry_code": row[1],
-        "material_name": row[2],
-        "material_category": row[3],
-        "po_number": row[4],
-        "vehicle_name": row[5],
-        "vehicle_number": row[6],
-        "driver_name": row[7],
-        "driver_contact": row[8],
-        "supplier_name": row[9],
-        "document_number": row[10],
-        "quantity": float(row[11]) if row[11] is not None else None,
-        "uom": row[12],
-        "remarks": row[13],
-        "seal_intact": row[14],
-        "status": row[15],
-        "plant_id": row[16],
-        "created_by": row[17],
-        "created_by_name": row[18],
-        "created_at": row[19],
-    }
-
-
-def _serialize_grn(row: tuple) -> dict:
-    # Handle both old format (without grn_code) and new format (with grn_code)
-    # New format has 27 elements (with grn_code), old format has 26
-    has_grn_code = len(row) >= 27
-    
-    if has_grn_code:
-        # New format with grn_code
-        raw_items = row[23]
-        grn_code = row[3] if row[3] else row[2]
-        po_number_idx = 4
-        delivery_challan_idx = 5
-        quantity_received_idx = 6
-        remarks_idx = 7
-        status_idx = 8
-        created_by_idx = 9
-        created_by_name_idx = 10
-        created_at_idx = 11
-        updated_at_idx = 12
-        supplier_name_idx = 13
-        supplier_address_idx = 14
-        supplier_location_idx = 15
-        supplier_contact_idx = 16
-        document_status_idx = 17
-        document_date_idx = 18
-        delivery_date_idx = 19
-        period_idx = 20
-        reference_idx = 21
-        comment_idx = 22
-        net_total_idx = 24
-        vat_total_idx = 25
-        gross_total_idx = 26
-    else:
-        # Old format without grn_code
-        raw_items = row[22]
-        grn_code = row[2]  # Use entry_code as fallback
-        po_number_idx = 3
-        delivery_challan_idx = 4
-        quantity_received_idx = 5
-        remarks_idx = 6
-        status_idx = 7
-        created_by_idx = 8
-        created_by_name_idx = 9
-        created_at_idx = 10
-        updated_at_idx = 11
-        supplier_name_idx = 12
-        supplier_address_idx = 13
-        supplier_location_idx = 14
-        supplier_contact_idx = 15
-        document_status_idx = 16
-        document_date_idx = 17
-        delivery_date_idx = 18
-        period_idx = 19
-        reference_idx = 20
-        comment_idx = 21
-        net_total_idx = 23
-        vat_total_idx = 24
-        gross_total_idx = 25
-    
-    if raw_items is None:
-        items = []
-    elif isinstance(raw_items, str):
-        try:
-            items = json.loads(raw_items)
-        except json.JSONDecodeError:
-            items = []
-    else:
-        items = raw_items
-
-    return {
-        "id": str(row[0]),
-        "gate_entry_id": str(row[1]),
-        "entry_code": row[2],
-        "grn_code": grn_code,
-        "po_number": row[po_number_idx],
-        "delivery_challan": row[delivery_challan_idx],
-        "quantity_received": float(row[quantity_received_idx]) if row[quantity_received_idx] is not None else None,
-        "remarks": row[remarks_idx],
-        "status": row[status_idx],
-        "created_by": row[created_by_idx],
-        "created_by_name": row[created_by_name_idx],
-        "created_at": row[created_at_idx],
-        "updated_at": row[updated_at_idx],
-        "supplier_name": row[supplier_name_idx],
-        "supplier_address": row[supplier_address_idx],
-        "supplier_location": row[supplier_location_idx],
-        "supplier_contact": row[supplier_contact_idx],
-        "document_status": row[document_status_idx],
-        "document_date": row[document_date_idx],
-        "delivery_date": row[delivery_date_idx],
-        "period": row[period_idx],
-        "reference": row[reference_idx],
-        "comment": row[comment_idx],
-        "items": items,
-        "net_total": float(row[net_total_idx]) if row[net_total_idx] is not None else None,
-        "vat_total": float(row[vat_total_idx]) if row[vat_total_idx] is not None else None,
-        "gross_total": float(row[gross_total_idx]) if row[gross_total_idx] is not None else None,
-    }
-
+SECURITY_LOG_ROW = RowSerializer(
+    "security_log",
+    [
+        ("id", "id", as_str),
+        "entry_code",
+        "material_name",
+        "material_category",
+        "po_number",
+        "vehicle_name",
+        "vehicle_number",
+        "driver_name",
+        "driver_contact",
+        "supplier_name",
+        "document_number",
+        ("quantity", "quantity", as_float),
+        "uom",
+        "remarks",
+        "seal_intact",
+        "status",
+        "plant_id",
+        "created_by",
+        "created_by_name",
+        "created_at",
+    ],
+)
+_serialize_security_log = SECURITY_LOG_ROW.compile(column_names(SECURITY_LOG_COLUMNS))
+
+
+def _grn_code(grn_code: Optional[str], entry_code: str) -> str:
+    # GRNs created before grn_code existed fall back to the entry code
+    return grn_code or entry_code
+
+
+_GRN_ITEM_FIELDS = tuple(GRNItem.model_fields)
+
+
+def _grn_items(value: Any) -> list:
+    # Stored items also carry computed totals that are not part of the API
+    return [{field: item.get(field) for field in _GRN_ITEM_FIELDS} for item in as_json_list(value)]
+
+
+_GRN_FIELDS = [
+    ("id", "id", as_str),
+    ("gate_entry_id", "gate_entry_id", as_str),
+    "entry_code",
+    ("grn_code", ("grn_code", "entry_code"), _grn_code),
+    "po_number",
+    "delivery_challan",
+    ("quantity_received", "quantity_received", as_float),
+    "remarks",
+    "status",
+    "created_by",
+    "created_by_name",
+    "created_at",
+    "updated_at",
+    "supplier_name",
+    "supplier_address",
+    "supplier_location",
+    "supplier_contact",
+    "document_status",
+    "document_date",
+    "delivery_date",
+    "period",
+    "reference",
+    "comment",
+    ("items", "items", _grn_items),
+    ("net_total", "net_total", as_float),
+    ("vat_total", "vat_total", as_float),
+    ("gross_total", "gross_total", as_float),
+]
+GRN_ROW = RowSerializer("grn", _GRN_FIELDS)
+# Exports keep the stored line items as-is, including computed totals
+GRN_EXPORT_ROW = RowSerializer(
+    "grn_export",
+    [
+        ("items", "items", as_json_list) if isinstance(field, tuple) and field[0] == "items" else field
+        for field in _GRN_FIELDS
+    ],
+)
+_serialize_grn = GRN_ROW.compile(column_names(GRN_COLUMNS))
+
+
+QUALITY_TEST_HISTORY_ROW = RowSerializer(
+    "quality_test_history",
+    [
+        ("id", "id", as_str),
+        "test_name",
+        "method",
+        "status",
+        "assigned_to",
+        "analyst_name",
+        "submitted_on",
+        "submitted_by",
+        "reviewed_by",
+        "manager_notes",
+        "result_data",
+        "qa_officer_id",
+        "qa_officer_recommendation",
+        "qa_officer_notes",
+        "qa_manager_decision",
+        "qa_manager_decision_notes",
+        "material_disposition",
+        "warehouse_action",
+        "warehouse_notes",
+        "warehouse_acknowledged_at",
+        "created_at",
+        "updated_at",
+        ("sample_id", "sample_id", as_str),
+        "entry_code",
+        "product_name",
+        "batch_number",
+        "sample_type",
+        "sample_status",
+        ("grn_id", "grn_id", as_text),
+    ],
+)
 
-def _serialize_grn_pending(row: tuple) -> dict:
-    return {
-        "grn_id": str(row[0]),
-        "entry_code": row[1],
-        "po_number": row[2],
-        "delivery_challan": row[3],
-        "quantity_received": float(row[4]) if row[4] is not None else None,
-        "remarks": row[5],
-        "status": row[6],
-        "material_name": row[7],
-        "vehicle_number": row[8],
-        "driver_name": row[9],
-        "driver_contact": row[10],
-        "gate_quantity": float(row[11]) if row[11] is not None else None,
-        "uom": row[12],
-        "gate_created_at": row[13],
-    }
 
+def _created_range_filter(
+    column: str,
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+) -> tuple[list[str], list]:
+    conditions: list[str] = []
+    params: list = []
+    if created_from:
+        conditions.append(f"{column} >= %s")
+        params.append(created_from)
+    if created_to:
+        conditions.append(f"{column} < %s")
+        params.append(created_to)
+    return conditions, params
+
+
+GRN_PENDING_ROW = RowSerializer(
+    "grn_pending",
+    [
+        ("grn_id", "grn_id", as_str),
+        "entry_code",
+        "po_number",
+        "delivery_challan",
+        ("quantity_received", "quantity_received", as_float),
+        "remarks",
+        "status",
+        "material_name",
+        "vehicle_number",
+        "driver_name",
+        "driver_contact",
+        ("gate_quantity", "gate_quantity", as_float),
+        "uom",
+        "gate_created_at",
+    ],
+)
+_SAMPLE_LIST_FIELDS = [
+    ("id", "id", as_str),
+    ("grn_id", "grn_id", as_text),
+    "entry_code",
+    "product_name",
+    "batch_number",
+    "sample_type",
+    ("sample_date", "sample_date", as_text),
+    ("due_date", "due_date", as_text),
+    "status",
+    "analyst_id",
+    "requested_by_name",
+    "priority",
+]
+UNASSIGNED_SAMPLE_ROW = RowSerializer(
+    "unassigned_sample",
+    _SAMPLE_LIST_FIELDS + ["qa_notes", ("test_count", "test_count", as_int)],
+)
+ASSIGNED_SAMPLE_ROW = RowSerializer(
+    "assigned_sample",
+    _SAMPLE_LIST_FIELDS + [("test_count", "test_count", as_int)],
+)
+MY_TEST_ROW = RowSerializer(
+    "my_test",
+    [
+        ("id", "id", as_str),
+        "test_name",
+        ("method", "method", lambda value: value or None),
+        "status",
+        ("assigned_to", "assigned_to", as_text),
+        ("instrument_id", "instrument_id", as_text),
+        ("submitted_on", "submitted_on", as_text),
+        ("reviewed_by", "reviewed_by", as_text),
+        "manager_notes",
+        "result_data",
+        ("created_at", "created_at", str),
+        ("updated_at", "updated_at", str),
+        (
+            "sample",
+            RowSerializer(
+                "my_test_sample",
+                [
+                    ("id", "sample_id", as_str),
+                    "entry_code",
+                    "product_name",
+                    "batch_number",
+                    "sample_type",
+                    ("sample_date", "sample_date", as_text),
+                    ("due_date", "due_date", as_text),
+                    ("status", "sample_status"),
+                    "priority",
+                ],
+            ),
+        ),
+    ],
+)
+_QUEUE_SAMPLE = RowSerializer(
+    "queue_sample",
+    [
+        ("id", "sample_id", as_str),
+        "entry_code",
+        "product_name",
+        "batch_number",
+        "sample_type",
+        ("sample_date", "sample_date", as_text),
+        ("due_date", "due_date", as_text),
+        "priority",
+    ],
+)
+REVIEW_QUEUE_ROW = RowSerializer(
+    "review_queue",
+    [
+        ("id", "id", as_str),
+        "test_name",
+        "method",
+        "status",
+        ("submitted_on", "submitted_on", as_text),
+        "result_data",
+        "manager_notes",
+        ("reviewed_by", "reviewed_by", as_text),
+        ("assigned_to", "assigned_to", as_text),
+        ("sample", _QUEUE_SAMPLE),
+        (
+            "analyst",
+            RowSerializer(
+                "review_queue_analyst",
+                [("id", "assigned_to", as_text), ("name", "analyst_name")],
+            ),
+        ),
+        "reviewer_name",
+        (
+            "qa_officer",
+            RowSerializer(
+                "review_queue_qa_officer",
+                [("id", "qa_officer_id", as_text), ("name", "qa_officer_name")],
+            ),
+        ),
+        "qa_officer_notes",
+        "qa_officer_recommendation",
+        "qa_manager_decision",
+        "qa_manager_decision_notes",
+        "material_disposition",
+    ],
+)
+WAREHOUSE_DECISION_ROW = RowSerializer(
+    "warehouse_decision",
+    [
+        ("id", "id", as_str),
+        "test_name",
+        "status",
+        "material_disposition",
+        "qa_manager_decision",
+        "qa_manager_decision_notes",
+        "qa_officer_notes",
+        "qa_officer_recommendation",
+        "warehouse_action",
+        "warehouse_notes",
+        ("warehouse_acknowledged_at", "warehouse_acknowledged_at", as_text),
+        ("sample", _QUEUE_SAMPLE),
+        (
+            "analyst",
+            RowSerializer(
+                "warehouse_decision_analyst",
+                [("id", None), ("name", "analyst_name")],
+            ),
+        ),
+    ],
+)
 
-def ensure_gate_entries_table() -> None:
-    table_sql = """
-        CREATE TABLE IF NOT EXISTS gate_entries (
-            id UUID PRIMARY KEY,
-            entry_code VARCHAR(16) UNIQUE NOT NULL,
-            material_name VARCHAR NOT NULL,
-            material_category VARCHAR,
-            po_number VARCHAR,
-            vehicle_name VARCHAR,
-            vehicle_number VARCHAR NOT NULL,
-            driver_name VARCHAR,
-            driver_contact VARCHAR,
-            supplier_name VARCHAR,
-            document_number VARCHAR,
-            quantity NUMERIC(12, 3),
-            uom VARCHAR,
-            remarks TEXT,
-            seal_intact BOOLEAN DEFAULT true,
-            status VARCHAR DEFAULT 'Awaiting GRN',
-            plant_id VARCHAR,
-            created_by VARCHAR,
-            created_by_name VARCHAR,
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        );
-        CREATE INDEX IF NOT EXISTS idx_gate_entries_status ON gate_entries(status);
-        CREATE INDEX IF NOT EXISTS idx_gate_entries_created_at ON gate_entries(created_at DESC);
-        CREATE INDEX IF NOT EXISTS idx_gate_entries_month ON gate_entries(entry_code);
-    """
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(table_sql)
-        conn.commit()
+# Serializers yielding (payload, keyset values) pairs for the paginated lists
+SECURITY_LOG_PAGE_ROW = SECURITY_LOG_ROW.with_key("created_at", "id")
+GRN_PAGE_ROW = GRN_ROW.with_key("created_at", "id")
+GRN_PENDING_PAGE_ROW = GRN_PENDING_ROW.with_key("created_at", "grn_id")
+UNASSIGNED_SAMPLES_PAGE_ROW = UNASSIGNED_SAMPLE_ROW.with_key("created_at", "id")
+ASSIGNED_SAMPLES_PAGE_ROW = ASSIGNED_SAMPLE_ROW.with_key("created_at", "id")
+MY_TESTS_PAGE_ROW = MY_TEST_ROW.with_key("due_sort", "created_at", "id")
+REVIEW_QUEUE_PAGE_ROW = REVIEW_QUEUE_ROW.with_key("updated_at", "id")
+WAREHOUSE_DECISIONS_PAGE_ROW = WAREHOUSE_DECISION_ROW.with_key("updated_at", "id")
 
 
 def generate_entry_code(cur, created_at: datetime) -> str:
-    month_key = created_at.strftime("%m%y")
-    cur.execute(
-        "SELECT COUNT(*) FROM gate_entries WHERE to_char(created_at, 'MMYY') = %s",
-        (month_key,),
-    )
-    seq = (cur.fetchone() or (0,))[0] + 1
-    return f"{month_key}{seq:03d}"
+    """Generate gate entry code in format MMYYXXX (e.g., 1025001)"""
+    period = entry_code_period(created_at)
+    (seq,) = allocate_numbers(cur, GATE_ENTRY_SERIES, period)
+    return format_entry_code(period, seq)
 
 
 def generate_grn_code(cur, created_at: datetime) -> str:
     """Generate GRN code in format GRN-YY-XXX (e.g., GRN-25-001)"""
-    year_suffix = created_at.strftime("%y")
-    cur.execute(
-        "SELECT COUNT(*) FROM goods_receipt_notes WHERE to_char(created_at, 'YY') = %s",
-        (year_suffix,),
-    )
-    seq = (cur.fetchone() or (0,))[0] + 1
-    return f"GRN-{year_suffix}-{seq:03d}"
-
-
-def ensure_grn_table() -> None:
-    table_sql = """
-        CREATE TABLE IF NOT EXISTS goods_receipt_notes (
-            id UUID PRIMARY KEY,
-            gate_entry_id UUID NOT NULL REFERENCES gate_entries(id) ON DELETE CASCADE,
-            entry_code VARCHAR(16) NOT NULL,
-            po_number VARCHAR NOT NULL,
-            delivery_challan VARCHAR,
-            quantity_received NUMERIC(12, 3),
-            remarks TEXT,
-            status VARCHAR DEFAULT 'Awaiting QA',
-            created_by VARCHAR,
-            created_by_name VARCHAR,
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            supplier_name VARCHAR(150),
-            supplier_address TEXT,
-            supplier_location VARCHAR(150),
-            supplier_contact VARCHAR(100),
-            document_status VARCHAR(60) DEFAULT 'Goods Received',
-            document_date DATE,
-            delivery_date DATE,
-            period VARCHAR(40),
-            reference VARCHAR(80),
-            comment TEXT,
-            items JSONB,
-            net_total NUMERIC(14, 2),
-            vat_total NUMERIC(14, 2),
-            gross_total NUMERIC(14, 2)
-        );
-        CREATE INDEX IF NOT EXISTS idx_grn_status ON goods_receipt_notes(status);
-        CREATE INDEX IF NOT EXISTS idx_grn_entry_code ON goods_receipt_notes(entry_code);
-    """
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            # Create table first (without grn_code for backward compatibility)
-            cur.execute(table_sql)
-            
-            # Check if grn_code column exists, if not add it (migration)
-            try:
-                cur.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name='goods_receipt_notes' AND column_name='grn_code';
-                """)
-                if cur.fetchone() is None:
-                    # Column doesn't exist, add it
-                    cur.execute("ALTER TABLE goods_receipt_notes ADD COLUMN grn_code VARCHAR(20);")
-                    # Populate existing rows with entry_code as fallback
-                    cur.execute("""
-                        UPDATE goods_receipt_notes 
-                        SET grn_code = entry_code 
-                        WHERE grn_code IS NULL;
-                    """)
-                    # Make it NOT NULL after populating
-                    cur.execute("ALTER TABLE goods_receipt_notes ALTER COLUMN grn_code SET NOT NULL;")
-                    # Create unique constraint
-                    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_grn_code ON goods_receipt_notes(grn_code);")
-                else:
-                    # Column exists, just ensure index exists
-                    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_grn_code ON goods_receipt_notes(grn_code);")
-            except Exception as e:
-                log_error(e, {"context": "grn_table_migration", "component": "grn_table"})
-                # If migration fails, continue - the table structure is still valid
-        conn.commit()
-
-
-def ensure_quality_samples_table() -> None:
-    """Create quality_samples table if it doesn't exist."""
-    table_sql = """
-        CREATE TABLE IF NOT EXISTS quality_samples (
-            id UUID PRIMARY KEY,
-            grn_id UUID REFERENCES goods_receipt_notes(id) ON DELETE SET NULL,
-            entry_code VARCHAR(16),
-            product_name VARCHAR(200) NOT NULL,
-            batch_number VARCHAR(100),
-            sample_type VARCHAR(50) DEFAULT 'FG',
-            sample_date DATE DEFAULT CURRENT_DATE,
-            due_date DATE,
-            status VARCHAR(50) DEFAULT 'Pending',
-            analyst_id VARCHAR(100),
-            requested_by VARCHAR(100),
-            requested_by_name VARCHAR(200),
-            priority VARCHAR(20) DEFAULT 'Medium',
-            qa_notes TEXT,
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        );
-        CREATE INDEX IF NOT EXISTS idx_quality_samples_status ON quality_samples(status);
-        CREATE INDEX IF NOT EXISTS idx_quality_samples_analyst ON quality_samples(analyst_id);
-        CREATE INDEX IF NOT EXISTS idx_quality_samples_grn ON quality_samples(grn_id);
-    """
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(table_sql)
-        conn.commit()
-
-
-def ensure_quality_tests_table() -> None:
-    """Create quality_tests table if it doesn't exist."""
-    table_sql = """
-        CREATE TABLE IF NOT EXISTS quality_tests (
-            id UUID PRIMARY KEY,
-            sample_id UUID NOT NULL REFERENCES quality_samples(id) ON DELETE CASCADE,
-            test_name VARCHAR(200) NOT NULL,
-            method VARCHAR(200),
-            status VARCHAR(50) DEFAULT 'Not Started',
-            assigned_to VARCHAR(100),
-            instrument_id VARCHAR(100),
-            submitted_on TIMESTAMP WITH TIME ZONE,
-            reviewed_by VARCHAR(100),
-            manager_notes TEXT,
-            submitted_by VARCHAR(100),
-            result_data JSONB,
-            qa_officer_id UUID,
-            qa_officer_notes TEXT,
-            qa_officer_recommendation VARCHAR(20),
-            qa_manager_decision VARCHAR(20),
-            qa_manager_decision_notes TEXT,
-            material_disposition VARCHAR(100),
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        );
-        CREATE INDEX IF NOT EXISTS idx_quality_tests_sample ON quality_tests(sample_id);
-        CREATE INDEX IF NOT EXISTS idx_quality_tests_status ON quality_tests(status);
-        CREATE INDEX IF NOT EXISTS idx_quality_tests_assigned ON quality_tests(assigned_to);
-    """
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(table_sql)
-            # Ensure result_data column exists
-            cur.execute(
-                """
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name='quality_tests' AND column_name='result_data';
-                """
-            )
-            if cur.fetchone() is None:
-                cur.execute("ALTER TABLE quality_tests ADD COLUMN result_data JSONB;")
-            # Ensure submitted_by column exists
-            cur.execute(
-                """
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name='quality_tests' AND column_name='submitted_by';
-                """
-            )
-            if cur.fetchone() is None:
-                cur.execute("ALTER TABLE quality_tests ADD COLUMN submitted_by VARCHAR(100);")
-            # QA related columns
-            cur.execute(
-                """
-                SELECT data_type
-                FROM information_schema.columns
-                WHERE table_name='quality_tests' AND column_name='qa_officer_id';
-                """
-            )
-            column_info = cur.fetchone()
-            if column_info is None:
-                cur.execute("ALTER TABLE quality_tests ADD COLUMN qa_officer_id VARCHAR(100);")
-            elif column_info[0] != "character varying":
-                cur.execute(
-                    "ALTER TABLE quality_tests ALTER COLUMN qa_officer_id TYPE VARCHAR(100) USING qa_officer_id::text;"
-                )
-
-            additional_columns = [
-                ("qa_officer_notes", "TEXT"),
-                ("qa_officer_recommendation", "VARCHAR(20)"),
-                ("qa_manager_decision", "VARCHAR(20)"),
-                ("qa_manager_decision_notes", "TEXT"),
-                ("material_disposition", "VARCHAR(100)"),
-                ("warehouse_action", "VARCHAR(20)"),
-                ("warehouse_notes", "TEXT"),
-                ("warehouse_acknowledged_at", "TIMESTAMP WITH TIME ZONE"),
-            ]
-            for column_name, column_type in additional_columns:
-                cur.execute(
-                    """
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_name='quality_tests' AND column_name=%s;
-                    """,
-                    (column_name,),
-                )
-                if cur.fetchone() is None:
-                    cur.execute(f"ALTER TABLE quality_tests ADD COLUMN {column_name} {column_type};")
-        conn.commit()
+    period = grn_code_period(created_at)
+    (seq,) = allocate_numbers(cur, GRN_SERIES, period)
+    return format_grn_code(period, seq)
 
 
-def notify_role(cur, role: str, title: str, message: str) -> None:
-    cur.execute(
-        "SELECT id FROM users WHERE role = %s AND is_active = true;",
-        (role,),
-    )
-    for (user_id,) in cur.fetchall():
-        cur.execute(
-            """
-            INSERT INTO notifications (id, user_id, title, message, type)
-            VALUES (%s, %s, %s, %s, %s);
-            """,
-            (str(uuid4()), user_id, title, message, "action"),
-        )
+def invalidate_quality_test_cache(sample_id: Any) -> None:
+    """Drop cached test lists after a quality test changes."""
+    invalidate_tags("quality-tests", f"quality-sample:{sample_id}")
 
 
 def require_role(user_role: str, allowed_roles: List[str], detail: str) -> None:
@@ -973,6 +1022,12 @@ def _ensure_security_or_warehouse_role(user_role: str) -> None:
         )
 
 
+def _invalidate_users() -> None:
+    invalidate_tags("users")
+    invalidate_user_cache()
+    reference_cache.invalidate("users")
+
+
 @app.post(
     "/api/users",
     response_model=UserResponse,
@@ -980,7 +1035,7 @@ def _ensure_security_or_warehouse_role(user_role: str) -> None:
     tags=["users"],
 )
 @limiter.limit("30/minute")
-def create_user(request: Request, user_data: UserCreate) -> dict:
+async def create_user(request: Request, user_data: UserCreate) -> dict:
     password_bytes = user_data.password.encode("utf-8")
     if len(password_bytes) > 72:
         raise HTTPException(
@@ -988,18 +1043,21 @@ def create_user(request: Request, user_data: UserCreate) -> dict:
             detail="Password cannot exceed 72 bytes when encoded.",
         )
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM users WHERE email = %s", (user_data.email.lower(),))
-            if cur.fetchone():
+    # Hashed before the connection is taken, so it does not sit idle in a
+    # transaction for the bcrypt cost
+    hashed_password = await password_hasher.hash_async(user_data.password)
+
+    async with get_async_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT 1 FROM users WHERE email = %s", (user_data.email.lower(),))
+            if await cur.fetchone():
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
                     detail="A user with this email already exists.",
                 )
 
-            hashed_password = get_password_hash(user_data.password)
             user_id = str(uuid4())
-            cur.execute(
+            await cur.execute(
                 """
                 INSERT INTO users (id, name, email, hashed_password, role, department, plant_id, is_active)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, true)
@@ -1015,11 +1073,11 @@ def create_user(request: Request, user_data: UserCreate) -> dict:
                     user_data.plant_id,
                 ),
             )
-            row = cur.fetchone()
-            conn.commit()
+            row = await cur.fetchone()
+            await conn.commit()
 
-    invalidate_cache("users*")
-    invalidate_cache("user*")
+    # Redis round trips; kept off the event loop
+    await run_in_threadpool(_invalidate_users)
     return _serialize_user_with_timestamps(row)
 
 
@@ -1033,51 +1091,71 @@ def create_user(request: Request, user_data: UserCreate) -> dict:
 def list_security_logs(
     request: Request,
     status_filter: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
     _ensure_security_or_warehouse_role(current_user["role"])
 
+    page_size = clamp_page_size(limit)
+    after = SECURITY_LOG_KEYSET.decode(cursor)
+
     params: list = []
-    where_clause = ""
+    conditions: list[str] = []
     if status_filter:
         safe_status = sanitize_string(status_filter, max_length=40)
-        where_clause = "WHERE status = %s"
+        conditions.append("status = %s")
         params.append(safe_status)
-
-    ensure_gate_entries_table()
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
+    if after:
+        keyset_sql, keyset_params = SECURITY_LOG_KEYSET.after(after)
+        conditions.append(keyset_sql)
+        params.extend(keyset_params)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(page_size + 1)
+
+    with get_db_connection(read_only=True) as conn:
+        with conn.cursor(row_factory=SECURITY_LOG_PAGE_ROW.row_factory) as cur:
             query = f"""
-                SELECT
-                    id,
-                    entry_code,
-                    material_name,
-                    material_category,
-                    po_number,
-                    vehicle_name,
-                    vehicle_number,
-                    driver_name,
-                    driver_contact,
-                    supplier_name,
-                    document_number,
-                    quantity,
-                    uom,
-                    remarks,
-                    seal_intact,
-                    status,
-                    plant_id,
-                    created_by,
-                    created_by_name,
-                    created_at
+                SELECT {SECURITY_LOG_COLUMNS}
                 FROM gate_entries
                 {where_clause}
-                ORDER BY created_at DESC
-                LIMIT 200;
+                ORDER BY {SECURITY_LOG_KEYSET.order_by()}
+                LIMIT %s;
             """
             cur.execute(query, params)
-            rows = cur.fetchall()
-            return [_serialize_security_log(row) for row in rows]
+            rows, next_cursor = paginate(
+                cur.fetchall(), page_size, SECURITY_LOG_KEYSET, itemgetter(1)
+            )
+
+    return json_page([payload for payload, _ in rows], next_cursor)
+
+
+@app.get("/api/security/logs/export", tags=["security"])
+@limiter.limit("10/minute")
+def export_security_logs(
+    request: Request,
+    format: str = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Stream the full gate entry history as NDJSON or CSV."""
+    _ensure_security_or_warehouse_role(current_user["role"])
+
+    conditions, params = _created_range_filter("created_at", created_from, created_to)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return export_response(
+        "gate_entries",
+        format,
+        f"""
+        SELECT {SECURITY_LOG_COLUMNS}
+        FROM gate_entries
+        {where_clause}
+        ORDER BY created_at, id;
+        """,
+        params,
+        _serialize_security_log,
+    )
 
 
 @app.post(
@@ -1085,11 +1163,13 @@ def list_security_logs(
     response_model=SecurityLogResponse,
     status_code=status.HTTP_201_CREATED,
     tags=["security"],
+    dependencies=[Depends(query_budget(6))],
 )
 @limiter.limit("20/minute")
 def create_security_log(
     request: Request,
     log_data: SecurityLogCreate,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     if current_user["role"] != "Security Officer":
@@ -1098,8 +1178,6 @@ def create_security_log(
             detail="Only security officers can create gate entries.",
         )
 
-    ensure_gate_entries_table()
-
     log_id = str(uuid4())
     created_at = datetime.utcnow()
 
@@ -1180,45 +1258,74 @@ def create_security_log(
             cur.execute(insert_sql, params)
             row = cur.fetchone()
 
-            cur.execute(
-                """
-                SELECT id FROM users
-                WHERE role = %s AND is_active = true;
-                """,
-                ("Warehouse Manager",),
+            notify_role(
+                cur,
+                "Warehouse Manager",
+                "Gate entry awaiting GRN",
+                f"{log_data.material_name} from {log_data.supplier_name or 'supplier'} \
+arrived via {log_data.vehicle_number}. Create GRN referencing security log {entry_code}.",
+                background_tasks,
             )
-            for (warehouse_user_id,) in cur.fetchall():
-                cur.execute(
-                    """
-                    INSERT INTO notifications (id, user_id, title, message, type)
-                    VALUES (%s, %s, %s, %s, %s);
-                    """,
-                    (
-                        str(uuid4()),
-                        warehouse_user_id,
-                        "Gate entry awaiting GRN",
-                        f"{log_data.material_name} from {log_data.supplier_name or 'supplier'} \
-arrived via {log_data.vehicle_number}. Create GRN referencing security log {entry_code}.",
-                        "action",
-                    ),
-                )
 
             conn.commit()
 
     return _serialize_security_log(row)
 
 
+# Onboarding a plant: loading its historical gate entries and GRNs
+IMPORT_ROLES = ["System Admin", "Plant Head"]
+
+
+def _run_import(kind: str, payload: ImportRequest, current_user: dict) -> dict:
+    job_id = payload.job_id or uuid4()
+    try:
+        return run_import(kind, payload.rows, current_user, job_id=job_id, rows_total=len(payload.rows))
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, {"context": "bulk_import", "kind": kind, "job_id": str(job_id)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "message": "Import failed; send the same rows with this job_id to resume",
+                "job_id": str(job_id),
+            },
+        )
+
+
+@app.post(
+    "/api/security/logs/import",
+    response_model=ImportJobResponse,
+    tags=["security"],
+)
+@limiter.limit("5/minute")
+def import_security_logs(
+    request: Request,
+    payload: ImportRequest,
+    current_user: dict = Depends(get_current_user),
+) -> dict:
+    """Load historical gate entries; rows are SecurityLogCreate fields plus created_at."""
+    require_role(
+        current_user["role"],
+        IMPORT_ROLES,
+        "Only administrators can import gate entries.",
+    )
+    return _run_import("gate_entries", payload, current_user)
+
+
 # GRN Endpoints
 @app.post(
     "/api/grn",
     response_model=GRNResponse,
     status_code=status.HTTP_201_CREATED,
     tags=["grn"],
+    dependencies=[Depends(query_budget(6))],
 )
 @limiter.limit("30/minute")
 def create_grn(
     request: Request,
     grn_data: GRNCreate,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     require_role(
@@ -1227,185 +1334,149 @@ def create_grn(
         "Only warehouse managers can create GRNs.",
     )
 
-    ensure_grn_table()
-
     grn_id = str(uuid4())
     created_at = datetime.utcnow()
     document_date = grn_data.document_date or created_at.date()
     delivery_date = grn_data.delivery_date or document_date
     document_status = grn_data.document_status or "Goods Received"
 
-    enriched_items = []
-    net_total = 0.0
-    vat_total = 0.0
-    for item in grn_data.items:
-        qty = float(item.quantity)
-        price = float(item.price)
-        net = round(qty * price, 2)
-        vat_rate = float(item.vat_rate or 0)
-        vat_amount = round(net * (vat_rate / 100), 2)
-        gross = round(net + vat_amount, 2)
-        net_total += net
-        vat_total += vat_amount
-        enriched_items.append(
-            {
-                "description": item.description,
-                "stock_code": item.stock_code,
-                "status": item.status or "GRN",
-                "quantity": qty,
-                "price": price,
-                "vat_rate": vat_rate,
-                "net": net,
-                "vat_amount": vat_amount,
-                "gross": gross,
-                "nominal": item.nominal,
-                "account": item.account,
-            }
-        )
-
-    gross_total = round(net_total + vat_total, 2)
+    enriched_items, net_total, vat_total, gross_total = grn_data.priced_items()
     items_json = json.dumps(enriched_items)
 
     with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+        with pipelined(conn) as pipeline:
+            # Claim the gate entry and allocate the GRN code in one round trip
+            gate_cur = conn.cursor()
+            gate_cur.execute(
                 """
-                SELECT id, entry_code, status, material_name, vehicle_number, supplier_name
-                FROM gate_entries
-                WHERE id = %s;
+                UPDATE gate_entries
+                SET status = 'Awaiting QA'
+                WHERE id = %s AND status = 'Awaiting GRN'
+                RETURNING id, entry_code, material_name;
                 """,
                 (grn_data.gate_entry_id,),
+                prepare=PREPARE,
             )
-            gate_row = cur.fetchone()
-            if gate_row is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Gate entry not found",
-                )
-            gate_status = gate_row[2]
-            if gate_status != "Awaiting GRN":
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail="GRN already created for this entry",
-                )
-
-            # Generate GRN code
+            cur = conn.cursor()
             grn_code = generate_grn_code(cur, created_at)
+            gate_row = gate_cur.fetchone()
 
-            cur.execute(
-                """
-                INSERT INTO goods_receipt_notes (
-                    id,
-                    gate_entry_id,
-                    entry_code,
-                    grn_code,
-                    po_number,
-                    delivery_challan,
-                    quantity_received,
-                    remarks,
-                    status,
-                    created_by,
-                    created_by_name,
-                    created_at,
-                    updated_at,
-                    supplier_name,
-                    supplier_address,
-                    supplier_location,
-                    supplier_contact,
-                    document_status,
-                    document_date,
-                    delivery_date,
-                    period,
-                    reference,
-                    comment,
-                    items,
-                    net_total,
-                    vat_total,
-                    gross_total
+            if gate_row is not None:
+                insert_cur = conn.cursor()
+                insert_cur.execute(
+                    f"""
+                    INSERT INTO goods_receipt_notes (
+                        id,
+                        gate_entry_id,
+                        entry_code,
+                        grn_code,
+                        po_number,
+                        delivery_challan,
+                        quantity_received,
+                        remarks,
+                        status,
+                        created_by,
+                        created_by_name,
+                        created_at,
+                        updated_at,
+                        supplier_name,
+                        supplier_address,
+                        supplier_location,
+                        supplier_contact,
+                        document_status,
+                        document_date,
+                        delivery_date,
+                        period,
+                        reference,
+                        comment,
+                        items,
+                        net_total,
+                        vat_total,
+                        gross_total
+                    )
+                    VALUES (
+                        %s, %s, %s, %s, %s, %s, %s, %s, 'Awaiting QA', %s, %s, %s, %s,
+                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s
+                    )
+                    RETURNING {GRN_COLUMNS};
+                    """,
+                    (
+                        grn_id,
+                        grn_data.gate_entry_id,
+                        gate_row[1],
+                        grn_code,
+                        grn_data.po_number.strip(),
+                        grn_data.delivery_challan.strip() if grn_data.delivery_challan else None,
+                        grn_data.quantity_received,
+                        grn_data.remarks,
+                        current_user["id"],
+                        current_user["name"],
+                        created_at,
+                        created_at,
+                        grn_data.supplier_name,
+                        grn_data.supplier_address,
+                        grn_data.supplier_location,
+                        grn_data.supplier_contact,
+                        document_status,
+                        document_date,
+                        delivery_date,
+                        grn_data.period,
+                        grn_data.reference,
+                        grn_data.comment,
+                        items_json,
+                        net_total,
+                        vat_total,
+                        gross_total,
+                    ),
+                    prepare=PREPARE,
                 )
-                VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, 'Awaiting QA', %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s
+                notify_role(
+                    cur,
+                    "QA Manager",
+                    "GRN awaiting QA",
+                    f"Entry {gate_row[1]} ({gate_row[2]}) is ready for QA review.",
+                    background_tasks,
+                    pipeline=pipeline,
                 )
-                RETURNING
-                    id,
-                    gate_entry_id,
-                    entry_code,
-                    grn_code,
-                    po_number,
-                    delivery_challan,
-                    quantity_received,
-                    remarks,
-                    status,
-                    created_by,
-                    created_by_name,
-                    created_at,
-                    updated_at,
-                    supplier_name,
-                    supplier_address,
-                    supplier_location,
-                    supplier_contact,
-                    document_status,
-                    document_date,
-                    delivery_date,
-                    period,
-                    reference,
-                    comment,
-                    items,
-                    net_total,
-                    vat_total,
-                    gross_total;
-                """,
-                (
-                    grn_id,
-                    grn_data.gate_entry_id,
-                    gate_row[1],
-                    grn_code,
-                    grn_data.po_number.strip(),
-                    grn_data.delivery_challan.strip() if grn_data.delivery_challan else None,
-                    grn_data.quantity_received,
-                    grn_data.remarks,
-                    current_user["id"],
-                    current_user["name"],
-                    created_at,
-                    created_at,
-                    grn_data.supplier_name,
-                    grn_data.supplier_address,
-                    grn_data.supplier_location,
-                    grn_data.supplier_contact,
-                    document_status,
-                    document_date,
-                    delivery_date,
-                    grn_data.period,
-                    grn_data.reference,
-                    grn_data.comment,
-                    items_json,
-                    net_total,
-                    vat_total,
-                    gross_total,
-                ),
-            )
-            grn_row = cur.fetchone()
 
-            cur.execute(
-                """
-                UPDATE gate_entries
-                SET status = 'Awaiting QA'
-                WHERE id = %s;
-                """,
-                (grn_data.gate_entry_id,),
+        if gate_row is None:
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM gate_entries WHERE id = %s;", (grn_data.gate_entry_id,))
+                if cur.fetchone() is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Gate entry not found",
+                    )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="GRN already created for this entry",
             )
+        grn_row = insert_cur.fetchone()
+        conn.commit()
 
-            notify_role(
-                cur,
-                "QA Manager",
-                "GRN awaiting QA",
-                f"Entry {gate_row[1]} ({gate_row[3]}) is ready for QA review.",
-            )
+    invalidate_tags("grn")
+    return _serialize_grn(grn_row)
 
-            conn.commit()
 
-    return _serialize_grn(grn_row)
+@app.post(
+    "/api/grn/import",
+    response_model=ImportJobResponse,
+    tags=["grn"],
+)
+@limiter.limit("5/minute")
+def import_grns(
+    request: Request,
+    payload: ImportRequest,
+    current_user: dict = Depends(get_current_user),
+) -> dict:
+    """Load historical GRNs for imported gate entries; rows are GRNCreate fields plus created_at."""
+    require_role(
+        current_user["role"],
+        IMPORT_ROLES,
+        "Only administrators can import GRNs.",
+    )
+    return _run_import("grns", payload, current_user)
 
 
 @app.get(
@@ -1414,8 +1485,11 @@ def create_grn(
     tags=["grn"],
 )
 @limiter.limit("60/minute")
-def get_grns_pending_qa(
+@cached(ttl=60, key_prefix="grn-pending-qa", vary_on_user="role", tags=("grn",))  # Cache for 1 minute
+async def get_grns_pending_qa(
     request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
     require_role(
@@ -1424,14 +1498,22 @@ def get_grns_pending_qa(
         "Only QA managers can view pending GRNs.",
     )
 
-    ensure_grn_table()
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
+    page_size = clamp_page_size(limit)
+    after = GRN_PENDING_QA_KEYSET.decode(cursor)
+    keyset_filter = ""
+    params: list = []
+    if after:
+        keyset_sql, params = GRN_PENDING_QA_KEYSET.after(after)
+        keyset_filter = f"AND {keyset_sql}"
+    params.append(page_size + 1)
+
+    # Tag-cached: filled from the primary (see cached)
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor(row_factory=GRN_PENDING_PAGE_ROW.row_factory) as cur:
+            await cur.execute(
+                f"""
                 SELECT
-                    grn.id,
+                    grn.id AS grn_id,
                     grn.entry_code,
                     grn.po_number,
                     grn.delivery_challan,
@@ -1442,92 +1524,122 @@ def get_grns_pending_qa(
                     gate.vehicle_number,
                     gate.driver_name,
                     gate.driver_contact,
-                    gate.quantity,
+                    gate.quantity AS gate_quantity,
                     gate.uom,
-                    gate.created_at
+                    gate.created_at AS gate_created_at,
+                    grn.created_at
                 FROM goods_receipt_notes grn
                 JOIN gate_entries gate ON gate.id = grn.gate_entry_id
                 WHERE grn.status = 'Awaiting QA'
-                ORDER BY grn.created_at ASC;
-                """
+                {keyset_filter}
+                ORDER BY {GRN_PENDING_QA_KEYSET.order_by()}
+                LIMIT %s;
+                """,
+                params,
+            )
+            rows, next_cursor = paginate(
+                await cur.fetchall(), page_size, GRN_PENDING_QA_KEYSET, itemgetter(1)
             )
-            rows = cur.fetchall()
-            return [_serialize_grn_pending(row) for row in rows]
+
+    return json_page([payload for payload, _ in rows], next_cursor)
 
 
 @app.get("/api/grn", response_model=list[GRNResponse], tags=["grn"])
 @limiter.limit("60/minute")
-def list_grn_history(
+@cached(ttl=60, key_prefix="grn-history", vary_on_user="role", tags=("grn",))  # Cache for 1 minute
+async def list_grn_history(
     request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
-    allowed_roles = [
-        "Warehouse Manager",
-        "QA Manager",
-        "QA Head",
-        "QC Manager",
-        "Plant Head",
-        "Management",
-        "System Admin",
-    ]
     require_role(
         current_user["role"],
-        allowed_roles,
+        GRN_HISTORY_ROLES,
         "You are not permitted to view GRN history.",
     )
 
-    ensure_grn_table()
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT
-                    id,
-                    gate_entry_id,
-                    entry_code,
-                    grn_code,
-                    po_number,
-                    delivery_challan,
-                    quantity_received,
-                    remarks,
-                    status,
-                    created_by,
-                    created_by_name,
-                    created_at,
-                    updated_at,
-                    supplier_name,
-                    supplier_address,
-                    supplier_location,
-                    supplier_contact,
-                    document_status,
-                    document_date,
-                    delivery_date,
-                    period,
-                    reference,
-                    comment,
-                    items,
-                    net_total,
-                    vat_total,
-                    gross_total
+    page_size = clamp_page_size(limit)
+    after = GRN_HISTORY_KEYSET.decode(cursor)
+    where_clause = ""
+    params: list = []
+    if after:
+        keyset_sql, params = GRN_HISTORY_KEYSET.after(after)
+        where_clause = f"WHERE {keyset_sql}"
+    params.append(page_size + 1)
+
+    # Tag-cached: filled from the primary (see cached)
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor(row_factory=GRN_PAGE_ROW.row_factory) as cur:
+            await cur.execute(
+                f"""
+                SELECT {GRN_COLUMNS}
                 FROM goods_receipt_notes
-                ORDER BY created_at DESC;
-                """
+                {where_clause}
+                ORDER BY {GRN_HISTORY_KEYSET.order_by()}
+                LIMIT %s;
+                """,
+                params,
+            )
+            rows, next_cursor = paginate(
+                await cur.fetchall(), page_size, GRN_HISTORY_KEYSET, itemgetter(1)
             )
-            rows = cur.fetchall()
-            return [_serialize_grn(row) for row in rows]
+
+    return json_page([payload for payload, _ in rows], next_cursor)
+
+
+@app.get("/api/grn/export", tags=["grn"])
+@limiter.limit("10/minute")
+def export_grn_history(
+    request: Request,
+    format: str = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Stream the full GRN history as NDJSON or CSV."""
+    require_role(
+        current_user["role"],
+        GRN_HISTORY_ROLES,
+        "You are not permitted to view GRN history.",
+    )
+
+    conditions, params = _created_range_filter("created_at", created_from, created_to)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return export_response(
+        "grn_history",
+        format,
+        f"""
+        SELECT {GRN_COLUMNS}
+        FROM goods_receipt_notes
+        {where_clause}
+        ORDER BY created_at, id;
+        """,
+        params,
+        GRN_EXPORT_ROW,
+    )
+
+
+# Tests created with every sampling request
+DEFAULT_SAMPLE_TESTS = (
+    ("Assay", "HPLC"),
+    ("Related Substances", "HPLC"),
+    ("Water Content", "Titration"),
+)
 
 
 @app.post(
     "/api/grn/{grn_id}/request-sampling",
     response_model=GRNResponse,
     tags=["grn"],
+    dependencies=[Depends(query_budget(7))],
 )
 @limiter.limit("30/minute")
 def request_sampling(
     grn_id: str,
     sampling_request: SamplingRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     require_role(
@@ -1536,169 +1648,141 @@ def request_sampling(
         "Only QA managers can raise sampling requests.",
     )
 
-    ensure_grn_table()
+    qa_notes_combined = sampling_request.qa_notes.strip() if sampling_request.qa_notes else None
+    sample_id = str(uuid4())
 
     with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, gate_entry_id, entry_code, status, remarks
-                FROM goods_receipt_notes
-                WHERE id = %s;
-                """,
-                (grn_id,),
-            )
-            grn_row = cur.fetchone()
-            if grn_row is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="GRN not found",
-                )
-            if grn_row[3] != "Awaiting QA":
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail="GRN already processed",
-                )
-
-            qa_notes_combined = sampling_request.qa_notes.strip() if sampling_request.qa_notes else None
-
-            cur.execute(
-                """
+        # Claim the GRN first; the sample and its tests are only queued (and
+        # sent in one batch) when the guarded UPDATE matched
+        with pipelined(conn) as pipeline:
+            grn_cur = conn.cursor()
+            grn_cur.execute(
+                f"""
                 UPDATE goods_receipt_notes
                 SET status = 'Sampling Requested',
                     remarks = COALESCE(remarks, '') || %s,
                     updated_at = NOW()
-                WHERE id = %s
-                RETURNING
-                    id,
-                    gate_entry_id,
-                    entry_code,
-                    po_number,
-                    delivery_challan,
-                    quantity_received,
-                    remarks,
-                    status,
-                    created_by,
-                    created_by_name,
-                    created_at,
-                    updated_at,
-                    supplier_name,
-                    supplier_address,
-                    supplier_location,
-                    supplier_contact,
-                    document_status,
-                    document_date,
-                    delivery_date,
-                    period,
-                    reference,
-                    comment,
-                    items,
-                    net_total,
-                    vat_total,
-                    gross_total;
+                WHERE id = %s AND status = 'Awaiting QA'
+                RETURNING {GRN_COLUMNS};
                 """,
                 (
                     f"\nQA Notes: {qa_notes_combined}" if qa_notes_combined else "",
                     grn_id,
                 ),
-            )
-            updated_row = cur.fetchone()
-
-            cur.execute(
-                """
-                UPDATE gate_entries
-                SET status = 'Sampling Requested'
-                WHERE id = %s;
-                """,
-                (grn_row[1],),
+                prepare=PREPARE,
             )
 
-            # Ensure tables exist
-            ensure_quality_samples_table()
-            ensure_quality_tests_table()
+            updated_row = grn_cur.fetchone()
 
-            # Create quality sample record from GRN
-            sample_id = str(uuid4())
-            cur.execute(
-                """
-                INSERT INTO quality_samples (
-                    id,
-                    grn_id,
-                    entry_code,
-                    product_name,
-                    batch_number,
-                    sample_type,
-                    sample_date,
-                    due_date,
-                    status,
-                    requested_by,
-                    requested_by_name,
-                    priority,
-                    created_at,
-                    updated_at
+            if updated_row is not None:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    UPDATE gate_entries
+                    SET status = 'Sampling Requested'
+                    WHERE id = %s;
+                    """,
+                    (updated_row[1],),
+                    prepare=PREPARE,
                 )
-                SELECT
-                    %s,
-                    %s,
-                    entry_code,
-                    (SELECT material_name FROM gate_entries WHERE id = gate_entry_id),
-                    entry_code,
-                    'FG',
-                    CURRENT_DATE,
-                    CURRENT_DATE + INTERVAL '3 days',
-                    'Pending',
-                    %s,
-                    %s,
-                    'Medium',
-                    NOW(),
-                    NOW()
-                FROM goods_receipt_notes
-                WHERE id = %s
-                RETURNING id;
-                """,
-                (
-                    sample_id,
-                    grn_id,
-                    current_user["id"],
-                    current_user["name"],
-                    grn_id,
-                ),
-            )
-            sample_row = cur.fetchone()
-
-            notify_role(
-                cur,
-                "QC Manager",
-                "Sampling request raised",
-                f"Entry {grn_row[2]} requires sampling. QA has requested QC action.",
-            )
 
-            # Create default tests for the sample
-            default_tests = [
-                ("Assay", "HPLC"),
-                ("Related Substances", "HPLC"),
-                ("Water Content", "Titration"),
-            ]
-            for test_name, method in default_tests:
-                test_id = str(uuid4())
+                # Create quality sample record from GRN
                 cur.execute(
+                    """
+                    INSERT INTO quality_samples (
+                        id,
+                        grn_id,
+                        entry_code,
+                        product_name,
+                        batch_number,
+                        sample_type,
+                        sample_date,
+                        due_date,
+                        status,
+                        requested_by,
+                        requested_by_name,
+                        priority,
+                        created_at,
+                        updated_at
+                    )
+                    SELECT
+                        %s,
+                        %s,
+                        entry_code,
+                        (SELECT material_name FROM gate_entries WHERE id = gate_entry_id),
+                        entry_code,
+                        'FG',
+                        CURRENT_DATE,
+                        CURRENT_DATE + INTERVAL '3 days',
+                        'Pending',
+                        %s,
+                        %s,
+                        'Medium',
+                        NOW(),
+                        NOW()
+                    FROM goods_receipt_notes
+                    WHERE id = %s;
+                    """,
+                    (
+                        sample_id,
+                        grn_id,
+                        current_user["id"],
+                        current_user["name"],
+                        grn_id,
+                    ),
+                    prepare=PREPARE,
+                )
+
+                # Create default tests for the sample
+                cur.executemany(
                     """
                     INSERT INTO quality_tests (id, sample_id, test_name, method, status, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, 'Not Started', NOW(), NOW());
+                    SELECT %s, id, %s, %s, 'Not Started', NOW(), NOW()
+                    FROM quality_samples
+                    WHERE id = %s;
                     """,
-                    (test_id, sample_id, test_name, method),
+                    [
+                        (str(uuid4()), test_name, method, sample_id)
+                        for test_name, method in DEFAULT_SAMPLE_TESTS
+                    ],
                 )
 
-            conn.commit()
+                notify_role(
+                    cur,
+                    "QC Manager",
+                    "Sampling request raised",
+                    f"Entry {updated_row[2]} requires sampling. QA has requested QC action.",
+                    background_tasks,
+                    pipeline=pipeline,
+                )
+
+        if updated_row is None:
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM goods_receipt_notes WHERE id = %s;", (grn_id,))
+                if cur.fetchone() is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="GRN not found",
+                    )
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="GRN already processed",
+            )
+        conn.commit()
 
+    invalidate_tags("grn", "quality-samples")
     return _serialize_grn(updated_row)
 
 
 # Quality Sample Assignment Endpoints
 @app.get("/api/quality-samples/unassigned", tags=["quality"])
 @limiter.limit("60/minute")
-def get_unassigned_samples(
+@cached(ttl=60, key_prefix="samples-unassigned", vary_on_user="role", tags=("quality-samples",))  # Cache for 1 minute
+async def get_unassigned_samples(
     request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
     """Get unassigned quality samples for QC Manager."""
@@ -1708,12 +1792,20 @@ def get_unassigned_samples(
         "Only QC managers can view unassigned samples.",
     )
 
-    ensure_quality_samples_table()
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
+    page_size = clamp_page_size(limit)
+    after = UNASSIGNED_SAMPLES_KEYSET.decode(cursor)
+    keyset_filter = ""
+    params: list = []
+    if after:
+        keyset_sql, params = UNASSIGNED_SAMPLES_KEYSET.after(after)
+        keyset_filter = f"AND {keyset_sql}"
+    params.append(page_size + 1)
+
+    # Tag-cached: filled from the primary (see cached)
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor(row_factory=UNASSIGNED_SAMPLES_PAGE_ROW.row_factory) as cur:
+            await cur.execute(
+                f"""
                 SELECT
                     s.id,
                     s.grn_id,
@@ -1728,41 +1820,33 @@ def get_unassigned_samples(
                     s.requested_by_name,
                     s.priority,
                     s.qa_notes,
-                    COUNT(t.id) as test_count
+                    COUNT(t.id) AS test_count,
+                    s.created_at
                 FROM quality_samples s
                 LEFT JOIN quality_tests t ON s.id = t.sample_id
                 WHERE s.analyst_id IS NULL
                 AND s.status = 'Pending'
+                {keyset_filter}
                 GROUP BY s.id
-                ORDER BY s.created_at DESC;
-                """
+                ORDER BY {UNASSIGNED_SAMPLES_KEYSET.order_by()}
+                LIMIT %s;
+                """,
+                params,
             )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": str(row[0]),
-                    "grn_id": str(row[1]) if row[1] else None,
-                    "entry_code": row[2],
-                    "product_name": row[3],
-                    "batch_number": row[4],
-                    "sample_type": row[5],
-                    "sample_date": str(row[6]) if row[6] else None,
-                    "due_date": str(row[7]) if row[7] else None,
-                    "status": row[8],
-                    "analyst_id": row[9],
-                    "requested_by_name": row[10],
-                    "priority": row[11],
-                    "qa_notes": row[12],
-                    "test_count": row[13] or 0,
-                }
-                for row in rows
-            ]
+            rows, next_cursor = paginate(
+                await cur.fetchall(), page_size, UNASSIGNED_SAMPLES_KEYSET, itemgetter(1)
+            )
+
+    return json_page([payload for payload, _ in rows], next_cursor)
 
 
 @app.get("/api/quality-samples/assigned", tags=["quality"])
 @limiter.limit("60/minute")
-def get_assigned_samples(
+@cached(ttl=60, key_prefix="samples-assigned", vary_on_user="role", tags=("quality-samples",))  # Cache for 1 minute
+async def get_assigned_samples(
     request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
     """Get assigned quality samples for Test Assignment."""
@@ -1772,13 +1856,20 @@ def get_assigned_samples(
         "Only QC managers can view assigned samples.",
     )
 
-    ensure_quality_samples_table()
-    ensure_quality_tests_table()
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
+    page_size = clamp_page_size(limit)
+    after = ASSIGNED_SAMPLES_KEYSET.decode(cursor)
+    keyset_filter = ""
+    params: list = []
+    if after:
+        keyset_sql, params = ASSIGNED_SAMPLES_KEYSET.after(after)
+        keyset_filter = f"AND {keyset_sql}"
+    params.append(page_size + 1)
+
+    # Tag-cached: filled from the primary (see cached)
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor(row_factory=ASSIGNED_SAMPLES_PAGE_ROW.row_factory) as cur:
+            await cur.execute(
+                f"""
                 SELECT
                     s.id,
                     s.grn_id,
@@ -1792,34 +1883,24 @@ def get_assigned_samples(
                     s.analyst_id,
                     s.requested_by_name,
                     s.priority,
-                    COUNT(t.id) as test_count
+                    COUNT(t.id) AS test_count,
+                    s.created_at
                 FROM quality_samples s
                 LEFT JOIN quality_tests t ON s.id = t.sample_id
                 WHERE s.analyst_id IS NOT NULL
                 AND s.status IN ('Pending', 'In Progress')
+                {keyset_filter}
                 GROUP BY s.id
-                ORDER BY s.created_at DESC;
-                """
+                ORDER BY {ASSIGNED_SAMPLES_KEYSET.order_by()}
+                LIMIT %s;
+                """,
+                params,
             )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": str(row[0]),
-                    "grn_id": str(row[1]) if row[1] else None,
-                    "entry_code": row[2],
-                    "product_name": row[3],
-                    "batch_number": row[4],
-                    "sample_type": row[5],
-                    "sample_date": str(row[6]) if row[6] else None,
-                    "due_date": str(row[7]) if row[7] else None,
-                    "status": row[8],
-                    "analyst_id": row[9],
-                    "requested_by_name": row[10],
-                    "priority": row[11],
-                    "test_count": row[12] or 0,
-                }
-                for row in rows
-            ]
+            rows, next_cursor = paginate(
+                await cur.fetchall(), page_size, ASSIGNED_SAMPLES_KEYSET, itemgetter(1)
+            )
+
+    return json_page([payload for payload, _ in rows], next_cursor)
 
 
 @app.post("/api/quality-samples/{sample_id}/assign", tags=["quality"])
@@ -1839,8 +1920,6 @@ def assign_sample_to_analyst(
 
     analyst_id = assignment.analyst_id
 
-    ensure_quality_samples_table()
-
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
@@ -1864,6 +1943,8 @@ def assign_sample_to_analyst(
                 )
 
             conn.commit()
+            # Sample status shows in the sample lists and nested in test lists
+            invalidate_tags("quality-samples", "quality-tests")
 
             return {
                 "id": str(row[0]),
@@ -1875,6 +1956,7 @@ def assign_sample_to_analyst(
 
 @app.get("/api/quality-samples/{sample_id}/tests", tags=["quality"])
 @limiter.limit("60/minute")
+@cached(ttl=60, key_prefix="sample-tests", vary_on_user="role", tags=("quality-sample:{sample_id}",))  # Cache for 1 minute
 def get_sample_tests(
     sample_id: str,
     request: Request,
@@ -1887,9 +1969,8 @@ def get_sample_tests(
         "You are not permitted to view sample tests.",
     )
 
-    ensure_quality_tests_table()
-
-    with get_db_connection() as conn:
+    # Tag-cached: filled from the primary (see cached)
+    with get_db_connection(write=False) as conn:
         with conn.cursor() as cur:
             try:
                 cur.execute(
@@ -1949,8 +2030,6 @@ def create_tests_for_sample(
         "Only QC managers can create tests.",
     )
 
-    ensure_quality_tests_table()
-
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             # Verify sample exists
@@ -1987,6 +2066,7 @@ def create_tests_for_sample(
                     })
 
             conn.commit()
+            invalidate_tags("quality-samples", "quality-tests", f"quality-sample:{sample_id}")
             return created_tests
 
 
@@ -1999,8 +2079,6 @@ def assign_test_to_employee(
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     """Assign a test to an employee."""
-    log_info(f"Assignment request received: test_id={test_id}, employee_id={assignment.employee_id}, user={current_user.get('name')}")
-    
     require_role(
         current_user["role"],
         ["QC Manager"],
@@ -2008,7 +2086,6 @@ def assign_test_to_employee(
     )
 
     employee_id = assignment.employee_id
-    log_info(f"Processing assignment: test_id={test_id}, employee_id={employee_id}")
 
     if not employee_id:
         raise HTTPException(
@@ -2016,89 +2093,43 @@ def assign_test_to_employee(
             detail="Employee ID is required",
         )
 
-    ensure_quality_tests_table()
+    # Verify employee exists
+    active_users = get_active_users()
+    employee = active_users["by_id"].get(str(employee_id))
+    if not employee:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Employee not found or inactive. ID: {employee_id}",
+        )
 
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            # First verify the test exists
-            cur.execute(
-                "SELECT id, test_name, assigned_to FROM quality_tests WHERE id = %s",
-                (test_id,),
-            )
-            test_row = cur.fetchone()
-            if not test_row:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Test not found",
-                )
-            
-            # Verify employee exists
-            log_info(f"Checking employee: {employee_id}")
-            cur.execute(
-                "SELECT id, name, role FROM users WHERE id = %s AND is_active = true",
-                (employee_id,),
-            )
-            employee_row = cur.fetchone()
-            if not employee_row:
-                # Try to find similar IDs for debugging
-                cur.execute("SELECT id, name FROM users WHERE is_active = true LIMIT 10")
-                sample_users = cur.fetchall()
-                log_error(f"Employee {employee_id} not found. Sample user IDs: {[str(u[0]) for u in sample_users]}")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Employee not found or inactive. ID: {employee_id}",
-                )
-            log_info(f"Employee found: {employee_row[1]} ({employee_row[0]}) - Role: {employee_row[2]}")
-
-            # Update the test assignment
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET assigned_to = %s,
-                    status = 'In Progress',
-                    updated_at = NOW()
-                WHERE id = %s
-                RETURNING id, test_name, assigned_to, status;
-                """
-            ,
-                (employee_id, test_id),
-            )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to update test assignment",
-                )
-
-            conn.commit()
-            
-            # Verify the update was successful
-            cur.execute(
-                "SELECT assigned_to, status FROM quality_tests WHERE id = %s",
-                (test_id,),
+            row = apply_transition(
+                cur,
+                quality_workflow.ASSIGN,
+                test_id,
+                current_user,
+                values={"assigned_to": employee_id},
+                returning=("id", "test_name", "assigned_to", "status", "sample_id"),
             )
-            verify_row = cur.fetchone()
-            # Verify assignment - handle UUID comparison
-            verify_assigned_to = str(verify_row[0]) if verify_row[0] else None
-            employee_id_str = str(employee_id)
-            
-            if not verify_row or verify_assigned_to != employee_id_str:
-                log_error(f"Assignment verification failed: expected {employee_id_str}, got {verify_assigned_to}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Assignment verification failed. Expected {employee_id_str}, got {verify_assigned_to}",
-                )
-            
-            log_info(f"✓ Test {test_id} ({row[1]}) successfully assigned to employee {employee_id} ({employee_row[1]}) by {current_user['name']}")
+        conn.commit()
+    invalidate_quality_test_cache(row[-1])
+
+    log_info(
+        "Test assigned",
+        test_id=test_id,
+        test_name=row[1],
+        employee_id=str(employee_id),
+        employee_name=employee["name"],
+        assigned_by=current_user["name"],
+    )
 
-            response_data = {
-                "id": str(row[0]),
-                "test_name": row[1],
-                "assigned_to": str(row[2]) if row[2] else None,
-                "status": row[3],
-            }
-            log_info(f"Returning response: {response_data}")
-            return response_data
+    return {
+        "id": str(row[0]),
+        "test_name": row[1],
+        "assigned_to": str(row[2]) if row[2] else None,
+        "status": row[3],
+    }
 
 
 @app.post("/api/quality-tests/{test_id}/start", tags=["quality"])
@@ -2113,80 +2144,41 @@ def start_test(
         current_user["role"],
         ["QC Operator", "QC Manager"],
         "You are not permitted to start tests.",
-    )
-
-    ensure_quality_tests_table()
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            # Verify the test exists and is assigned to the current user
-            cur.execute(
-                """
-                SELECT id, test_name, assigned_to, status 
-                FROM quality_tests 
-                WHERE id = %s
-                """,
-                (test_id,),
-            )
-            test_row = cur.fetchone()
-            if not test_row:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Test not found",
-                )
-            
-            # Check if test is assigned to current user
-            assigned_to = str(test_row[2]) if test_row[2] else None
-            if assigned_to != current_user["id"]:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="You can only start tests assigned to you.",
-                )
-            
-            # Only allow starting if status is Not Started or Pending
-            current_status = test_row[3]
-            if current_status not in ["Not Started", "Pending"]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Cannot start test with status: {current_status}",
-                )
-
-            # Update the test status to In Progress
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET status = 'In Progress',
-                    updated_at = NOW()
-                WHERE id = %s
-                RETURNING id, test_name, assigned_to, status;
-                """,
-                (test_id,),
+    )
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            row = apply_transition(
+                cur,
+                quality_workflow.START,
+                test_id,
+                current_user,
+                returning=("id", "test_name", "assigned_to", "status", "sample_id"),
             )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to update test status",
-                )
+        conn.commit()
+    invalidate_quality_test_cache(row[-1])
 
-            conn.commit()
-            
-            log_info(f"Test {test_id} ({row[1]}) started by {current_user['name']}")
+    log_info(f"Test {test_id} ({row[1]}) started by {current_user['name']}")
 
-            return {
-                "id": str(row[0]),
-                "test_name": row[1],
-                "assigned_to": str(row[2]) if row[2] else None,
-                "status": row[3],
-            }
+    return {
+        "id": str(row[0]),
+        "test_name": row[1],
+        "assigned_to": str(row[2]) if row[2] else None,
+        "status": row[3],
+    }
 
 
-@app.post("/api/quality-tests/{test_id}/submit", tags=["quality"])
+@app.post(
+    "/api/quality-tests/{test_id}/submit",
+    tags=["quality"],
+    dependencies=[Depends(query_budget(4))],
+)
 @limiter.limit("30/minute")
 def submit_test_result(
     test_id: str,
     submission: TestResultSubmitRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     """Submit a completed test for manager review."""
@@ -2196,8 +2188,6 @@ def submit_test_result(
         "You are not permitted to submit test results.",
     )
 
-    ensure_quality_tests_table()
-
     result_payload = submission.result_data or {}
     if submission.analyst_notes:
         result_payload = {
@@ -2206,87 +2196,46 @@ def submit_test_result(
         }
 
     with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT assigned_to, status, test_name
-                FROM quality_tests
-                WHERE id = %s
-                """,
-                (test_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Test not found",
-                )
-
-            assigned_to = str(row[0]) if row[0] else None
-            current_status = row[1]
-            test_name = row[2]
-
-            # Operators can only submit their assigned tests
-            if current_user["role"] == "QC Operator":
-                if not assigned_to or assigned_to != current_user["id"]:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="You can only submit tests assigned to you.",
-                    )
-
-            if current_status not in ["In Progress"]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Cannot submit test with status '{current_status}'. Start the test before submitting.",
-                )
-
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET status = 'Submitted for Review',
-                    result_data = %s,
-                    submitted_on = NOW(),
-                    submitted_by = %s,
-                    reviewed_by = NULL,
-                    manager_notes = NULL,
-                    updated_at = NOW()
-                WHERE id = %s
-                RETURNING id, test_name, status, submitted_on;
-                """,
-                (
-                    json.dumps(result_payload),
-                    current_user["id"],
-                    test_id,
-                ),
+        with pipelined(conn) as pipeline:
+            updated_row = apply_transition(
+                conn.cursor(),
+                quality_workflow.SUBMIT,
+                test_id,
+                current_user,
+                values={
+                    "result_data": json.dumps(result_payload),
+                    "submitted_by": current_user["id"],
+                    "reviewed_by": None,
+                    "manager_notes": None,
+                },
+                returning=("id", "test_name", "status", "submitted_on", "sample_id"),
             )
-            updated_row = cur.fetchone()
-            if not updated_row:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to submit test result",
-                )
-
             notify_role(
-                cur,
+                None,
                 "QC Manager",
                 "Test ready for review",
-                f"{test_name} has been submitted for review.",
+                f"{updated_row[1]} has been submitted for review.",
+                background_tasks,
+                pipeline=pipeline,
             )
+        conn.commit()
+    invalidate_quality_test_cache(updated_row[-1])
 
-            conn.commit()
-
-            return {
-                "id": str(updated_row[0]),
-                "test_name": updated_row[1],
-                "status": updated_row[2],
-                "submitted_on": str(updated_row[3]) if updated_row[3] else None,
-            }
+    return {
+        "id": str(updated_row[0]),
+        "test_name": updated_row[1],
+        "status": updated_row[2],
+        "submitted_on": str(updated_row[3]) if updated_row[3] else None,
+    }
 
 
 @app.get("/api/quality-tests/my-tests", tags=["quality"])
 @limiter.limit("60/minute")
-def get_my_tests(
+@cached(ttl=60, key_prefix="my-tests", tags=("quality-tests",))  # Cache for 1 minute
+async def get_my_tests(
     request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
     """Get tests assigned to the current user (QC Operator)."""
@@ -2296,12 +2245,21 @@ def get_my_tests(
         "You are not permitted to view assigned tests.",
     )
 
-    ensure_quality_tests_table()
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
+    page_size = clamp_page_size(limit)
+    after = MY_TESTS_KEYSET.decode(cursor)
+    keyset_filter = ""
+    params: list = [current_user["id"]]
+    if after:
+        keyset_sql, keyset_params = MY_TESTS_KEYSET.after(after)
+        keyset_filter = f"AND {keyset_sql}"
+        params.extend(keyset_params)
+    params.append(page_size + 1)
+
+    # Tag-cached: filled from the primary (see cached)
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor(row_factory=MY_TESTS_PAGE_ROW.row_factory) as cur:
+            await cur.execute(
+                f"""
                 SELECT
                     t.id,
                     t.test_name,
@@ -2312,62 +2270,43 @@ def get_my_tests(
                     t.submitted_on,
                     t.reviewed_by,
                     t.manager_notes,
-                        t.result_data,
+                    t.result_data,
                     t.created_at,
                     t.updated_at,
-                    s.id as sample_id,
+                    s.id AS sample_id,
                     s.entry_code,
                     s.product_name,
                     s.batch_number,
                     s.sample_type,
                     s.sample_date,
                     s.due_date,
-                    s.status as sample_status,
-                    s.priority
+                    s.status AS sample_status,
+                    s.priority,
+                    COALESCE(s.due_date, DATE '9999-12-31') AS due_sort
                 FROM quality_tests t
                 INNER JOIN quality_samples s ON t.sample_id = s.id
                 WHERE t.assigned_to = %s
-                ORDER BY s.due_date ASC, t.created_at ASC;
-                """
-            ,
-                (current_user["id"],),
+                {keyset_filter}
+                ORDER BY {MY_TESTS_KEYSET.order_by()}
+                LIMIT %s;
+                """,
+                params,
             )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": str(row[0]),
-                    "test_name": row[1],
-                    "method": row[2] or None,
-                    "status": row[3],
-                    "assigned_to": str(row[4]) if row[4] else None,
-                    "instrument_id": str(row[5]) if row[5] else None,
-                    "submitted_on": str(row[6]) if row[6] else None,
-                    "reviewed_by": str(row[7]) if row[7] else None,
-                    "manager_notes": row[8],
-                        "result_data": row[9],
-                        "created_at": str(row[10]),
-                        "updated_at": str(row[11]),
-                    "sample": {
-                            "id": str(row[12]),
-                            "entry_code": row[13],
-                            "product_name": row[14],
-                            "batch_number": row[15],
-                            "sample_type": row[16],
-                            "sample_date": str(row[17]) if row[17] else None,
-                            "due_date": str(row[18]) if row[18] else None,
-                            "status": row[19],
-                            "priority": row[20],
-                    },
-                }
-                for row in rows
-            ]
+            rows, next_cursor = paginate(
+                await cur.fetchall(), page_size, MY_TESTS_KEYSET, itemgetter(1)
+            )
+
+    return json_page([payload for payload, _ in rows], next_cursor)
 
 
 @app.get("/api/quality-tests/review", tags=["quality"])
 @limiter.limit("60/minute")
-def get_tests_for_review(
+@cached(ttl=60, key_prefix="review-queue", tags=("quality-tests",))  # Cache for 1 minute
+async def get_tests_for_review(
     status: str = "pending",
     stage: str = "qc",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     request: Request = None,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
@@ -2380,9 +2319,6 @@ def get_tests_for_review(
 
     stage = stage.lower()
 
-    ensure_quality_tests_table()
-    ensure_quality_samples_table()
-
     statuses: list[str]
     additional_filters: list[str] = []
     filter_params: list[Any] = []
@@ -2422,15 +2358,24 @@ def get_tests_for_review(
             detail="Invalid stage. Use 'qc', 'qa-manager', or 'qa-officer'.",
         )
 
+    page_size = clamp_page_size(limit)
+    after = REVIEW_QUEUE_KEYSET.decode(cursor)
+    if after:
+        keyset_sql, keyset_params = REVIEW_QUEUE_KEYSET.after(after)
+        additional_filters.append(keyset_sql)
+        filter_params.extend(keyset_params)
+
     where_clause = "t.status = ANY(%s)"
     params: list[Any] = [statuses]
     if additional_filters:
         where_clause += " AND " + " AND ".join(additional_filters)
         params.extend(filter_params)
+    params.append(page_size + 1)
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    # Tag-cached: filled from the primary (see cached)
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor(row_factory=REVIEW_QUEUE_PAGE_ROW.row_factory) as cur:
+            await cur.execute(
                 f"""
                 SELECT
                     t.id,
@@ -2442,7 +2387,7 @@ def get_tests_for_review(
                     t.manager_notes,
                     t.reviewed_by,
                     t.assigned_to,
-                    s.id,
+                    s.id AS sample_id,
                     s.entry_code,
                     s.product_name,
                     s.batch_number,
@@ -2450,64 +2395,32 @@ def get_tests_for_review(
                     s.sample_date,
                     s.due_date,
                     s.priority,
-                    analyst.name as analyst_name,
-                    reviewer.name as reviewer_name,
+                    analyst.name AS analyst_name,
+                    reviewer.name AS reviewer_name,
                     t.qa_officer_id,
-                    qa_officer.name as qa_officer_name,
+                    qa_officer.name AS qa_officer_name,
                     t.qa_officer_notes,
                     t.qa_officer_recommendation,
                     t.qa_manager_decision,
                     t.qa_manager_decision_notes,
-                    t.material_disposition
+                    t.material_disposition,
+                    t.updated_at
                 FROM quality_tests t
                 INNER JOIN quality_samples s ON t.sample_id = s.id
                 LEFT JOIN users analyst ON t.assigned_to = analyst.id
                 LEFT JOIN users reviewer ON t.reviewed_by = reviewer.id
                 LEFT JOIN users qa_officer ON t.qa_officer_id = qa_officer.id
                 WHERE {where_clause}
-                ORDER BY t.submitted_on DESC NULLS LAST, t.updated_at DESC;
+                ORDER BY {REVIEW_QUEUE_KEYSET.order_by()}
+                LIMIT %s;
                 """,
                 tuple(params),
             )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": str(row[0]),
-                    "test_name": row[1],
-                    "method": row[2],
-                    "status": row[3],
-                    "submitted_on": str(row[4]) if row[4] else None,
-                    "result_data": row[5],
-                    "manager_notes": row[6],
-                    "reviewed_by": str(row[7]) if row[7] else None,
-                    "assigned_to": str(row[8]) if row[8] else None,
-                    "sample": {
-                        "id": str(row[9]),
-                        "entry_code": row[10],
-                        "product_name": row[11],
-                        "batch_number": row[12],
-                        "sample_type": row[13],
-                        "sample_date": str(row[14]) if row[14] else None,
-                        "due_date": str(row[15]) if row[15] else None,
-                        "priority": row[16],
-                    },
-                    "analyst": {
-                        "id": str(row[8]) if row[8] else None,
-                        "name": row[17],
-                    },
-                    "reviewer_name": row[18],
-                    "qa_officer": {
-                        "id": str(row[19]) if row[19] else None,
-                        "name": row[20],
-                    },
-                    "qa_officer_notes": row[21],
-                    "qa_officer_recommendation": row[22],
-                    "qa_manager_decision": row[23],
-                    "qa_manager_decision_notes": row[24],
-                    "material_disposition": row[25],
-                }
-                for row in rows
-            ]
+            rows, next_cursor = paginate(
+                await cur.fetchall(), page_size, REVIEW_QUEUE_KEYSET, itemgetter(1)
+            )
+
+    return json_page([payload for payload, _ in rows], next_cursor)
 
 
 @app.post("/api/quality-tests/{test_id}/review", tags=["quality"])
@@ -2525,8 +2438,6 @@ def review_test_result(
         "Only QC managers can review tests.",
     )
 
-    ensure_quality_tests_table()
-
     status_map = {
         "Approve": "Approved",
         "Reject": "Rejected",
@@ -2544,39 +2455,24 @@ def review_test_result(
 
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET status = %s,
-                    reviewed_by = %s,
-                    manager_notes = %s,
-                    updated_at = NOW()
-                WHERE id = %s
-                AND status = 'Submitted for Review'
-                RETURNING id, test_name, status, submitted_on;
-                """,
-                (
-                    new_status,
-                    current_user["id"],
-                    review.manager_notes,
-                    test_id,
-                ),
+            row = apply_transition(
+                cur,
+                quality_workflow.REVIEW,
+                test_id,
+                current_user,
+                values={"reviewed_by": current_user["id"], "manager_notes": review.manager_notes},
+                returning=("id", "test_name", "status", "submitted_on", "sample_id"),
+                to_status=new_status,
             )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Test not found or not pending review.",
-                )
-
-            conn.commit()
+        conn.commit()
+    invalidate_quality_test_cache(row[-1])
 
-            return {
-                "id": str(row[0]),
-                "test_name": row[1],
-                "status": row[2],
-                "submitted_on": str(row[3]) if row[3] else None,
-            }
+    return {
+        "id": str(row[0]),
+        "test_name": row[1],
+        "status": row[2],
+        "submitted_on": str(row[3]) if row[3] else None,
+    }
 
 
 @app.post("/api/quality-tests/{test_id}/qa-assign", tags=["quality"])
@@ -2594,60 +2490,43 @@ def assign_qa_officer_to_test(
         "Only QA managers can assign QA officers.",
     )
 
-    ensure_quality_tests_table()
+    officer = get_active_users()["by_id"].get(str(assignment.officer_id))
+    if not officer or "QA Operator" not in (officer["role"] or ""):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="QA officer not found or inactive.",
+        )
 
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id, role FROM users WHERE id = %s AND is_active = true",
-                (assignment.officer_id,),
-            )
-            officer_row = cur.fetchone()
-            if not officer_row or "QA Operator" not in (officer_row[1] or ""):
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="QA officer not found or inactive.",
-                )
-
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET qa_officer_id = %s,
-                    qa_officer_notes = %s,
-                    status = 'QA Officer Review',
-                    updated_at = NOW()
-                WHERE id = %s
-                AND status IN ('Submitted to QA Manager', 'QA Recommendation Submitted')
-                RETURNING id, test_name, status;
-                """,
-                (
-                    assignment.officer_id,
-                    assignment.notes,
-                    test_id,
-                ),
+            row = apply_transition(
+                cur,
+                quality_workflow.QA_ASSIGN,
+                test_id,
+                current_user,
+                values={"qa_officer_id": assignment.officer_id, "qa_officer_notes": assignment.notes},
             )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Test not found or not eligible for QA assignment.",
-                )
-
-            conn.commit()
+        conn.commit()
+    invalidate_quality_test_cache(row[-1])
 
-            return {
-                "id": str(row[0]),
-                "test_name": row[1],
-                "status": row[2],
-            }
+    return {
+        "id": str(row[0]),
+        "test_name": row[1],
+        "status": row[2],
+    }
 
 
-@app.post("/api/quality-tests/{test_id}/qa-officer-review", tags=["quality"])
+@app.post(
+    "/api/quality-tests/{test_id}/qa-officer-review",
+    tags=["quality"],
+    dependencies=[Depends(query_budget(4))],
+)
 @limiter.limit("30/minute")
 def qa_officer_review_test(
     test_id: str,
     review: QaOfficerReviewRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     """QA officer submits a recommendation."""
@@ -2657,71 +2536,47 @@ def qa_officer_review_test(
         "Only QA officers can submit recommendations.",
     )
 
-    ensure_quality_tests_table()
-
     with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT qa_officer_id, status FROM quality_tests WHERE id = %s",
-                (test_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Test not found.",
-                )
-
-            qa_officer_id, status_value = row
-            if str(qa_officer_id) != current_user["id"]:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="You are not assigned to this test.",
-                )
-
-            if status_value != "QA Officer Review":
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="This test is not awaiting QA officer review.",
-                )
-
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET qa_officer_recommendation = %s,
-                    qa_officer_notes = %s,
-                    status = 'QA Recommendation Submitted',
-                    updated_at = NOW()
-                WHERE id = %s
-                RETURNING id, test_name, status;
-                """,
-                (
-                    review.recommendation,
-                    review.notes,
-                    test_id,
-                ),
+        with pipelined(conn) as pipeline:
+            updated = apply_transition(
+                conn.cursor(),
+                quality_workflow.QA_OFFICER_REVIEW,
+                test_id,
+                current_user,
+                values={
+                    "qa_officer_recommendation": review.recommendation,
+                    "qa_officer_notes": review.notes,
+                },
             )
-            updated = cur.fetchone()
             notify_role(
-                cur,
+                None,
                 "QA Manager",
                 "QA recommendation submitted",
                 f"{updated[1]} now has a QA officer recommendation awaiting your decision.",
+                background_tasks,
+                pipeline=pipeline,
             )
-            conn.commit()
-            return {
-                "id": str(updated[0]),
-                "test_name": updated[1],
-                "status": updated[2],
-            }
+        conn.commit()
+    invalidate_quality_test_cache(updated[-1])
+
+    return {
+        "id": str(updated[0]),
+        "test_name": updated[1],
+        "status": updated[2],
+    }
 
 
-@app.post("/api/quality-tests/{test_id}/qa-manager-decision", tags=["quality"])
+@app.post(
+    "/api/quality-tests/{test_id}/qa-manager-decision",
+    tags=["quality"],
+    dependencies=[Depends(query_budget(6))],
+)
 @limiter.limit("30/minute")
 def qa_manager_decision(
     test_id: str,
     decision: QaManagerDecisionRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     """QA manager final decision."""
@@ -2731,9 +2586,6 @@ def qa_manager_decision(
         "Only QA managers can finalize QA review.",
     )
 
-    ensure_quality_tests_table()
-    ensure_quality_samples_table()
-
     new_status = (
         "Accepted - Warehouse" if decision.decision == "Approve" else "Rejected - Return to Supplier"
     )
@@ -2743,52 +2595,31 @@ def qa_manager_decision(
     sample_status = "Passed" if decision.decision == "Approve" else "Failed"
 
     with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT sample_id, status FROM quality_tests WHERE id = %s",
-                (test_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Test not found.",
-                )
-            sample_id, current_status = row
-            if current_status != "QA Recommendation Submitted":
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Await QA officer recommendation before taking a final decision.",
-                )
-
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET status = %s,
-                    qa_manager_decision = %s,
-                    qa_manager_decision_notes = %s,
-                    material_disposition = %s,
-                    updated_at = NOW()
-                WHERE id = %s
-                RETURNING id, test_name, status;
-                """,
-                (
-                    new_status,
-                    decision.decision,
-                    decision.notes,
-                    material_disposition,
-                    test_id,
-                ),
+        with pipelined(conn) as pipeline:
+            test_row = apply_transition(
+                conn.cursor(),
+                quality_workflow.QA_MANAGER_DECISION,
+                test_id,
+                current_user,
+                values={
+                    "qa_manager_decision": decision.decision,
+                    "qa_manager_decision_notes": decision.notes,
+                    "material_disposition": material_disposition,
+                },
+                to_status=new_status,
             )
-            test_row = cur.fetchone()
+            sample_id = test_row[-1]
 
             notify_role(
-                cur,
+                None,
                 "Warehouse Manager",
                 "Material disposition decided",
                 f"{test_row[1]}: QA manager {decision.decision.lower()}ed the lot ({material_disposition}).",
+                background_tasks,
+                pipeline=pipeline,
             )
 
+            cur = conn.cursor()
             if sample_id:
                 cur.execute(
                     """
@@ -2798,43 +2629,45 @@ def qa_manager_decision(
                     WHERE id = %s;
                     """,
                     (sample_status, sample_id),
+                    prepare=PREPARE,
                 )
 
             cur.execute(
-                "SELECT id FROM users WHERE role = %s AND is_active = true;",
-                ("Warehouse Manager",),
+                """
+                INSERT INTO tasks (id, title, description, status, priority, assigned_to, assigned_by, due_date, component)
+                SELECT gen_random_uuid()::text, %s, %s, %s, %s, id, %s, NOW() + INTERVAL '1 day', %s
+                FROM users
+                WHERE role = %s AND is_active = true;
+                """,
+                (
+                    f"{decision.decision} material - {test_row[1]}",
+                    f"{test_row[1]} for sample {sample_id or '-'} requires warehouse action ({material_disposition}).",
+                    "Pending",
+                    "High",
+                    current_user["id"],
+                    "qa_manager_decision",
+                    "Warehouse Manager",
+                ),
+                prepare=PREPARE,
             )
-            warehouse_managers = cur.fetchall()
-            for (manager_id,) in warehouse_managers:
-                cur.execute(
-                    """
-                    INSERT INTO tasks (id, title, description, status, priority, assigned_to, assigned_by, due_date, component)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, NOW() + INTERVAL '1 day', %s);
-                    """,
-                    (
-                        str(uuid4()),
-                        f"{decision.decision} material - {test_row[1]}",
-                        f"{test_row[1]} for sample {sample_id or '-'} requires warehouse action ({material_disposition}).",
-                        "Pending",
-                        "High",
-                        manager_id,
-                        current_user["id"],
-                        "qa_manager_decision",
-                    ),
-                )
+        conn.commit()
+    invalidate_quality_test_cache(sample_id)
+    invalidate_tags("quality-samples")
 
-            conn.commit()
+    return {
+        "id": str(test_row[0]),
+        "test_name": test_row[1],
+        "status": test_row[2],
+    }
 
-            return {
-                "id": str(test_row[0]),
-                "test_name": test_row[1],
-                "status": test_row[2],
-            }
 
 @app.get("/api/quality-tests/warehouse-decisions", tags=["quality"])
 @limiter.limit("30/minute")
-def get_warehouse_decisions(
+@cached(ttl=60, key_prefix="warehouse-decisions", vary_on_user="role", tags=("quality-tests",))  # Cache for 1 minute
+async def get_warehouse_decisions(
     status: str = "pending",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     request: Request = None,
     current_user: dict = Depends(get_current_user),
 ) -> list[dict]:
@@ -2851,14 +2684,21 @@ def get_warehouse_decisions(
             detail="Invalid status filter. Use 'pending' or 'completed'.",
         )
 
-    ensure_quality_tests_table()
-    ensure_quality_samples_table()
-
     action_filter = "t.warehouse_action IS NULL" if status == "pending" else "t.warehouse_action IS NOT NULL"
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    page_size = clamp_page_size(limit)
+    after = WAREHOUSE_DECISIONS_KEYSET.decode(cursor)
+    params: list[Any] = [["Accepted - Warehouse", "Rejected - Return to Supplier"]]
+    if after:
+        keyset_sql, keyset_params = WAREHOUSE_DECISIONS_KEYSET.after(after)
+        action_filter += f" AND {keyset_sql}"
+        params.extend(keyset_params)
+    params.append(page_size + 1)
+
+    # Tag-cached: filled from the primary (see cached)
+    async with get_async_db_connection(write=False) as conn:
+        async with conn.cursor(row_factory=WAREHOUSE_DECISIONS_PAGE_ROW.row_factory) as cur:
+            await cur.execute(
                 f"""
                 SELECT
                     t.id,
@@ -2872,7 +2712,7 @@ def get_warehouse_decisions(
                     t.warehouse_action,
                     t.warehouse_notes,
                     t.warehouse_acknowledged_at,
-                    s.id,
+                    s.id AS sample_id,
                     s.entry_code,
                     s.product_name,
                     s.batch_number,
@@ -2880,52 +2720,86 @@ def get_warehouse_decisions(
                     s.sample_date,
                     s.due_date,
                     s.priority,
-                    analyst.name as analyst_name
+                    analyst.name AS analyst_name,
+                    t.updated_at
                 FROM quality_tests t
                 INNER JOIN quality_samples s ON t.sample_id = s.id
                 LEFT JOIN users analyst ON t.assigned_to = analyst.id
                 WHERE t.status = ANY(%s)
                 AND {action_filter}
-                ORDER BY t.updated_at DESC;
+                ORDER BY {WAREHOUSE_DECISIONS_KEYSET.order_by()}
+                LIMIT %s;
                 """,
-                (
-                    [
-                        "Accepted - Warehouse",
-                        "Rejected - Return to Supplier",
-                    ],
-                ),
+                params,
             )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": str(row[0]),
-                    "test_name": row[1],
-                    "status": row[2],
-                    "material_disposition": row[3],
-                    "qa_manager_decision": row[4],
-                    "qa_manager_decision_notes": row[5],
-                    "qa_officer_notes": row[6],
-                    "qa_officer_recommendation": row[7],
-                    "warehouse_action": row[8],
-                    "warehouse_notes": row[9],
-                    "warehouse_acknowledged_at": str(row[10]) if row[10] else None,
-                    "sample": {
-                        "id": str(row[11]),
-                        "entry_code": row[12],
-                        "product_name": row[13],
-                        "batch_number": row[14],
-                        "sample_type": row[15],
-                        "sample_date": str(row[16]) if row[16] else None,
-                        "due_date": str(row[17]) if row[17] else None,
-                        "priority": row[18],
-                    },
-                    "analyst": {
-                        "id": None,
-                        "name": row[19],
-                    },
-                }
-                for row in rows
-            ]
+            rows, next_cursor = paginate(
+                await cur.fetchall(), page_size, WAREHOUSE_DECISIONS_KEYSET, itemgetter(1)
+            )
+
+    return json_page([payload for payload, _ in rows], next_cursor)
+
+
+@app.get("/api/quality-tests/export", tags=["quality"])
+@limiter.limit("10/minute")
+def export_quality_test_history(
+    request: Request,
+    format: str = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Stream the full QC/QA test history as NDJSON or CSV."""
+    require_role(
+        current_user["role"],
+        QC_HISTORY_ROLES,
+        "You are not permitted to export QC history.",
+    )
+
+    conditions, params = _created_range_filter("t.created_at", created_from, created_to)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return export_response(
+        "quality_tests",
+        format,
+        f"""
+        SELECT
+            t.id,
+            t.test_name,
+            t.method,
+            t.status,
+            t.assigned_to,
+            analyst.name AS analyst_name,
+            t.submitted_on,
+            t.submitted_by,
+            t.reviewed_by,
+            t.manager_notes,
+            t.result_data,
+            t.qa_officer_id,
+            t.qa_officer_recommendation,
+            t.qa_officer_notes,
+            t.qa_manager_decision,
+            t.qa_manager_decision_notes,
+            t.material_disposition,
+            t.warehouse_action,
+            t.warehouse_notes,
+            t.warehouse_acknowledged_at,
+            t.created_at,
+            t.updated_at,
+            s.id AS sample_id,
+            s.entry_code,
+            s.product_name,
+            s.batch_number,
+            s.sample_type,
+            s.status AS sample_status,
+            s.grn_id
+        FROM quality_tests t
+        INNER JOIN quality_samples s ON t.sample_id = s.id
+        LEFT JOIN users analyst ON t.assigned_to = analyst.id
+        {where_clause}
+        ORDER BY t.created_at, t.id;
+        """,
+        params,
+        QUALITY_TEST_HISTORY_ROW,
+    )
 
 
 @app.post("/api/quality-tests/{test_id}/warehouse-action", tags=["quality"])
@@ -2943,56 +2817,18 @@ def record_warehouse_action(
         "Only warehouse managers can perform this action.",
     )
 
-    ensure_quality_tests_table()
-
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT status, warehouse_action
-                FROM quality_tests
-                WHERE id = %s;
-                """,
-                (test_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Test not found.",
-                )
-
-            current_status, current_action = row
-            if current_status not in {"Accepted - Warehouse", "Rejected - Return to Supplier"}:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="This test is not awaiting warehouse action.",
-                )
-
-            if current_action:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Warehouse action already recorded.",
-                )
-
-            cur.execute(
-                """
-                UPDATE quality_tests
-                SET warehouse_action = %s,
-                    warehouse_notes = %s,
-                    warehouse_acknowledged_at = NOW(),
-                    updated_at = NOW()
-                WHERE id = %s
-                RETURNING id, test_name, warehouse_action, warehouse_notes;
-                """,
-                (
-                    action.action,
-                    action.notes,
-                    test_id,
-                ),
+            updated = apply_transition(
+                cur,
+                quality_workflow.WAREHOUSE_ACTION,
+                test_id,
+                current_user,
+                values={"warehouse_action": action.action, "warehouse_notes": action.notes},
+                returning=("id", "test_name", "warehouse_action", "warehouse_notes", "sample_id"),
             )
-            updated = cur.fetchone()
         conn.commit()
+    invalidate_quality_test_cache(updated[-1])
 
     return {
         "id": str(updated[0]),
@@ -1,8 +1,8 @@
 """
 Database initialization script.
 
-This script creates all necessary tables in the PostgreSQL database.
-Run this once to set up the database schema.
+This script applies the schema migrations (see migrations/runner.py) and
+seeds the demo users and plants. Safe to run repeatedly.
 
 Usage:
     python -m backend.migrations.init_db
@@ -18,7 +18,8 @@ sys.path.insert(0, str(ROOT_DIR))
 
 from dotenv import load_dotenv
 import psycopg
-from psycopg.rows import dict_row
+
+from .runner import MigrationRunner
 
 # Load environment variables
 load_dotenv(ROOT_DIR / ".env", override=False)
@@ -31,99 +32,11 @@ DATABASE_URL = os.getenv(
 
 
 def create_tables():
-    """Create all database tables."""
-    with psycopg.connect(DATABASE_URL) as conn:
-        with conn.cursor() as cur:
-            # Enable UUID extension
-            cur.execute("CREATE EXTENSION IF NOT EXISTS \"uuid-ossp\";")
-
-            # Users table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id VARCHAR PRIMARY KEY,
-                    name VARCHAR NOT NULL,
-                    email VARCHAR UNIQUE NOT NULL,
-                    hashed_password VARCHAR NOT NULL,
-                    role VARCHAR NOT NULL,
-                    department VARCHAR NOT NULL,
-                    plant_id VARCHAR,
-                    is_active BOOLEAN DEFAULT true,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP WITH TIME ZONE
-                );
-                CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
-            """)
-
-            # Plants table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS plants (
-                    id VARCHAR PRIMARY KEY,
-                    name VARCHAR NOT NULL,
-                    region VARCHAR NOT NULL,
-                    running_lines INTEGER DEFAULT 0,
-                    oee NUMERIC(5, 2) DEFAULT 0,
-                    yield_value NUMERIC(5, 2) DEFAULT 0,
-                    open_qa_holds INTEGER DEFAULT 0,
-                    inventory_value NUMERIC(15, 2) DEFAULT 0,
-                    manager_id VARCHAR,
-                    last_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-
-            # Production batches table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS production_batches (
-                    id VARCHAR PRIMARY KEY,
-                    product_name VARCHAR NOT NULL,
-                    batch_number VARCHAR UNIQUE NOT NULL,
-                    status VARCHAR NOT NULL,
-                    start_date TIMESTAMP WITH TIME ZONE NOT NULL,
-                    end_date TIMESTAMP WITH TIME ZONE,
-                    quantity NUMERIC(10, 2) NOT NULL,
-                    unit VARCHAR NOT NULL,
-                    assigned_to VARCHAR,
-                    officer_id VARCHAR,
-                    plant_id VARCHAR NOT NULL,
-                    qa_release_status VARCHAR DEFAULT 'Pending',
-                    bmr_status VARCHAR DEFAULT 'Incomplete',
-                    final_yield NUMERIC(5, 2),
-                    qa_officer_id VARCHAR,
-                    hold_reason TEXT,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP WITH TIME ZONE
-                );
-                CREATE INDEX IF NOT EXISTS idx_batches_batch_number ON production_batches(batch_number);
-                CREATE INDEX IF NOT EXISTS idx_batches_plant_id ON production_batches(plant_id);
-            """)
-
-            # Materials table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS materials (
-                    id VARCHAR PRIMARY KEY,
-                    name VARCHAR NOT NULL,
-                    type VARCHAR NOT NULL,
-                    default_unit VARCHAR NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-
-            # Notifications table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id VARCHAR PRIMARY KEY,
-                    user_id VARCHAR NOT NULL,
-                    title VARCHAR NOT NULL,
-                    message TEXT NOT NULL,
-                    type VARCHAR DEFAULT 'info',
-                    is_read BOOLEAN DEFAULT false,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    read_at TIMESTAMP WITH TIME ZONE
-                );
-                CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications(user_id);
-            """)
-
-            conn.commit()
-            print("✅ Database tables created successfully!")
+    """Bring the schema up to date by applying the pending migrations."""
+    applied = MigrationRunner(DATABASE_URL).upgrade()
+    for migration in applied:
+        print(f"   applied {migration.path.name}")
+    print("✅ Database schema is up to date!")
 
 
 def seed_initial_data():
@@ -0,0 +1,69 @@
+-- Core tables, formerly created by migrations/init_db.py. Ids are generated
+-- with gen_random_uuid() (built in since PostgreSQL 13), so the uuid-ossp
+-- extension is not needed.
+
+CREATE TABLE IF NOT EXISTS users (
+    id VARCHAR PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    email VARCHAR UNIQUE NOT NULL,
+    hashed_password VARCHAR NOT NULL,
+    role VARCHAR NOT NULL,
+    department VARCHAR NOT NULL,
+    plant_id VARCHAR,
+    is_active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS plants (
+    id VARCHAR PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    region VARCHAR NOT NULL,
+    running_lines INTEGER DEFAULT 0,
+    oee NUMERIC(5, 2) DEFAULT 0,
+    yield_value NUMERIC(5, 2) DEFAULT 0,
+    open_qa_holds INTEGER DEFAULT 0,
+    inventory_value NUMERIC(15, 2) DEFAULT 0,
+    manager_id VARCHAR,
+    last_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS production_batches (
+    id VARCHAR PRIMARY KEY,
+    product_name VARCHAR NOT NULL,
+    batch_number VARCHAR UNIQUE NOT NULL,
+    status VARCHAR NOT NULL,
+    start_date TIMESTAMP WITH TIME ZONE NOT NULL,
+    end_date TIMESTAMP WITH TIME ZONE,
+    quantity NUMERIC(10, 2) NOT NULL,
+    unit VARCHAR NOT NULL,
+    assigned_to VARCHAR,
+    officer_id VARCHAR,
+    plant_id VARCHAR NOT NULL,
+    qa_release_status VARCHAR DEFAULT 'Pending',
+    bmr_status VARCHAR DEFAULT 'Incomplete',
+    final_yield NUMERIC(5, 2),
+    qa_officer_id VARCHAR,
+    hold_reason TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS materials (
+    id VARCHAR PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    type VARCHAR NOT NULL,
+    default_unit VARCHAR NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id VARCHAR PRIMARY KEY,
+    user_id VARCHAR NOT NULL,
+    title VARCHAR NOT NULL,
+    message TEXT NOT NULL,
+    type VARCHAR DEFAULT 'info',
+    is_read BOOLEAN DEFAULT false,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    read_at TIMESTAMP WITH TIME ZONE
+);
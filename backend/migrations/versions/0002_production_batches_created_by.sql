@@ -0,0 +1,3 @@
+-- production-service records the creating user, but the column was never
+-- part of the schema. Nullable without a default: a catalog-only change.
+ALTER TABLE production_batches ADD COLUMN IF NOT EXISTS created_by VARCHAR;
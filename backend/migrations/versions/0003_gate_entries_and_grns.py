@@ -0,0 +1,107 @@
+"""
+Gate entries and goods receipt notes.
+
+grn_code was added after GRNs existed; legacy rows take their entry code.
+The column is backfilled in batches and made NOT NULL through a validated
+CHECK constraint, so no step holds an exclusive lock while scanning the
+table.
+"""
+
+TRANSACTIONAL = False
+
+
+def upgrade(ctx) -> None:
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS gate_entries (
+            id UUID PRIMARY KEY,
+            entry_code VARCHAR(16) UNIQUE NOT NULL,
+            material_name VARCHAR NOT NULL,
+            material_category VARCHAR,
+            po_number VARCHAR,
+            vehicle_name VARCHAR,
+            vehicle_number VARCHAR NOT NULL,
+            driver_name VARCHAR,
+            driver_contact VARCHAR,
+            supplier_name VARCHAR,
+            document_number VARCHAR,
+            quantity NUMERIC(12, 3),
+            uom VARCHAR,
+            remarks TEXT,
+            seal_intact BOOLEAN DEFAULT true,
+            status VARCHAR DEFAULT 'Awaiting GRN',
+            plant_id VARCHAR,
+            created_by VARCHAR,
+            created_by_name VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    ctx.create_index_concurrently("idx_gate_entries_status", "gate_entries", "(status)")
+    ctx.create_index_concurrently("idx_gate_entries_created_at", "gate_entries", "(created_at DESC)")
+    ctx.create_index_concurrently("idx_gate_entries_month", "gate_entries", "(entry_code)")
+    ctx.create_index_concurrently("idx_gate_entries_created_id", "gate_entries", "(created_at DESC, id DESC)")
+    ctx.create_index_concurrently(
+        "idx_gate_entries_status_created_id", "gate_entries", "(status, created_at DESC, id DESC)"
+    )
+
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS goods_receipt_notes (
+            id UUID PRIMARY KEY,
+            gate_entry_id UUID NOT NULL REFERENCES gate_entries(id) ON DELETE CASCADE,
+            entry_code VARCHAR(16) NOT NULL,
+            po_number VARCHAR NOT NULL,
+            delivery_challan VARCHAR,
+            quantity_received NUMERIC(12, 3),
+            remarks TEXT,
+            status VARCHAR DEFAULT 'Awaiting QA',
+            created_by VARCHAR,
+            created_by_name VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            supplier_name VARCHAR(150),
+            supplier_address TEXT,
+            supplier_location VARCHAR(150),
+            supplier_contact VARCHAR(100),
+            document_status VARCHAR(60) DEFAULT 'Goods Received',
+            document_date DATE,
+            delivery_date DATE,
+            period VARCHAR(40),
+            reference VARCHAR(80),
+            comment TEXT,
+            items JSONB,
+            net_total NUMERIC(14, 2),
+            vat_total NUMERIC(14, 2),
+            gross_total NUMERIC(14, 2)
+        )
+        """
+    )
+    ctx.execute("ALTER TABLE goods_receipt_notes ADD COLUMN IF NOT EXISTS grn_code VARCHAR(20)")
+    (nullable,) = ctx.execute(
+        """
+        SELECT is_nullable = 'YES'
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'goods_receipt_notes' AND column_name = 'grn_code'
+        """
+    ).fetchone()
+    if nullable:
+        ctx.backfill("goods_receipt_notes", "grn_code = entry_code", "grn_code IS NULL")
+        ctx.execute(
+            """
+            ALTER TABLE goods_receipt_notes DROP CONSTRAINT IF EXISTS goods_receipt_notes_grn_code_not_null;
+            ALTER TABLE goods_receipt_notes
+                ADD CONSTRAINT goods_receipt_notes_grn_code_not_null CHECK (grn_code IS NOT NULL) NOT VALID;
+            """
+        )
+        # Scans under a lock that still allows reads and writes; SET NOT NULL
+        # then relies on the validated constraint instead of scanning again
+        ctx.execute("ALTER TABLE goods_receipt_notes VALIDATE CONSTRAINT goods_receipt_notes_grn_code_not_null")
+        ctx.execute("ALTER TABLE goods_receipt_notes ALTER COLUMN grn_code SET NOT NULL")
+        ctx.execute("ALTER TABLE goods_receipt_notes DROP CONSTRAINT goods_receipt_notes_grn_code_not_null")
+
+    ctx.create_index_concurrently("idx_grn_code", "goods_receipt_notes", "(grn_code)", unique=True)
+    ctx.create_index_concurrently("idx_grn_status", "goods_receipt_notes", "(status)")
+    ctx.create_index_concurrently("idx_grn_entry_code", "goods_receipt_notes", "(entry_code)")
+    ctx.create_index_concurrently("idx_grn_created_id", "goods_receipt_notes", "(created_at DESC, id DESC)")
+    ctx.create_index_concurrently("idx_grn_status_created_id", "goods_receipt_notes", "(status, created_at, id)")
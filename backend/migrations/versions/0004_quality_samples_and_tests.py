@@ -0,0 +1,89 @@
+"""
+Quality samples and tests, including the QA review and warehouse columns
+added over time.
+"""
+
+TRANSACTIONAL = False
+
+QUALITY_TEST_COLUMNS = [
+    ("result_data", "JSONB"),
+    ("submitted_by", "VARCHAR(100)"),
+    ("qa_officer_id", "VARCHAR(100)"),
+    ("qa_officer_notes", "TEXT"),
+    ("qa_officer_recommendation", "VARCHAR(20)"),
+    ("qa_manager_decision", "VARCHAR(20)"),
+    ("qa_manager_decision_notes", "TEXT"),
+    ("material_disposition", "VARCHAR(100)"),
+    ("warehouse_action", "VARCHAR(20)"),
+    ("warehouse_notes", "TEXT"),
+    ("warehouse_acknowledged_at", "TIMESTAMP WITH TIME ZONE"),
+]
+
+
+def upgrade(ctx) -> None:
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quality_samples (
+            id UUID PRIMARY KEY,
+            grn_id UUID REFERENCES goods_receipt_notes(id) ON DELETE SET NULL,
+            entry_code VARCHAR(16),
+            product_name VARCHAR(200) NOT NULL,
+            batch_number VARCHAR(100),
+            sample_type VARCHAR(50) DEFAULT 'FG',
+            sample_date DATE DEFAULT CURRENT_DATE,
+            due_date DATE,
+            status VARCHAR(50) DEFAULT 'Pending',
+            analyst_id VARCHAR(100),
+            requested_by VARCHAR(100),
+            requested_by_name VARCHAR(200),
+            priority VARCHAR(20) DEFAULT 'Medium',
+            qa_notes TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    ctx.create_index_concurrently("idx_quality_samples_status", "quality_samples", "(status)")
+    ctx.create_index_concurrently("idx_quality_samples_analyst", "quality_samples", "(analyst_id)")
+    ctx.create_index_concurrently("idx_quality_samples_grn", "quality_samples", "(grn_id)")
+    ctx.create_index_concurrently(
+        "idx_quality_samples_status_created_id", "quality_samples", "(status, created_at DESC, id DESC)"
+    )
+
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quality_tests (
+            id UUID PRIMARY KEY,
+            sample_id UUID NOT NULL REFERENCES quality_samples(id) ON DELETE CASCADE,
+            test_name VARCHAR(200) NOT NULL,
+            method VARCHAR(200),
+            status VARCHAR(50) DEFAULT 'Not Started',
+            assigned_to VARCHAR(100),
+            instrument_id VARCHAR(100),
+            submitted_on TIMESTAMP WITH TIME ZONE,
+            reviewed_by VARCHAR(100),
+            manager_notes TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    # Nullable columns without defaults: catalog-only changes
+    for column, column_type in QUALITY_TEST_COLUMNS:
+        ctx.execute(f"ALTER TABLE quality_tests ADD COLUMN IF NOT EXISTS {column} {column_type}")
+    # Early databases created qa_officer_id as UUID, but user ids are strings.
+    # This rewrites the table; it only runs on those databases.
+    if ctx.column_type("quality_tests", "qa_officer_id") != "character varying":
+        ctx.execute(
+            "ALTER TABLE quality_tests ALTER COLUMN qa_officer_id TYPE VARCHAR(100) USING qa_officer_id::text"
+        )
+
+    ctx.create_index_concurrently("idx_quality_tests_sample", "quality_tests", "(sample_id)")
+    ctx.create_index_concurrently("idx_quality_tests_status", "quality_tests", "(status)")
+    ctx.create_index_concurrently("idx_quality_tests_assigned", "quality_tests", "(assigned_to)")
+    ctx.create_index_concurrently(
+        "idx_quality_tests_status_updated_id", "quality_tests", "(status, updated_at DESC, id DESC)"
+    )
+    ctx.create_index_concurrently(
+        "idx_quality_tests_assigned_created_id", "quality_tests", "(assigned_to, created_at, id)"
+    )
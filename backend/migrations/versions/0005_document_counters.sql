@@ -0,0 +1,27 @@
+-- Per-series, per-period counters used by document_numbers.allocate_numbers,
+-- seeded from the codes already issued
+CREATE TABLE IF NOT EXISTS document_counters (
+    series VARCHAR(40) NOT NULL,
+    period VARCHAR(10) NOT NULL,
+    last_value INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (series, period)
+);
+
+-- Gate entry codes are MMYY followed by the sequence number
+INSERT INTO document_counters (series, period, last_value)
+SELECT 'gate_entry', left(entry_code, 4), MAX(substring(entry_code FROM 5)::int)
+FROM gate_entries
+WHERE entry_code ~ '^[0-9]{5,}$'
+GROUP BY left(entry_code, 4)
+ON CONFLICT (series, period)
+DO UPDATE SET last_value = GREATEST(document_counters.last_value, EXCLUDED.last_value);
+
+-- GRN codes are GRN-YY-XXX; legacy rows carry the entry code instead
+INSERT INTO document_counters (series, period, last_value)
+SELECT 'grn', split_part(grn_code, '-', 2), MAX(split_part(grn_code, '-', 3)::int)
+FROM goods_receipt_notes
+WHERE grn_code ~ '^GRN-[0-9]{2}-[0-9]+$'
+GROUP BY split_part(grn_code, '-', 2)
+ON CONFLICT (series, period)
+DO UPDATE SET last_value = GREATEST(document_counters.last_value, EXCLUDED.last_value);
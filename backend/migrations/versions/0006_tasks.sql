@@ -0,0 +1,15 @@
+-- Warehouse follow-up tasks raised by QA manager decisions. The table was
+-- written to by the backend but never created by it.
+CREATE TABLE IF NOT EXISTS tasks (
+    id VARCHAR PRIMARY KEY,
+    title VARCHAR,
+    description TEXT,
+    status VARCHAR,
+    priority VARCHAR,
+    assigned_to VARCHAR,
+    assigned_by VARCHAR,
+    due_date TIMESTAMP WITH TIME ZONE,
+    component VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
@@ -0,0 +1,33 @@
+-- Version counters and change notifications for reference_cache: every
+-- statement changing users, plants or materials bumps the table's version
+-- and NOTIFYs the workers
+CREATE TABLE IF NOT EXISTS reference_versions (
+    table_name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_reference_version() RETURNS trigger AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    INSERT INTO reference_versions (table_name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name)
+    DO UPDATE SET version = reference_versions.version + 1
+    RETURNING version INTO new_version;
+    PERFORM pg_notify('reference_versions', TG_TABLE_NAME || ':' || new_version);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER reference_version_bump
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_version();
+
+CREATE OR REPLACE TRIGGER reference_version_bump
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON plants
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_version();
+
+CREATE OR REPLACE TRIGGER reference_version_bump
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON materials
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_version();
@@ -0,0 +1,41 @@
+"""
+Lookup and listing indexes on the core tables, formerly built by the
+application in the background after startup.
+"""
+
+TRANSACTIONAL = False
+
+# (index, table, definition)
+INDEXES = [
+    # Users table indexes
+    ("idx_users_email", "users", "(email)"),
+    ("idx_users_department", "users", "(department)"),
+    ("idx_users_plant_id", "users", "(plant_id)"),
+    ("idx_users_role", "users", "(role)"),
+    ("idx_users_active", "users", "(is_active) WHERE is_active = true"),
+
+    # Production batches indexes
+    ("idx_batches_batch_number", "production_batches", "(batch_number)"),
+    ("idx_batches_plant_id", "production_batches", "(plant_id)"),
+    ("idx_batches_status", "production_batches", "(status)"),
+    ("idx_batches_created_at", "production_batches", "(created_at DESC)"),
+    ("idx_batches_assigned_to", "production_batches", "(assigned_to)"),
+    ("idx_batches_plant_status", "production_batches", "(plant_id, status)"),
+    ("idx_batches_plant_date", "production_batches", "(plant_id, created_at DESC)"),
+    ("idx_batches_created_id", "production_batches", "(created_at DESC, id DESC)"),
+    ("idx_batches_plant_created_id", "production_batches", "(plant_id, created_at DESC, id DESC)"),
+
+    # Notifications indexes
+    ("idx_notifications_user_id", "notifications", "(user_id)"),
+    ("idx_notifications_created_at", "notifications", "(created_at DESC)"),
+    ("idx_notifications_unread", "notifications", "(user_id, is_read) WHERE is_read = false"),
+
+    # Materials indexes
+    ("idx_materials_type", "materials", "(type)"),
+    ("idx_materials_name", "materials", "(name)"),
+]
+
+
+def upgrade(ctx) -> None:
+    for name, table, definition in INDEXES:
+        ctx.create_index_concurrently(name, table, definition)
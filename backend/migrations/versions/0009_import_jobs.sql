@@ -0,0 +1,18 @@
+-- Bulk import jobs (bulk_import). checkpoint is the number of input rows
+-- already consumed, committed together with each loaded batch, so a failed
+-- import resumes where it stopped
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id UUID PRIMARY KEY,
+    kind VARCHAR(40) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    checkpoint INTEGER NOT NULL DEFAULT 0,
+    rows_total INTEGER,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,
+    rows_rejected INTEGER NOT NULL DEFAULT 0,
+    errors JSONB NOT NULL DEFAULT '[]'::jsonb,
+    error TEXT,
+    created_by VARCHAR,
+    created_by_name VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
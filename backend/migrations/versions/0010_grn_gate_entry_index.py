@@ -0,0 +1,10 @@
+"""
+Index on goods_receipt_notes.gate_entry_id, the foreign key bulk_import
+uses to check whether a gate entry already has a GRN.
+"""
+
+TRANSACTIONAL = False
+
+
+def upgrade(ctx) -> None:
+    ctx.create_index_concurrently("idx_grn_gate_entry_id", "goods_receipt_notes", "(gate_entry_id)")
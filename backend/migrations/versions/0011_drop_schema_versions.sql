@@ -0,0 +1,5 @@
+-- The per-process schema registry (schema_versions) was an interim step
+-- before this migration runner; no release since the runner reads or writes
+-- the table, which was only kept for workers of the previous release during
+-- the rolling deploy
+DROP TABLE IF EXISTS schema_versions;
@@ -6,12 +6,16 @@ This module provides structured logging, metrics collection, and error tracking.
 
 import json
 import logging
+import queue
+import random
 import sys
+import threading
 from datetime import datetime
-from typing import Any, Dict, Optional
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
 from pythonjsonlogger import jsonlogger
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
-from fastapi import Request, Response
+from prometheus_client import CollectorRegistry, Counter, Histogram, Gauge, generate_latest, multiprocess
+from fastapi import Request
 from fastapi.responses import Response as FastAPIResponse
 import os
 
@@ -49,9 +53,84 @@ logger.setLevel(logging.INFO)
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 logger.setLevel(getattr(logging, log_level, logging.INFO))
 
+# Once start_log_listener() has run, records are queued and written by a
+# background thread; when the queue is full they are dropped (and counted)
+# rather than blocking the request
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of successful requests within their latency objective that get an
+# access log line; errors (status >= 400) and slow requests are always logged
+LOG_ACCESS_SAMPLE_RATE = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that never blocks: a record that does not fit is dropped."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments and render the traceback now; the JSON
+        # formatter on the listener thread does the rest
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.labels(level=record.levelname).inc()
+
+
+_log_listener: Optional[QueueListener] = None
+_log_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def start_log_listener() -> None:
+    """Move log output off the calling thread (once per worker, at startup)."""
+    global _log_listener, _log_queue_handler
+    if _log_listener is not None:
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _log_queue_handler = DroppingQueueHandler(log_queue)
+    _log_listener = QueueListener(log_queue, logHandler, respect_handler_level=True)
+    _log_listener.start()
+    logger.addHandler(_log_queue_handler)
+    logger.removeHandler(logHandler)
+
+
+def stop_log_listener() -> None:
+    """Write out the queued records and log synchronously again (at shutdown)."""
+    global _log_listener, _log_queue_handler
+    if _log_listener is None:
+        return
+    logger.addHandler(logHandler)
+    logger.removeHandler(_log_queue_handler)
+    _log_listener.stop()
+    _log_listener = None
+    _log_queue_handler = None
+
+
+def _forget_log_listener() -> None:
+    # A forked child has the queue but not the listener thread
+    global _log_listener, _log_queue_handler
+    if _log_listener is not None:
+        logger.addHandler(logHandler)
+        logger.removeHandler(_log_queue_handler)
+    _log_listener = None
+    _log_queue_handler = None
+
+
+os.register_at_fork(after_in_child=_forget_log_listener)
+
 
 # Prometheus metrics
-# HTTP metrics
+# Under serve.py each worker process writes its samples to files in this
+# directory and /metrics aggregates them. Gauges declare how worker values
+# combine (multiprocess_mode); "live" modes drop exited workers.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# HTTP metrics (endpoint is the route template, e.g. /api/quality-tests/{test_id}/start)
 http_requests_total = Counter(
     "http_requests_total",
     "Total number of HTTP requests",
@@ -62,7 +141,29 @@ http_request_duration_seconds = Histogram(
     "http_request_duration_seconds",
     "HTTP request duration in seconds",
     ["method", "endpoint"],
-    buckets=[0.1, 0.5, 1.0, 2.5, 5.0, 10.0]
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+
+http_request_slo_total = Counter(
+    "http_request_slo_total",
+    "Requests by whether they met the route's latency objective",
+    ["method", "endpoint", "outcome"]  # outcome: met, slow, error (5xx)
+)
+
+http_route_labels_overflow_total = Counter(
+    "http_route_labels_overflow_total",
+    "Requests recorded under the overflow label because the route cap was reached"
+)
+
+log_records_dropped_total = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+    ["level"]
+)
+
+http_access_logs_sampled_out_total = Counter(
+    "http_access_logs_sampled_out_total",
+    "Successful requests not written to the access log (LOG_ACCESS_SAMPLE_RATE)"
 )
 
 # Database metrics
@@ -72,22 +173,193 @@ db_query_duration_seconds = Histogram(
     ["query_type"]
 )
 
+db_statement_duration_seconds = Histogram(
+    "db_statement_duration_seconds",
+    "Statement execution time by normalized statement fingerprint",
+    ["fingerprint", "verb"],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+
+db_statement_rows = Histogram(
+    "db_statement_rows",
+    "Rows returned or affected per statement",
+    ["fingerprint"],
+    buckets=[0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000]
+)
+
+db_statement_info = Gauge(
+    "db_statement_info",
+    "Normalized statement text for each fingerprint (always 1)",
+    ["fingerprint", "statement"],
+    multiprocess_mode="livemax"
+)
+
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "Database statements executed per HTTP request",
+    ["endpoint"],
+    buckets=[0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100]
+)
+
 db_connections_active = Gauge(
     "db_connections_active",
-    "Number of active database connections"
+    "Number of active database connections",
+    multiprocess_mode="livesum"
+)
+
+# Connection pool metrics (pool: sync, async)
+db_pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check out a pooled connection",
+    ["pool"],
+    buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+
+db_pool_size = Gauge(
+    "db_pool_size",
+    "Connections currently open in the pool",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+db_pool_idle = Gauge(
+    "db_pool_idle",
+    "Idle connections available in the pool",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+db_pool_waiting = Gauge(
+    "db_pool_waiting",
+    "Requests waiting for a pooled connection",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+db_pool_checkout_failures_total = Counter(
+    "db_pool_checkout_failures_total",
+    "Connection checkouts rejected because the pool was exhausted",
+    ["pool", "reason"]  # reason: timeout, too_many_waiting
+)
+
+db_read_routing_total = Counter(
+    "db_read_routing_total",
+    "Read-only connections by the server that handled them (READ_DATABASE_URL set)",
+    ["target", "reason"]  # replica/ok; primary/sticky, lag, unavailable
+)
+
+db_replica_lag_seconds = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of the read replica at the last check",
+    multiprocess_mode="livemax",
+)
+
+db_maintenance_runs_total = Counter(
+    "db_maintenance_runs_total",
+    "Background maintenance (ANALYZE) runs",
+    ["task", "outcome"]  # task: analyze; outcome: done, skipped, error
+)
+
+app_boot_seconds = Gauge(
+    "app_boot_seconds",
+    "Worker boot time by phase",
+    ["phase"],  # import, startup, total
+    multiprocess_mode="liveall"
+)
+
+# Notification metrics
+notification_fanout_rows = Histogram(
+    "notification_fanout_rows",
+    "Notifications created per fan-out event",
+    ["role", "mode"],
+    buckets=[0, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 5000]
+)
+
+# Export metrics
+export_rows_total = Counter(
+    "export_rows_total",
+    "Rows streamed by export endpoints",
+    ["export", "format"]
+)
+
+# Bulk import metrics
+import_rows_total = Counter(
+    "import_rows_total",
+    "Rows processed by bulk imports",
+    ["kind", "outcome"]  # outcome: loaded, rejected
+)
+
+# Auth metrics
+auth_cache_requests_total = Counter(
+    "auth_cache_requests_total",
+    "Authentication cache lookups",
+    ["cache", "result"]  # cache: token, user; result: hit, miss
+)
+
+# Reference cache metrics
+reference_cache_loads_total = Counter(
+    "reference_cache_loads_total",
+    "Reference data loads from the database",
+    ["name", "reason"]  # reason: miss, bypass (listener down or table untracked)
+)
+
+reference_cache_invalidations_total = Counter(
+    "reference_cache_invalidations_total",
+    "Reference table change notifications received",
+    ["table"]
+)
+
+reference_cache_listener_up = Gauge(
+    "reference_cache_listener_up",
+    "1 while this worker is listening for reference table changes",
+    multiprocess_mode="livemin"
+)
+
+# Password hashing metrics
+password_hash_pending = Gauge(
+    "password_hash_pending",
+    "Password hash operations queued or running",
+    multiprocess_mode="livesum"
+)
+
+password_hash_wait_seconds = Histogram(
+    "password_hash_wait_seconds",
+    "Time password hash operations wait for a worker",
+    ["operation"],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+
+password_hash_duration_seconds = Histogram(
+    "password_hash_duration_seconds",
+    "Password hash operation duration",
+    ["operation"],
+    buckets=[0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0]
+)
+
+password_hash_rejections_total = Counter(
+    "password_hash_rejections_total",
+    "Password hash operations rejected because the queue was full",
+    ["operation"]
+)
+
+password_rehashes_total = Counter(
+    "password_rehashes_total",
+    "Stored password hashes upgraded to the configured cost on login"
 )
 
 # Business metrics
 users_total = Gauge(
     "users_total",
     "Total number of users",
-    ["status"]  # active, inactive
+    ["status"],  # active, inactive
+    multiprocess_mode="livemostrecent"
 )
 
 batches_total = Gauge(
     "batches_total",
     "Total number of batches",
-    ["status", "plant_id"]
+    ["status", "plant_id"],
+    multiprocess_mode="livemostrecent"
 )
 
 # Cache metrics
@@ -104,19 +376,112 @@ cache_misses_total = Counter(
 )
 
 
-def log_request(request: Request, response: Response, duration: float):
-    """Log HTTP request with structured data."""
-    logger.info(
-        "HTTP request",
-        extra={
-            "method": request.method,
-            "path": request.url.path,
-            "status_code": response.status_code,
-            "duration_ms": duration * 1000,
-            "client_ip": request.client.host if request.client else None,
-            "user_agent": request.headers.get("user-agent"),
-        }
-    )
+# Label values for requests that did not match a route / exceeded the cap
+UNMATCHED_ROUTE = "<unmatched>"
+OVERFLOW_ROUTE = "<other>"
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+# Distinct (method, route) label pairs before new ones collapse into OVERFLOW_ROUTE
+HTTP_METRICS_MAX_ROUTES = int(os.getenv("HTTP_METRICS_MAX_ROUTES", "500"))
+# Latency objective in seconds, with per-route overrides ("/api/grn/export=5,...")
+HTTP_SLO_SECONDS = float(os.getenv("HTTP_SLO_SECONDS", "0.3"))
+
+
+def _parse_slo_overrides(value: str) -> Dict[str, float]:
+    overrides = {}
+    for item in value.split(","):
+        route, _, seconds = item.rpartition("=")
+        if route.strip() and seconds.strip():
+            overrides[route.strip()] = float(seconds)
+    return overrides
+
+
+HTTP_SLO_OVERRIDES = _parse_slo_overrides(os.getenv("HTTP_SLO_OVERRIDES", ""))
+
+_route_labels: Dict[Tuple[str, str], Tuple[str, str]] = {}
+_route_labels_lock = threading.Lock()
+
+
+def route_labels(request: Request) -> Tuple[str, str]:
+    """
+    Return bounded (method, endpoint) metric labels for a request.
+
+    The endpoint is the matched route template, never the raw path, so
+    path parameters do not create new series. Unknown methods, unmatched
+    paths and routes beyond HTTP_METRICS_MAX_ROUTES share fixed labels.
+    """
+    method = request.method if request.method in HTTP_METHODS else "OTHER"
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", None) or UNMATCHED_ROUTE
+    key = (method, endpoint)
+    labels = _route_labels.get(key)
+    if labels is None:
+        with _route_labels_lock:
+            labels = _route_labels.get(key)
+            if labels is None:
+                if len(_route_labels) < HTTP_METRICS_MAX_ROUTES:
+                    labels = _route_labels[key] = key
+                else:
+                    labels = (method, OVERFLOW_ROUTE)
+                    http_route_labels_overflow_total.inc()
+    return labels
+
+
+def record_http_request(
+    request: Request,
+    status_code: int,
+    duration: float,
+    db_queries: Optional[int] = None,
+) -> None:
+    """Record request count, latency and SLO outcome under route-template labels."""
+    method, endpoint = route_labels(request)
+    http_requests_total.labels(
+        method=method,
+        endpoint=endpoint,
+        status_code=status_code
+    ).inc()
+    http_request_duration_seconds.labels(
+        method=method,
+        endpoint=endpoint
+    ).observe(duration)
+    if status_code >= 500:
+        outcome = "error"
+    elif duration <= HTTP_SLO_OVERRIDES.get(endpoint, HTTP_SLO_SECONDS):
+        outcome = "met"
+    else:
+        outcome = "slow"
+    http_request_slo_total.labels(method=method, endpoint=endpoint, outcome=outcome).inc()
+    if db_queries is not None:
+        db_queries_per_request.labels(endpoint=endpoint).observe(db_queries)
+
+
+def log_request(request: Request, status_code: int, duration: float, context: Any = None):
+    """
+    Log HTTP request with structured data.
+
+    Successful requests within their latency objective are sampled at
+    LOG_ACCESS_SAMPLE_RATE; errors and slow requests are always logged.
+    """
+    sample_rate = None
+    if status_code < 400 and LOG_ACCESS_SAMPLE_RATE < 1.0:
+        _method, endpoint = route_labels(request)
+        if duration <= HTTP_SLO_OVERRIDES.get(endpoint, HTTP_SLO_SECONDS):
+            if random.random() >= LOG_ACCESS_SAMPLE_RATE:
+                http_access_logs_sampled_out_total.inc()
+                return
+            sample_rate = LOG_ACCESS_SAMPLE_RATE
+    extra = {
+        "method": request.method,
+        "path": request.scope["path"],
+        "status_code": status_code,
+        "duration_ms": duration * 1000,
+        "client_ip": request.client.host if request.client else None,
+        "user_agent": request.headers.get("user-agent"),
+    }
+    if context is not None:
+        extra.update(context.log_fields())
+    if sample_rate is not None:
+        extra["sample_rate"] = sample_rate
+    logger.info("HTTP request", extra=extra)
 
 
 def log_error(error: Exception, context: Optional[Dict[str, Any]] = None):
@@ -144,9 +509,15 @@ def log_warning(message: str, **kwargs):
 
 # Metrics endpoint for Prometheus
 def get_metrics_response() -> FastAPIResponse:
-    """Get Prometheus metrics."""
+    """Get Prometheus metrics (aggregated across workers in multiprocess mode)."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        content = generate_latest(registry)
+    else:
+        content = generate_latest()
     return FastAPIResponse(
-        content=generate_latest(),
+        content=content,
         media_type="text/plain"
     )
 
@@ -0,0 +1,160 @@
+"""
+Notification fan-out.
+
+Workflow steps notify everyone holding a role. Instead of selecting the
+users and inserting one notification per row, fan-out is a single
+INSERT ... SELECT (or COPY for large explicit audiences). Fan-out can also be
+deferred until after the response so it stays out of the business
+transaction.
+"""
+
+import os
+from typing import Optional, Sequence
+from uuid import uuid4
+
+from fastapi import BackgroundTasks
+
+from database_optimization import PREPARE, Pipeline, get_db_connection
+
+try:
+    from monitoring import log_error, notification_fanout_rows
+except ImportError:
+    # Fallback if monitoring not available
+    log_error = None
+    notification_fanout_rows = None
+
+# "inline" fans out inside the caller's transaction, "deferred" after the response
+NOTIFICATION_FANOUT_MODE = os.getenv("NOTIFICATION_FANOUT_MODE", "inline").lower()
+
+# Explicit audiences at least this large are loaded with COPY
+COPY_FANOUT_THRESHOLD = int(os.getenv("NOTIFICATION_COPY_THRESHOLD", "500"))
+
+
+def _record_fanout(role: str, mode: str, rows: int) -> None:
+    if notification_fanout_rows:
+        notification_fanout_rows.labels(role=role, mode=mode).observe(rows)
+
+
+def fan_out_to_role(
+    cur,
+    role: str,
+    title: str,
+    message: str,
+    notification_type: str = "action",
+) -> int:
+    """
+    Notify every active user with a role in one statement.
+
+    Returns:
+        Number of notifications created
+    """
+    cur.execute(
+        """
+        INSERT INTO notifications (id, user_id, title, message, type)
+        SELECT gen_random_uuid()::text, id, %s, %s, %s
+        FROM users
+        WHERE role = %s AND is_active = true;
+        """,
+        (title, message, notification_type, role),
+        prepare=PREPARE,
+    )
+    return max(cur.rowcount, 0)
+
+
+def fan_out_to_users(
+    cur,
+    user_ids: Sequence[str],
+    title: str,
+    message: str,
+    notification_type: str = "action",
+) -> int:
+    """
+    Notify an explicit list of users.
+
+    Small audiences use a single INSERT ... SELECT over unnest(); audiences of
+    COPY_FANOUT_THRESHOLD or more are streamed with COPY.
+
+    Returns:
+        Number of notifications created
+    """
+    if not user_ids:
+        return 0
+
+    if len(user_ids) >= COPY_FANOUT_THRESHOLD:
+        with cur.copy(
+            "COPY notifications (id, user_id, title, message, type) FROM STDIN"
+        ) as copy:
+            for user_id in user_ids:
+                copy.write_row((str(uuid4()), user_id, title, message, notification_type))
+        return len(user_ids)
+
+    cur.execute(
+        """
+        INSERT INTO notifications (id, user_id, title, message, type)
+        SELECT gen_random_uuid()::text, user_id, %s, %s, %s
+        FROM unnest(%s::text[]) AS user_id;
+        """,
+        (title, message, notification_type, list(user_ids)),
+    )
+    return max(cur.rowcount, 0)
+
+
+def deferred_fan_out_to_role(
+    role: str,
+    title: str,
+    message: str,
+    notification_type: str = "action",
+) -> int:
+    """Fan out to a role in a separate, short transaction (background task)."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                rows = fan_out_to_role(cur, role, title, message, notification_type)
+            conn.commit()
+    except Exception as e:
+        if log_error:
+            log_error(e, {"context": "deferred_notification_fanout", "role": role})
+        return 0
+    _record_fanout(role, "deferred", rows)
+    return rows
+
+
+def notify_role(
+    cur,
+    role: str,
+    title: str,
+    message: str,
+    background_tasks: Optional[BackgroundTasks] = None,
+    notification_type: str = "action",
+    pipeline: Optional[Pipeline] = None,
+) -> int:
+    """
+    Notify every active user with a role.
+
+    In "deferred" mode, and when the handler passes its BackgroundTasks, the
+    fan-out runs after the response in its own transaction. Otherwise it runs
+    inline as one statement in the caller's transaction.
+
+    Inside a pipeline the statement is only queued on its own cursor; the
+    row count is recorded once the pipeline has synced.
+
+    Returns:
+        Number of notifications created inline (0 when deferred or pipelined)
+    """
+    if background_tasks is not None and NOTIFICATION_FANOUT_MODE == "deferred":
+        background_tasks.add_task(
+            deferred_fan_out_to_role, role, title, message, notification_type
+        )
+        return 0
+
+    if pipeline is not None:
+        fanout_cur = pipeline.conn.cursor()
+        fan_out_to_role(fanout_cur, role, title, message, notification_type)
+        pipeline.after_sync(
+            lambda: _record_fanout(role, "inline", max(fanout_cur.rowcount, 0))
+        )
+        return 0
+
+    rows = fan_out_to_role(cur, role, title, message, notification_type)
+    _record_fanout(role, "inline", rows)
+    return rows
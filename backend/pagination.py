@@ -0,0 +1,129 @@
+"""
+Keyset pagination utilities.
+
+List endpoints page on an ordered key such as (created_at, id) instead of
+OFFSET, so every page costs one index range scan regardless of how deep the
+client has paged. The position is handed to clients as an opaque cursor.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Response, status
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Parsers checking cursor values against their column's Postgres type, so a
+# tampered cursor is rejected here instead of failing the query
+_CURSOR_PARSERS: Dict[str, Callable[[str], Any]] = {
+    "timestamptz": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "uuid": UUID,
+    "integer": int,
+    "bigint": int,
+}
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """
+    Ordered key used for keyset pagination.
+
+    Attributes:
+        name: Identifies the listing; cursors from other listings are rejected
+        columns: (SQL expression, Postgres type) pairs, most significant first
+        descending: Whether the listing is newest first
+    """
+    name: str
+    columns: Tuple[Tuple[str, str], ...]
+    descending: bool = True
+
+    def order_by(self) -> str:
+        """ORDER BY clause body for this keyset."""
+        direction = "DESC" if self.descending else "ASC"
+        return ", ".join(f"{expr} {direction}" for expr, _ in self.columns)
+
+    def after(self, values: Sequence[str]) -> Tuple[str, list]:
+        """WHERE condition selecting rows strictly after the cursor position."""
+        operator = "<" if self.descending else ">"
+        exprs = ", ".join(expr for expr, _ in self.columns)
+        placeholders = ", ".join(f"%s::{pg_type}" for _, pg_type in self.columns)
+        return f"({exprs}) {operator} ({placeholders})", list(values)
+
+    def encode(self, values: Sequence[Any]) -> str:
+        """Encode a row's key values as an opaque cursor."""
+        payload = json.dumps(
+            [self.name, [_cursor_value(value) for value in values]],
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode(self, cursor: Optional[str]) -> Optional[List[str]]:
+        """Decode a cursor produced by encode(); None means the first page."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            name, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if name != self.name or not isinstance(values, list) or len(values) != len(self.columns):
+                raise ValueError("cursor does not belong to this listing")
+            for value, (_, pg_type) in zip(values, self.columns):
+                if not isinstance(value, str):
+                    raise ValueError("cursor values are strings")
+                if pg_type in _CURSOR_PARSERS:
+                    _CURSOR_PARSERS[pg_type](value)
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor.",
+            )
+        return values
+
+
+def _cursor_value(value: Any) -> str:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Bound a client supplied page size to [1, MAX_PAGE_SIZE]."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def paginate(
+    rows: list,
+    page_size: int,
+    keyset: Keyset,
+    key: Callable[[Any], Sequence[Any]],
+) -> Tuple[list, Optional[str]]:
+    """
+    Split a result fetched with LIMIT page_size + 1 into a page and cursor.
+
+    Args:
+        rows: Rows fetched with one extra row beyond the page size
+        page_size: Requested page size
+        keyset: Keyset the query was ordered by
+        key: Extracts the keyset values from a row
+
+    Returns:
+        Tuple of (rows for this page, cursor for the next page or None)
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    return page, keyset.encode(key(page[-1]))
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next page cursor as a response header."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
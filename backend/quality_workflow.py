@@ -0,0 +1,238 @@
+"""
+Quality test lifecycle.
+
+The allowed transitions of a quality test are declared once in TRANSITIONS.
+Each transition is applied as a single conditional statement::
+
+    UPDATE quality_tests SET status = ..., ...
+    WHERE id = %s AND status = ANY(<allowed>) [AND <owner / guard>]
+    RETURNING ...
+
+so the check and the write cannot race with a concurrent transition. When
+nothing matches, one read of the test explains why (404, 403 or 400); the
+successful path never reads the row first.
+
+    Not Started / Pending -> In Progress -> Submitted for Review
+        -> Approved | Rejected | Returned for Correction
+        -> Submitted to QA Manager -> QA Officer Review
+        -> QA Recommendation Submitted
+        -> Accepted - Warehouse | Rejected - Return to Supplier
+        -> (warehouse action recorded)
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from psycopg import sql
+
+from database_optimization import PREPARE
+
+
+class Transition(NamedTuple):
+    """One edge (or fan of edges) of the quality test lifecycle."""
+
+    name: str
+    from_statuses: Tuple[str, ...]
+    # Allowed target statuses; empty when the transition keeps the status
+    to_statuses: Tuple[str, ...]
+    invalid_status_detail: str
+    # Column that must hold the acting user's id, and the roles it applies to
+    # (None: every role)
+    owner_column: Optional[str] = None
+    owner_roles: Optional[Tuple[str, ...]] = None
+    not_owner_detail: str = "You are not assigned to this test."
+    # Extra SQL condition and the message when only it fails
+    guard: Optional[str] = None
+    guard_detail: str = ""
+    # Columns set to NOW()
+    timestamps: Tuple[str, ...] = ()
+    not_found_detail: str = "Test not found."
+
+
+ASSIGN = Transition(
+    name="assign",
+    from_statuses=("Not Started", "Pending", "In Progress", "Returned for Correction"),
+    to_statuses=("In Progress",),
+    invalid_status_detail="Cannot assign test with status: {status}",
+    not_found_detail="Test not found",
+)
+START = Transition(
+    name="start",
+    from_statuses=("Not Started", "Pending"),
+    to_statuses=("In Progress",),
+    invalid_status_detail="Cannot start test with status: {status}",
+    owner_column="assigned_to",
+    not_owner_detail="You can only start tests assigned to you.",
+    not_found_detail="Test not found",
+)
+SUBMIT = Transition(
+    name="submit",
+    from_statuses=("In Progress",),
+    to_statuses=("Submitted for Review",),
+    invalid_status_detail="Cannot submit test with status '{status}'. Start the test before submitting.",
+    owner_column="assigned_to",
+    owner_roles=("QC Operator",),
+    not_owner_detail="You can only submit tests assigned to you.",
+    timestamps=("submitted_on",),
+    not_found_detail="Test not found",
+)
+REVIEW = Transition(
+    name="review",
+    from_statuses=("Submitted for Review",),
+    to_statuses=("Approved", "Rejected", "Returned for Correction", "Submitted to QA Manager"),
+    invalid_status_detail="This test is not pending review.",
+)
+QA_ASSIGN = Transition(
+    name="qa_assign",
+    from_statuses=("Submitted to QA Manager", "QA Recommendation Submitted"),
+    to_statuses=("QA Officer Review",),
+    invalid_status_detail="This test is not eligible for QA assignment.",
+)
+QA_OFFICER_REVIEW = Transition(
+    name="qa_officer_review",
+    from_statuses=("QA Officer Review",),
+    to_statuses=("QA Recommendation Submitted",),
+    invalid_status_detail="This test is not awaiting QA officer review.",
+    owner_column="qa_officer_id",
+)
+QA_MANAGER_DECISION = Transition(
+    name="qa_manager_decision",
+    from_statuses=("QA Recommendation Submitted",),
+    to_statuses=("Accepted - Warehouse", "Rejected - Return to Supplier"),
+    invalid_status_detail="Await QA officer recommendation before taking a final decision.",
+)
+WAREHOUSE_ACTION = Transition(
+    name="warehouse_action",
+    from_statuses=("Accepted - Warehouse", "Rejected - Return to Supplier"),
+    to_statuses=(),
+    invalid_status_detail="This test is not awaiting warehouse action.",
+    guard="warehouse_action IS NULL",
+    guard_detail="Warehouse action already recorded.",
+    timestamps=("warehouse_acknowledged_at",),
+)
+
+TRANSITIONS: Dict[str, Transition] = {
+    transition.name: transition
+    for transition in (
+        ASSIGN,
+        START,
+        SUBMIT,
+        REVIEW,
+        QA_ASSIGN,
+        QA_OFFICER_REVIEW,
+        QA_MANAGER_DECISION,
+        WAREHOUSE_ACTION,
+    )
+}
+
+
+def _owner_checked(transition: Transition, user: dict) -> bool:
+    if transition.owner_column is None:
+        return False
+    return transition.owner_roles is None or user["role"] in transition.owner_roles
+
+
+def _update_statement(
+    transition: Transition,
+    to_status: Optional[str],
+    columns: Sequence[str],
+    returning: Sequence[str],
+    owner_checked: bool,
+) -> sql.Composed:
+    assignments = [sql.SQL("{} = %s").format(sql.Identifier(column)) for column in columns]
+    if to_status is not None:
+        assignments.insert(0, sql.SQL("status = %s"))
+    assignments += [sql.SQL("{} = NOW()").format(sql.Identifier(column)) for column in transition.timestamps]
+    assignments.append(sql.SQL("updated_at = NOW()"))
+
+    conditions = [sql.SQL("id = %s"), sql.SQL("status = ANY(%s)")]
+    if owner_checked:
+        conditions.append(sql.SQL("{}::text = %s").format(sql.Identifier(transition.owner_column)))
+    if transition.guard:
+        conditions.append(sql.SQL(transition.guard))
+
+    return sql.SQL("UPDATE quality_tests SET {} WHERE {} RETURNING {}").format(
+        sql.SQL(", ").join(assignments),
+        sql.SQL(" AND ").join(conditions),
+        sql.SQL(", ").join(sql.Identifier(column) for column in returning),
+    )
+
+
+def _rejection(cur, transition: Transition, test_id: str, user: dict, owner_checked: bool) -> HTTPException:
+    """Work out why a transition matched no row."""
+    owner = sql.Identifier(transition.owner_column) if owner_checked else sql.SQL("NULL")
+    guard = sql.SQL(transition.guard) if transition.guard else sql.SQL("true")
+    cur.execute(
+        sql.SQL("SELECT status, {}::text, {} FROM quality_tests WHERE id = %s").format(owner, guard),
+        (test_id,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=transition.not_found_detail)
+    current_status, owner_id, guard_passed = row
+    if owner_checked and owner_id != user["id"]:
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=transition.not_owner_detail)
+    if current_status not in transition.from_statuses:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=transition.invalid_status_detail.format(status=current_status),
+        )
+    if not guard_passed:
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=transition.guard_detail)
+    # The row changed between the update and this read; report it as a conflict
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="The test was updated concurrently. Please retry.",
+    )
+
+
+def apply_transition(
+    cur,
+    transition: Transition,
+    test_id: str,
+    user: dict,
+    values: Optional[Dict[str, Any]] = None,
+    returning: Sequence[str] = ("id", "test_name", "status", "sample_id"),
+    to_status: Optional[str] = None,
+) -> tuple:
+    """
+    Apply a lifecycle transition to a test in the caller's transaction.
+
+    Args:
+        cur: Cursor of the transaction (may be in pipeline mode)
+        transition: The transition to apply
+        test_id: Quality test id
+        user: Acting user (``id`` and ``role``)
+        values: Other columns to set
+        returning: Columns to return
+        to_status: Target status, required when the transition has several
+
+    Returns:
+        The updated row
+
+    Raises:
+        HTTPException: 404 when the test does not exist, 403 when the user
+            does not own it, 400 when its status does not allow the
+            transition
+    """
+    if to_status is None and len(transition.to_statuses) == 1:
+        to_status = transition.to_statuses[0]
+    if transition.to_statuses and to_status not in transition.to_statuses:
+        raise ValueError(f"{transition.name} cannot move a test to {to_status!r}")
+
+    values = values or {}
+    owner_checked = _owner_checked(transition, user)
+    params = ([to_status] if to_status is not None else []) + list(values.values())
+    params += [test_id, list(transition.from_statuses)]
+    if owner_checked:
+        params.append(user["id"])
+
+    cur.execute(
+        _update_statement(transition, to_status, list(values), returning, owner_checked),
+        params,
+        prepare=PREPARE,
+    )
+    row = cur.fetchone()
+    if row is None:
+        raise _rejection(cur, transition, test_id, user, owner_checked)
+    return row
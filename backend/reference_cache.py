@@ -0,0 +1,229 @@
+"""
+In-process cache for reference data.
+
+Users, plants and materials change rarely but are read on most requests.
+Each worker keeps the results it loads in a dictionary, stamped with
+per-table version counters held in ``reference_versions``. Statement-level
+triggers bump a table's counter and NOTIFY on every change; a listener
+thread in each worker receives the notification and evicts the entries
+built from that table, so all workers see a commit within milliseconds.
+
+A hit is a plain dictionary lookup. While the listener is not connected
+(startup, database restarts), nothing is served from the cache and every
+read goes to the loader.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Set
+
+import psycopg
+from psycopg import sql
+
+from database_optimization import DATABASE_URL, get_db_connection
+
+try:
+    from monitoring import (
+        log_error,
+        log_info,
+        reference_cache_invalidations_total,
+        reference_cache_listener_up,
+        reference_cache_loads_total,
+    )
+except ImportError:
+    # Fallback if monitoring not available
+    log_error = None
+    log_info = None
+    reference_cache_invalidations_total = None
+    reference_cache_listener_up = None
+    reference_cache_loads_total = None
+
+# Channel and trigger installed by migrations/versions/0007_reference_versions.sql
+NOTIFY_CHANNEL = "reference_versions"
+TRIGGER_NAME = "reference_version_bump"
+
+# Seconds between checks of the stop flag while waiting for notifications
+LISTEN_POLL_INTERVAL = 1.0
+# Delay before reconnecting after the listener connection fails
+LISTEN_RETRY_DELAY = float(os.getenv("REFERENCE_CACHE_RETRY_DELAY", "2"))
+
+_MISSING = object()
+
+
+class ReferenceCache:
+    """Version-stamped in-process cache invalidated by LISTEN/NOTIFY."""
+
+    def __init__(self):
+        self._entries: Dict[str, Any] = {}
+        self._entry_tables: Dict[str, Set[str]] = {}
+        self._versions: Dict[str, int] = {}
+        self._tracked: frozenset = frozenset()
+        self._subscribers: Dict[str, List[Callable[[], None]]] = {}
+        # Bumped whenever entries may have been missed or evicted, so loads
+        # that started earlier are not stored
+        self._epoch = 0
+        self._listening = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    def get(self, name: str, tables: Sequence[str], loader: Callable[[Any], Any]) -> Any:
+        """
+        Return a cached reference result, loading it on a miss.
+
+        The cached value is shared between requests; callers must not
+        mutate it.
+
+        Args:
+            name: Cache entry name
+            tables: Tables the result is built from
+            loader: Called with a cursor to build the result
+        """
+        if self._listening:
+            value = self._entries.get(name, _MISSING)
+            if value is not _MISSING:
+                return value
+        return self._load(name, tables, loader)
+
+    def subscribe(self, table: str, callback: Callable[[], None]) -> None:
+        """Call callback whenever table changes (in any worker)."""
+        self._subscribers.setdefault(table, []).append(callback)
+
+    def invalidate(self, *tables: str) -> None:
+        """Evict entries built from tables after a local write, ahead of the NOTIFY."""
+        with self._lock:
+            self._epoch += 1
+            self._evict(tables)
+
+    def start(self) -> None:
+        """Start the listener thread (once per worker process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="reference-cache-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the listener and stop serving cached entries."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=LISTEN_POLL_INTERVAL * 2)
+            self._thread = None
+        self._set_listening(False)
+
+    def _load(self, name: str, tables: Sequence[str], loader: Callable[[Any], Any]) -> Any:
+        epoch = self._epoch
+        cacheable = self._listening and set(tables) <= self._tracked
+        # Primary: the version stamps must not lag the change notifications
+        with get_db_connection(write=False) as conn:
+            with conn.cursor() as cur:
+                stamp = dict.fromkeys(tables, 0)
+                if cacheable:
+                    cur.execute(
+                        "SELECT table_name, version FROM reference_versions WHERE table_name = ANY(%s)",
+                        (list(tables),),
+                    )
+                    stamp.update(cur.fetchall())
+                value = loader(cur)
+            conn.commit()
+
+        if reference_cache_loads_total:
+            reference_cache_loads_total.labels(
+                name=name, reason="miss" if cacheable else "bypass"
+            ).inc()
+        if not cacheable:
+            return value
+
+        with self._lock:
+            if not self._listening or epoch != self._epoch:
+                return value
+            for table, version in stamp.items():
+                known = self._versions.get(table, 0)
+                if version < known:
+                    # A newer change was announced while loading
+                    return value
+                self._versions[table] = version
+            self._entries[name] = value
+            for table in tables:
+                self._entry_tables.setdefault(table, set()).add(name)
+        return value
+
+    def _evict(self, tables: Sequence[str]) -> None:
+        for table in tables:
+            for name in self._entry_tables.pop(table, ()):
+                self._entries.pop(name, None)
+
+    def _notify_subscribers(self, tables: Sequence[str]) -> None:
+        for table in tables:
+            for callback in self._subscribers.get(table, ()):
+                try:
+                    callback()
+                except Exception as e:
+                    if log_error:
+                        log_error(e, {"context": "reference_cache", "table": table})
+
+    def _set_listening(self, listening: bool) -> None:
+        with self._lock:
+            self._listening = listening
+            self._epoch += 1
+            self._entries.clear()
+            self._entry_tables.clear()
+        if reference_cache_listener_up:
+            reference_cache_listener_up.set(1 if listening else 0)
+
+    def _apply(self, payload: str) -> None:
+        table, _, version = payload.rpartition(":")
+        try:
+            version = int(version)
+        except ValueError:
+            return
+        with self._lock:
+            if version > self._versions.get(table, 0):
+                self._versions[table] = version
+            self._epoch += 1
+            self._evict((table,))
+        if reference_cache_invalidations_total:
+            reference_cache_invalidations_total.labels(table=table).inc()
+        self._notify_subscribers((table,))
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(NOTIFY_CHANNEL)))
+                    # Tables without the trigger never announce changes: never cache them
+                    tracked = conn.execute(
+                        """
+                        SELECT c.relname
+                        FROM pg_trigger t
+                        JOIN pg_class c ON c.oid = t.tgrelid
+                        WHERE t.tgname = %s
+                        """,
+                        (TRIGGER_NAME,),
+                    ).fetchall()
+                    versions = conn.execute(
+                        "SELECT table_name, version FROM reference_versions"
+                    ).fetchall()
+                    with self._lock:
+                        self._tracked = frozenset(row[0] for row in tracked)
+                        self._versions = dict(versions)
+                    self._set_listening(True)
+                    # Changes may have been missed while disconnected
+                    self._notify_subscribers(tuple(self._tracked))
+                    if log_info:
+                        log_info("Reference cache listening", tables=sorted(self._tracked))
+
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=LISTEN_POLL_INTERVAL):
+                            self._apply(notify.payload)
+            except Exception as e:
+                self._set_listening(False)
+                if log_error:
+                    log_error(e, {"context": "reference_cache", "component": "listener"})
+                self._stop.wait(LISTEN_RETRY_DELAY)
+        self._set_listening(False)
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,186 @@
+"""
+Request-scoped accounting.
+
+RequestMiddleware opens a RequestContext for every HTTP request. While the
+request runs, the code it calls adds to it: database statements and their
+time (db_instrumentation), time spent waiting for a pooled connection
+(get_db_connection), authentication (get_current_user), cache hits and
+misses (the cached decorator) and response encoding (FastJSONResponse).
+The middleware reports the totals in the access log line and, with
+SERVER_TIMING=true, in a Server-Timing header.
+
+Handlers can declare how many statements they are expected to run with the
+query_budget dependency. Going over the budget is logged; with
+QUERY_BUDGET_ENFORCE=true (development, tests) the statement that exceeds
+it raises QueryBudgetExceeded, so an N+1 regression fails loudly at the
+loop that causes it.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", "false").lower() == "true"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A request ran more statements than its declared budget."""
+
+
+class RequestContext:
+    """Where one request spent its time."""
+
+    __slots__ = (
+        "queries",
+        "db_time",
+        "pool_wait",
+        "auth_time",
+        "serialize_time",
+        "cache_hits",
+        "cache_misses",
+        "query_budget",
+        "user_id",
+        "reads_from_primary",
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.auth_time = 0.0
+        self.serialize_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.query_budget: Optional[int] = None
+        # The authenticated user, and whether their reads must see the
+        # primary (read-your-writes, see database_optimization)
+        self.user_id: Optional[str] = None
+        self.reads_from_primary: Optional[bool] = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.query_budget is not None and self.queries > self.query_budget
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing header value (durations in milliseconds)."""
+        metrics = [f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"']
+        if self.pool_wait:
+            metrics.append(f"pool;dur={self.pool_wait * 1000:.2f}")
+        if self.auth_time:
+            metrics.append(f"auth;dur={self.auth_time * 1000:.2f}")
+        if self.cache_hits or self.cache_misses:
+            metrics.append(f'cache;desc="{self.cache_hits} hit, {self.cache_misses} miss"')
+        if self.serialize_time:
+            metrics.append(f"serialize;dur={self.serialize_time * 1000:.2f}")
+        metrics.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def log_fields(self) -> dict:
+        """Fields added to the access log line."""
+        fields = {
+            "db_queries": self.queries,
+            "db_duration_ms": self.db_time * 1000,
+            "pool_wait_ms": self.pool_wait * 1000,
+            "auth_ms": self.auth_time * 1000,
+            "serialize_ms": self.serialize_time * 1000,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+        if self.query_budget is not None:
+            fields["query_budget"] = self.query_budget
+        return fields
+
+
+_current: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def current_request() -> Optional[RequestContext]:
+    """The context of the request being handled (None outside a request)."""
+    return _current.get()
+
+
+@contextmanager
+def track_request() -> Iterator[RequestContext]:
+    """Collect the accounting of the code (request) running inside the block."""
+    context = RequestContext()
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(attribute: str) -> Iterator[None]:
+    """Add the time spent in the block to an attribute of the current context."""
+    context = _current.get()
+    if context is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(context, attribute, getattr(context, attribute) + time.perf_counter() - started)
+
+
+def set_user(user_id: str) -> None:
+    """Record the authenticated user of the current request."""
+    context = _current.get()
+    if context is not None:
+        context.user_id = user_id
+
+
+def count_query(duration: float) -> None:
+    """
+    Record one database statement against the current request.
+
+    Raises:
+        QueryBudgetExceeded: With QUERY_BUDGET_ENFORCE, when the statement
+            takes the request over its budget
+    """
+    context = _current.get()
+    if context is None:
+        return
+    context.queries += 1
+    context.db_time += duration
+    if QUERY_BUDGET_ENFORCE and context.over_budget:
+        raise QueryBudgetExceeded(
+            f"Request ran {context.queries} statements; its budget is {context.query_budget}"
+        )
+
+
+def count_cache(hit: bool) -> None:
+    """Record a cache lookup against the current request."""
+    context = _current.get()
+    if context is None:
+        return
+    if hit:
+        context.cache_hits += 1
+    else:
+        context.cache_misses += 1
+
+
+def query_budget(limit: int) -> Callable[[], None]:
+    """
+    Dependency declaring how many statements a route may run per request.
+
+    Example:
+        @app.get("/api/notifications", dependencies=[Depends(query_budget(3))])
+
+    Args:
+        limit: Statements allowed, including those run by dependencies
+            (authentication)
+
+    Returns:
+        The dependency
+    """
+
+    async def declare_query_budget() -> None:
+        context = _current.get()
+        if context is not None:
+            context.query_budget = limit
+
+    return declare_query_budget
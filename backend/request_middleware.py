@@ -0,0 +1,95 @@
+"""
+Per-request middleware.
+
+RequestMiddleware is a single pure ASGI middleware that times each HTTP
+request, records its metrics and log line, opens its RequestContext
+(request_context) and adds the security headers and, when enabled, a
+Server-Timing header.
+It replaces two ``@app.middleware("http")`` layers: each of those ran the
+rest of the stack in a separate task, passed the response body through a
+memory stream and rebuilt the header set. Here the response messages pass
+straight through; only the ``http.response.start`` message gets the header
+block, which is encoded once at import.
+"""
+
+import os
+import time
+from typing import List, Tuple
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from monitoring import log_error, log_request, log_warning, record_http_request
+from request_context import track_request
+from security_middleware import SECURITY_HEADERS
+
+# SERVER_TIMING=true sends the per-request time breakdown to clients. Off by
+# default: it reveals internals (query counts) and gives outsiders a timing
+# oracle (auth time for valid and invalid tokens)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+_SECURITY_HEADERS: RawHeaders = [
+    (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in SECURITY_HEADERS.items()
+]
+# Headers replaced by (or, for server, removed in favour of) the block above
+_REPLACED = frozenset(name for name, _ in _SECURITY_HEADERS) | {b"server"}
+
+
+def with_security_headers(headers: RawHeaders) -> RawHeaders:
+    """Return the response headers with the security header block applied."""
+    return [header for header in headers if header[0].lower() not in _REPLACED] + _SECURITY_HEADERS
+
+
+class RequestMiddleware:
+    """Timing, metrics, request logging and response headers for HTTP requests."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = with_security_headers(message.get("headers", []))
+                if SERVER_TIMING:
+                    timing = context.server_timing(time.perf_counter() - started)
+                    headers.append((b"server-timing", timing.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        with track_request() as context:
+            try:
+                await self.app(scope, receive, send_with_headers)
+            except Exception as e:
+                duration = time.perf_counter() - started
+                record_http_request(Request(scope), 500, duration, context.queries)
+                log_error(e, {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "duration_ms": duration * 1000,
+                    **context.log_fields(),
+                })
+                raise
+
+        duration = time.perf_counter() - started
+        request = Request(scope)
+        record_http_request(request, status_code, duration, context.queries)
+        log_request(request, status_code, duration, context)
+        if context.over_budget:
+            log_warning(
+                "Query budget exceeded",
+                method=scope["method"],
+                path=scope["path"],
+                db_queries=context.queries,
+                query_budget=context.query_budget,
+            )
@@ -5,8 +5,9 @@ These schemas define the data structures for API requests and responses,
 ensuring type safety and validation.
 """
 
-from datetime import datetime, date
-from typing import List, Optional, Literal
+from datetime import datetime, date, timezone
+from typing import Any, Dict, List, Optional, Literal, Tuple
+from uuid import UUID
 from pydantic import BaseModel, EmailStr, Field, field_validator
 import re
 
@@ -289,6 +290,37 @@ class GRNBase(BaseModel):
 
     items: List[GRNItem] = Field(default_factory=list)
 
+    def priced_items(self) -> Tuple[List[dict], float, float, float]:
+        """Line items with their net, VAT and gross amounts, and the GRN totals."""
+        priced = []
+        net_total = 0.0
+        vat_total = 0.0
+        for item in self.items:
+            qty = float(item.quantity)
+            price = float(item.price)
+            net = round(qty * price, 2)
+            vat_rate = float(item.vat_rate or 0)
+            vat_amount = round(net * (vat_rate / 100), 2)
+            gross = round(net + vat_amount, 2)
+            net_total += net
+            vat_total += vat_amount
+            priced.append(
+                {
+                    "description": item.description,
+                    "stock_code": item.stock_code,
+                    "status": item.status or "GRN",
+                    "quantity": qty,
+                    "price": price,
+                    "vat_rate": vat_rate,
+                    "net": net,
+                    "vat_amount": vat_amount,
+                    "gross": gross,
+                    "nominal": item.nominal,
+                    "account": item.account,
+                }
+            )
+        return priced, net_total, vat_total, round(net_total + vat_total, 2)
+
 
 class GRNCreate(GRNBase):
     gate_entry_id: str = Field(..., max_length=50)
@@ -337,6 +369,58 @@ class GRNPendingQAResponse(BaseModel):
     gate_created_at: datetime
 
 
+# Bulk import schemas (historical data, see bulk_import)
+def _as_utc(value: datetime) -> datetime:
+    # Document codes take their period from the UTC creation time
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class SecurityLogImport(SecurityLogCreate):
+    """A historical gate entry; the entry code is allocated on import."""
+    id: Optional[UUID] = None  # Lets GRN rows of the same import reference it
+    status: str = Field("Awaiting GRN", min_length=1, max_length=40)
+    created_at: datetime
+
+    _created_at_utc = field_validator("created_at")(_as_utc)
+
+
+class GRNImport(GRNCreate):
+    """A historical GRN for an existing gate entry; the GRN code is allocated on import."""
+    id: Optional[UUID] = None
+    gate_entry_id: UUID
+    status: str = Field("Awaiting QA", min_length=1, max_length=40)
+    created_at: datetime
+
+    _created_at_utc = field_validator("created_at")(_as_utc)
+
+
+class ImportRequest(BaseModel):
+    rows: List[Dict[str, Any]] = Field(..., min_length=1)
+    # Resume a failed import: send the same rows with the job id
+    job_id: Optional[UUID] = None
+
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based position in the input
+    error: str
+
+
+class ImportJobResponse(BaseModel):
+    id: UUID
+    kind: str
+    status: str
+    checkpoint: int
+    rows_total: Optional[int]
+    rows_loaded: int
+    rows_rejected: int
+    errors: List[ImportRowError]
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
 class SamplingRequest(BaseModel):
     qa_notes: Optional[str] = Field(None, max_length=500)
 
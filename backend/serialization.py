@@ -0,0 +1,208 @@
+"""
+Row serialization utilities.
+
+Handlers used to build response dicts by position from result tuples and
+then let FastAPI validate and re-encode them through Pydantic models. This
+module compiles one serializer function per result shape, looked up by
+column name, which can be plugged into psycopg as a row factory so rows come
+off the wire already shaped as response payloads. FastJSONResponse encodes
+them with orjson; returning it from a handler skips the response_model
+validation pass.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+from pagination import set_next_cursor
+from request_context import timed
+
+try:
+    import orjson
+except ImportError:
+    # Fallback to the standard library encoder
+    orjson = None
+
+
+# Converters shared by the serializers
+def as_str(value: Any) -> Optional[str]:
+    """Stringify non-null values (UUIDs, ids)."""
+    return str(value) if value is not None else None
+
+
+def as_text(value: Any) -> Optional[str]:
+    """Stringify truthy values, mapping empty values to None."""
+    return str(value) if value else None
+
+
+def as_float(value: Any) -> Optional[float]:
+    """Convert numerics (Decimal) to float."""
+    return float(value) if value is not None else None
+
+
+def as_int(value: Any) -> int:
+    """Convert counts, mapping NULL to 0."""
+    return value or 0
+
+
+def as_json_list(value: Any) -> list:
+    """Decode JSON list columns that may come back as text."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return []
+    return value
+
+
+def column_names(columns_sql: str) -> Tuple[str, ...]:
+    """Split a comma-separated SELECT column list into column names."""
+    return tuple(column.strip() for column in columns_sql.split(","))
+
+
+# A field is "key", (key, column), (key, column, converter),
+# (key, (column, ...), converter), (key, RowSerializer) for nested objects
+# or (key, None) for a constant null.
+FieldSpec = Union[str, tuple]
+
+
+class RowSerializer:
+    """
+    Precompiled row-to-dict serializer.
+
+    Fields name the columns they read, so serializers do not depend on column
+    positions. The first time a result shape is seen, a specialised function
+    is generated for it and cached; after that serializing a row is a single
+    dict literal.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fields: Sequence[FieldSpec],
+        key_columns: Sequence[str] = (),
+    ):
+        """
+        Args:
+            name: Serializer name (used in error messages)
+            fields: Output fields, in response order
+            key_columns: Columns returned alongside each payload as a
+                (payload, key) pair, for keyset pagination
+        """
+        self.name = name
+        self.fields = tuple(fields)
+        self.key_columns = tuple(key_columns)
+        self._compiled: Dict[Tuple[str, ...], Callable[[Sequence], Any]] = {}
+
+    def with_key(self, *key_columns: str) -> "RowSerializer":
+        """Return a serializer producing (payload, key) pairs for pagination."""
+        return RowSerializer(self.name, self.fields, key_columns)
+
+    def compile(self, names: Sequence[str]) -> Callable[[Sequence], Any]:
+        """Return the serializer function for rows with the given column names."""
+        names = tuple(names)
+        func = self._compiled.get(names)
+        if func is None:
+            func = self._compiled[names] = self._build(names)
+        return func
+
+    def row_factory(self, cursor) -> Callable[[Sequence], Any]:
+        """psycopg row factory producing serialized rows."""
+        description = cursor.description or ()
+        return self.compile(tuple(column.name for column in description))
+
+    def __call__(self, cursor, row: Sequence) -> Any:
+        """Serialize one tuple row fetched from cursor."""
+        return self.row_factory(cursor)(row)
+
+    def _build(self, names: Tuple[str, ...]) -> Callable[[Sequence], Any]:
+        positions = {}
+        for index, column in enumerate(names):
+            positions.setdefault(column, index)
+        namespace: Dict[str, Any] = {}
+
+        def value_expr(column: str) -> str:
+            if column not in positions:
+                raise ValueError(f"{self.name} serializer: column {column!r} is not in the result")
+            return f"row[{positions[column]}]"
+
+        def dict_expr(fields: Sequence[FieldSpec]) -> str:
+            items = []
+            for field in fields:
+                if isinstance(field, str):
+                    field = (field,)
+                key = field[0]
+                if len(field) == 2 and field[1] is None:
+                    items.append(f"{key!r}: None")
+                    continue
+                if len(field) == 2 and isinstance(field[1], RowSerializer):
+                    items.append(f"{key!r}: {dict_expr(field[1].fields)}")
+                    continue
+                columns = field[1] if len(field) > 1 else key
+                converter = field[2] if len(field) > 2 else None
+                if isinstance(columns, str):
+                    columns = (columns,)
+                args = ", ".join(value_expr(column) for column in columns)
+                if converter is None:
+                    items.append(f"{key!r}: {args}")
+                else:
+                    converter_name = f"_c{len(namespace)}"
+                    namespace[converter_name] = converter
+                    items.append(f"{key!r}: {converter_name}({args})")
+            return "{" + ", ".join(items) + "}"
+
+        body = dict_expr(self.fields)
+        if self.key_columns:
+            key = ", ".join(value_expr(column) for column in self.key_columns)
+            body = f"({body}, ({key},))"
+        source = f"def serialize(row):\n    return {body}\n"
+        exec(compile(source, f"<serializer {self.name}>", "exec"), namespace)
+        return namespace["serialize"]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson (stdlib json if orjson is missing).
+
+    Handlers return it directly with already-serialized payloads; FastAPI
+    then skips response_model validation. UTC datetimes are written with a
+    "Z" suffix, matching Pydantic's output.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize_time"):
+            if orjson is not None:
+                return orjson.dumps(
+                    content,
+                    default=_json_default,
+                    option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+                )
+            return json.dumps(
+                content,
+                default=_json_default,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ).encode("utf-8")
+
+
+def json_page(payload: list, next_cursor: Optional[str] = None) -> FastJSONResponse:
+    """Build a list response, with X-Next-Cursor when another page exists."""
+    response = FastJSONResponse(payload)
+    set_next_cursor(response, next_cursor)
+    return response
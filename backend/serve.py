@@ -0,0 +1,197 @@
+"""
+Production launcher.
+
+Runs WEB_CONCURRENCY uvicorn workers (uvloop event loop, httptools parser)
+sharing one listening socket:
+
+    WEB_CONCURRENCY=4 python serve.py
+
+The application is imported once in this process before the workers are
+forked, so a worker only runs the startup hooks; database pools are created
+in each worker after the fork (see database_optimization). Workers that die
+are replaced. SIGTERM or SIGINT drains: workers stop accepting connections,
+finish in-flight requests for up to GRACEFUL_TIMEOUT seconds, run the
+shutdown hooks and exit; stragglers are killed.
+
+Prometheus metrics are written per worker under PROMETHEUS_MULTIPROC_DIR (a
+temporary directory unless set) and /metrics aggregates them.
+"""
+
+import argparse
+import importlib.util
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKEND_HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
+BACKEND_PORT = int(os.getenv("BACKEND_PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Seconds a draining worker may spend finishing in-flight requests
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+LISTEN_BACKLOG = int(os.getenv("LISTEN_BACKLOG", "2048"))
+# A worker that exits sooner than this after being forked failed to boot
+# (bad configuration, database down, schema behind); the launcher stops
+# instead of respawning it in a loop
+WORKER_BOOT_TIMEOUT = float(os.getenv("WORKER_BOOT_TIMEOUT", "5"))
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _prepare_metrics_dir() -> Tuple[str, bool]:
+    """
+    Point prometheus_client at an empty multiprocess directory.
+
+    Must run before prometheus_client is imported.
+
+    Returns:
+        The directory, and whether it was created here (and is removed on exit)
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".db"):
+                os.remove(os.path.join(directory, name))
+        return directory, False
+    directory = tempfile.mkdtemp(prefix="viruj-metrics-")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    return directory, True
+
+
+class Launcher:
+    """Pre-fork master: spawns, reaps and drains the workers."""
+
+    def __init__(self, config, sock, workers: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        self.exit_code = 0
+
+    def spawn(self) -> None:
+        from uvicorn import Server
+
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        # Worker: uvicorn installs its own handlers and re-raises the signal
+        # it stopped on, which must then terminate the process
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 1
+        try:
+            server = Server(self.config)
+            server.run(sockets=[self.sock])
+            code = 0 if server.started else 3
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def reap(self) -> None:
+        from prometheus_client import multiprocess
+
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                return
+            started = self.children.pop(pid, None)
+            multiprocess.mark_process_dead(pid)
+            if self.stopping or started is None:
+                continue
+            if time.monotonic() - started < WORKER_BOOT_TIMEOUT:
+                print(f"Worker {pid} failed to boot (status {status}); shutting down", file=sys.stderr)
+                self.exit_code = 1
+                self.stop()
+                continue
+            print(f"Worker {pid} exited (status {status}); starting a replacement", file=sys.stderr)
+            self.spawn()
+
+    def stop(self, *_args) -> None:
+        self.stopping = True
+
+    def drain(self) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT + 5
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while self.children:
+            pid, _status = os.waitpid(-1, 0)
+            self.children.pop(pid, None)
+
+    def run(self) -> int:
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        while not self.stopping:
+            self.reap()
+            time.sleep(0.2)
+        self.drain()
+        return self.exit_code
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the backend with several worker processes.")
+    parser.add_argument("--host", default=BACKEND_HOST)
+    parser.add_argument("--port", type=int, default=BACKEND_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    metrics_dir, owns_metrics_dir = _prepare_metrics_dir()
+
+    import uvicorn
+    from uvicorn.config import Config
+
+    # Preload: workers inherit the imported application
+    from main import app
+
+    config = Config(
+        app,
+        host=args.host,
+        port=args.port,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        backlog=LISTEN_BACKLOG,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        access_log=False,
+        server_header=False,
+    )
+    sock = config.bind_socket()
+    print(
+        f"Serving on http://{args.host}:{args.port} with {args.workers} workers "
+        f"(uvicorn {uvicorn.__version__}, {config.loop}, {config.http})",
+        file=sys.stderr,
+    )
+    try:
+        return Launcher(config, sock, max(1, args.workers)).run()
+    finally:
+        sock.close()
+        if owns_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -57,3 +57,26 @@ def test_rate_limiting():
             # 6th should be rate limited
             assert response.status_code == 429
 
+
+
+def test_create_user_stores_hash_and_rejects_duplicate_email():
+    """Test user creation hashes the password and refuses a second account per email."""
+    from uuid import uuid4
+
+    from database_optimization import get_db_connection
+    from password_hashing import password_hasher
+
+    email = f"new-{uuid4().hex[:8]}@example.com"
+    user = {"name": "New User", "email": email, "password": "S3cret-pass!", "role": "Analyst", "department": "QC"}
+    try:
+        assert client.post("/api/users", json=user).status_code == 201
+        assert client.post("/api/users", json=user).status_code == 409
+        with get_db_connection() as conn:
+            (hashed_password,) = conn.execute(
+                "SELECT hashed_password FROM users WHERE email = %s", (email,)
+            ).fetchone()
+        assert password_hasher.verify("S3cret-pass!", hashed_password)
+    finally:
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM users WHERE email = %s", (email,))
+            conn.commit()
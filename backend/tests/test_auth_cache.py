@@ -0,0 +1,51 @@
+"""
+Tests for the authentication caches.
+"""
+
+import time
+
+import auth_cache
+from auth_cache import _LRUCache, cache_token, get_cached_token
+
+
+def test_lru_evicts_least_recently_used():
+    cache = _LRUCache("test", maxsize=2)
+    expires_at = time.time() + 60
+    cache.set("a", 1, expires_at)
+    cache.set("b", 2, expires_at)
+    assert cache.get("a") == 1
+    cache.set("c", 3, expires_at)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire():
+    now = [1000.0]
+    cache = _LRUCache("test", maxsize=10, clock=lambda: now[0])
+    cache.set("a", 1, 1010.0)
+    assert cache.get("a") == 1
+    now[0] = 1010.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_tokens_cached_until_exp_only():
+    """Expired or exp-less tokens are never served from the cache."""
+    auth_cache.token_cache.clear()
+    cache_token("live", {"sub": "u1", "exp": time.time() + 60})
+    cache_token("expired", {"sub": "u2", "exp": time.time() - 1})
+    cache_token("no-exp", {"sub": "u3"})
+    assert get_cached_token("live")["sub"] == "u1"
+    assert get_cached_token("expired") is None
+    assert get_cached_token("no-exp") is None
+
+
+def test_user_cache_invalidation():
+    auth_cache.cache_user({"id": "u1", "role": "QC Manager"})
+    auth_cache.cache_user({"id": "u2", "role": "QA Manager"})
+    auth_cache.invalidate_user_cache("u1")
+    assert auth_cache.get_cached_user("u1") is None
+    assert auth_cache.get_cached_user("u2")["role"] == "QA Manager"
+    auth_cache.invalidate_user_cache()
+    assert auth_cache.get_cached_user("u2") is None
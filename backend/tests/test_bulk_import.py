@@ -0,0 +1,119 @@
+"""
+Tests for the historical gate entry and GRN import.
+"""
+
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+import bulk_import
+from database_optimization import get_db_connection
+
+USER = {"id": "admin-1", "name": "Import Test"}
+# A period no live document uses
+PERIOD = "0175"
+
+
+@pytest.fixture
+def plant():
+    plant_id = f"test-{uuid4().hex[:8]}"
+    yield plant_id
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM gate_entries WHERE plant_id = %s", (plant_id,))
+            cur.execute("DELETE FROM document_counters WHERE period IN (%s, %s)", (PERIOD, PERIOD[2:]))
+            cur.execute("DELETE FROM import_jobs WHERE created_by_name = %s", (USER["name"],))
+        conn.commit()
+
+
+def _gate_entry(plant_id, day, **fields):
+    row = {
+        "material_name": "Lactose",
+        "vehicle_number": "TS09 AB 1234",
+        "plant_id": plant_id,
+        "created_at": f"1975-01-{day:02d}T08:00:00",
+    }
+    row.update(fields)
+    return row
+
+
+def _entry_codes(plant_id):
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT entry_code FROM gate_entries WHERE plant_id = %s ORDER BY created_at", (plant_id,)
+        ).fetchall()
+    return [code for (code,) in rows]
+
+
+def test_invalid_rows_rejected_and_codes_follow_created_at(plant):
+    rows = [_gate_entry(plant, 3), _gate_entry(plant, 1, vehicle_number="?"), _gate_entry(plant, 2)]
+
+    job = bulk_import.run_import("gate_entries", rows, USER)
+
+    assert (job["status"], job["rows_loaded"], job["rows_rejected"]) == ("completed", 2, 1)
+    assert [error["row"] for error in job["errors"]] == [2]
+    assert _entry_codes(plant) == ["0175001", "0175002"]
+
+
+def test_failed_import_resumes_from_checkpoint(plant, monkeypatch):
+    monkeypatch.setattr(bulk_import, "IMPORT_BATCH_SIZE", 2)
+    schema, load, tags = bulk_import.IMPORT_KINDS["gate_entries"]
+    calls = []
+
+    def fail_second_batch(cur, rows, user, errors):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return load(cur, rows, user, errors)
+
+    monkeypatch.setitem(bulk_import.IMPORT_KINDS, "gate_entries", (schema, fail_second_batch, tags))
+    rows = [_gate_entry(plant, day) for day in range(1, 6)]
+    job_id = uuid4()
+
+    with pytest.raises(RuntimeError):
+        bulk_import.run_import("gate_entries", rows, USER, job_id=job_id)
+    job = bulk_import.run_import("gate_entries", rows, USER, job_id=job_id)
+
+    assert calls == [2, 2, 2, 1]
+    assert (job["status"], job["checkpoint"], job["rows_loaded"]) == ("completed", 5, 5)
+    assert _entry_codes(plant) == [f"0175{seq:03d}" for seq in range(1, 6)]
+
+
+def test_grn_import_receives_gate_entries_once(plant):
+    awaiting, closed = uuid4(), uuid4()
+    bulk_import.run_import(
+        "gate_entries",
+        [_gate_entry(plant, 1, id=str(awaiting)), _gate_entry(plant, 2, id=str(closed), status="Closed")],
+        USER,
+    )
+    grn = {
+        "po_number": "PO-1",
+        "quantity_received": 5,
+        "created_at": "1975-01-05T08:00:00",
+        "items": [{"description": "Lactose", "quantity": 5, "price": 2}],
+    }
+    rows = [dict(grn, gate_entry_id=str(gate_id)) for gate_id in (awaiting, closed, awaiting)]
+
+    job = bulk_import.run_import("grns", rows, USER)
+
+    assert (job["rows_loaded"], [error["row"] for error in job["errors"]]) == (1, [2, 3])
+    with get_db_connection() as conn:
+        (status,) = conn.execute("SELECT status FROM gate_entries WHERE id = %s", (awaiting,)).fetchone()
+    assert status == "Awaiting QA"
+    assert bulk_import.run_import("grns", rows[:1], USER)["rows_rejected"] == 1
+
+
+def test_resuming_another_kinds_job_leaves_it_alone(plant):
+    job = bulk_import.run_import("gate_entries", [_gate_entry(plant, 1, vehicle_number="?")], USER)
+    with get_db_connection() as conn:
+        conn.execute("UPDATE import_jobs SET status = 'failed' WHERE id = %s", (job["id"],))
+        conn.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        bulk_import.run_import("grns", [], USER, job_id=job["id"])
+
+    assert exc_info.value.status_code == 409
+    with get_db_connection() as conn:
+        (job_status,) = conn.execute("SELECT status FROM import_jobs WHERE id = %s", (job["id"],)).fetchone()
+    assert job_status == "failed"
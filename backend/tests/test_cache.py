@@ -0,0 +1,228 @@
+"""
+Tests for the Redis @cached decorator.
+"""
+
+import asyncio
+import threading
+import time
+
+from starlette.requests import Request
+
+import cache
+from cache import cached
+from serialization import json_page
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the Redis commands and scripts cache.py uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        # Threads that issued reads
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        with self.lock:
+            if script == cache._UNLOCK_SCRIPT:
+                if self.data.get(keys[0]) == argv[0]:
+                    del self.data[keys[0]]
+                    return 1
+                return 0
+            if script == cache._STORE_SCRIPT:
+                count = (len(keys) - 1) // 2
+                tag_sets, generations = keys[1:1 + count], keys[1 + count:]
+                if [self.data.get(key, "0") for key in generations] != list(argv[2:]):
+                    return 0
+                self.data[keys[0]] = argv[0]
+                for tag_set in tag_sets:
+                    self.data.setdefault(tag_set, set()).add(keys[0])
+                return 1
+            if script == cache._INVALIDATE_SCRIPT:
+                tag_set, generation = keys
+                self.data[generation] = str(int(self.data.get(generation, "0")) + 1)
+                members = self.data.pop(tag_set, set())
+                for key in members:
+                    self.data.pop(key, None)
+                return len(members)
+            raise NotImplementedError(script)
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+
+def test_key_ignores_request_objects(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+    calls = []
+
+    @cached(ttl=60, key_prefix="test-users")
+    def get_users(request: Request, plant_id: str = "P1"):
+        calls.append(plant_id)
+        return [{"plant_id": plant_id}]
+
+    assert get_users(_request()) == [{"plant_id": "P1"}]
+    assert get_users(request=_request(), plant_id="P1") == [{"plant_id": "P1"}]
+    get_users(_request(), plant_id="P2")
+    assert calls == ["P1", "P2"]
+
+
+def test_key_varies_on_user_id_only(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+    calls = []
+
+    @cached(ttl=60, key_prefix="test-mine")
+    def my_items(current_user: dict):
+        calls.append(current_user["id"])
+        return current_user["id"]
+
+    my_items({"id": "u1", "name": "A"})
+    my_items({"id": "u1", "name": "A (renamed)"})
+    my_items({"id": "u2"})
+    assert calls == ["u1", "u2"]
+
+
+def test_cold_key_computed_once_under_concurrency(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+    calls = []
+
+    @cached(ttl=60, key_prefix="test-slow")
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 8
+
+
+def test_hits_and_misses_counted_per_prefix(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+
+    @cached(ttl=60, key_prefix="test-metrics")
+    def value():
+        return 1
+
+    hits = cache.cache_hits_total.labels(cache_key="test-metrics")
+    misses = cache.cache_misses_total.labels(cache_key="test-metrics")
+    hits_before, misses_before = hits._value.get(), misses._value.get()
+    value()
+    value()
+    value()
+    assert misses._value.get() - misses_before == 1
+    assert hits._value.get() - hits_before == 2
+
+
+def test_invalidate_tags_drops_only_tagged_entries(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+    calls = []
+
+    @cached(ttl=60, key_prefix="test-user", tags=("users", "user:{user_id}"))
+    def get_user(user_id: str):
+        calls.append(user_id)
+        return {"id": user_id}
+
+    get_user("u1")
+    get_user("u2")
+    assert cache.invalidate_tags("user:u1") == 1
+    get_user("u1")
+    get_user("u2")
+    assert calls == ["u1", "u2", "u1"]
+    assert cache.invalidate_tags("users") == 2
+
+
+def test_value_computed_before_invalidation_is_not_stored(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+    versions = iter(["stale", "fresh"])
+
+    @cached(ttl=60, key_prefix="test-race", tags=("grn",))
+    def grn_list():
+        value = next(versions)
+        if value == "stale":
+            # A mutation commits and invalidates while this read is in flight
+            cache.invalidate_tags("grn")
+        return value
+
+    assert grn_list() == "stale"
+    assert grn_list() == "fresh"
+    assert grn_list() == "fresh"
+
+
+def test_responses_replayed_with_headers(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+
+    @cached(ttl=60, key_prefix="test-page")
+    def page():
+        return json_page([{"id": 1}], "next-token")
+
+    page()
+    replayed = page()
+    assert replayed.body == b'[{"id":1}]'
+    assert replayed.headers["x-next-cursor"] == "next-token"
+    assert replayed.headers["content-type"] == "application/json"
+
+
+def test_async_endpoints_call_redis_off_the_event_loop(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda: client)
+    calls = []
+
+    @cached(ttl=60, key_prefix="test-async", tags=("grn",))
+    async def grn_list():
+        calls.append(1)
+        return ["grn"]
+
+    async def run_twice():
+        return await grn_list(), await grn_list(), threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(run_twice())
+    assert first == second == ["grn"]
+    assert calls == [1]
+    assert loop_thread not in client.threads
+
+
+def test_unreachable_redis_not_retried_on_every_call(monkeypatch):
+    attempts = []
+
+    def from_url(*args, **kwargs):
+        attempts.append(1)
+        raise cache.redis.ConnectionError("refused")
+
+    monkeypatch.setattr(cache, "redis_client", None)
+    monkeypatch.setattr(cache, "_redis_retry_at", 0.0)
+    monkeypatch.setattr(cache.redis, "from_url", from_url)
+
+    assert cache.get_redis_client() is None
+    assert cache.get_redis_client() is None
+    assert attempts == [1]
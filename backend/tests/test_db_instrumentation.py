@@ -0,0 +1,65 @@
+"""
+Tests for statement fingerprinting and per-request query tracking.
+"""
+
+from prometheus_client import REGISTRY
+
+from database_optimization import get_db_connection, pipelined
+from db_instrumentation import _record, fingerprint, normalize
+from request_context import track_request
+
+
+def test_normalize_replaces_literals_and_placeholders():
+    query = """
+        SELECT id, name FROM users  -- active only
+        WHERE role = %s AND id IN (%s, %s, %s) AND plant_id = 'P1' AND age > 30
+        LIMIT %(limit)s;
+    """
+    assert normalize(query) == (
+        "SELECT id, name FROM users WHERE role = ? AND id IN (?) "
+        "AND plant_id = ? AND age > ? LIMIT ?"
+    )
+
+
+def test_same_shape_shares_fingerprint():
+    first = fingerprint("SELECT * FROM quality_tests WHERE id = %s")
+    second = fingerprint("SELECT *\n  FROM quality_tests\n WHERE id = 42")
+    assert first.fingerprint == second.fingerprint
+    assert first.verb == "SELECT"
+    assert fingerprint("DELETE FROM quality_tests WHERE id = %s").fingerprint != first.fingerprint
+
+
+def test_queries_counted_per_tracked_block():
+    class Cursor:
+        rowcount = 1
+
+    with track_request() as stats:
+        _record(Cursor(), "SELECT 1", 0.002)
+        _record(Cursor(), "SELECT 2", 0.003)
+    _record(Cursor(), "SELECT 3", 0.001)
+    assert stats.queries == 2
+    assert abs(stats.db_time - 0.005) < 1e-9
+
+
+def _observations(metric: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(f"{metric}_count", labels) or 0.0
+
+
+def test_pipelined_statements_are_counted_and_timed_as_one_batch():
+    query = "SELECT 1 AS pipelined_probe"
+    labels = {"fingerprint": fingerprint(query).fingerprint, "verb": "SELECT"}
+    statement_samples = _observations("db_statement_duration_seconds", labels)
+    batch_samples = _observations("db_query_duration_seconds", {"query_type": "PIPELINE"})
+
+    with track_request() as stats:
+        with get_db_connection() as conn:
+            with pipelined(conn):
+                cursors = [conn.cursor() for _ in range(3)]
+                for cur in cursors:
+                    cur.execute(query)
+            assert [cur.fetchone() for cur in cursors] == [(1,)] * 3
+
+    assert stats.queries == 3
+    assert stats.db_time > 0
+    assert _observations("db_statement_duration_seconds", labels) == statement_samples
+    assert _observations("db_query_duration_seconds", {"query_type": "PIPELINE"}) == batch_samples + 1
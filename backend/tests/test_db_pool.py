@@ -0,0 +1,151 @@
+"""
+Tests for connection pool exhaustion handling and read replica routing.
+"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from psycopg_pool import PoolTimeout, TooManyRequests
+
+import database_optimization
+from reference_cache import ReferenceCache
+from request_context import set_user, track_request
+
+
+class _ExhaustedPool:
+    def __init__(self, error):
+        self.error = error
+
+    def getconn(self):
+        raise self.error
+
+
+@pytest.mark.parametrize(
+    "error, reason",
+    [(PoolTimeout("timed out"), "timeout"), (TooManyRequests("queue full"), "too_many_waiting")],
+)
+def test_exhausted_pool_fails_fast_with_503(monkeypatch, error, reason):
+    monkeypatch.setattr(database_optimization, "_connection_pool", _ExhaustedPool(error))
+    failures = database_optimization.db_pool_checkout_failures_total.labels(pool="sync", reason=reason)
+    before = failures._value.get()
+
+    with pytest.raises(HTTPException) as exc:
+        with database_optimization.get_db_connection():
+            pass
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+    assert failures._value.get() == before + 1
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Route reads to a 'replica' that is the local database under another name."""
+    monkeypatch.setattr(database_optimization, "READ_DATABASE_URL", database_optimization.DATABASE_URL)
+    monkeypatch.setattr(database_optimization, "get_redis_client", lambda: None)
+    monkeypatch.setattr(database_optimization, "_replica_pool", None)
+    monkeypatch.setattr(database_optimization, "_replica_checked_at", float("-inf"))
+    monkeypatch.setattr(database_optimization, "_replica_skip_until", 0.0)
+    monkeypatch.setattr(database_optimization, "_primary_sticky_until", {})
+    yield
+    if database_optimization._replica_pool is not None:
+        database_optimization._replica_pool.close()
+
+
+def _reads(target, reason):
+    return database_optimization.db_read_routing_total.labels(target=target, reason=reason)._value.get()
+
+
+def _read():
+    with database_optimization.get_db_connection(read_only=True) as conn:
+        conn.execute("SELECT 1")
+
+
+def test_reads_go_to_replica_until_user_writes(replica):
+    replica_reads, sticky_reads = _reads("replica", "ok"), _reads("primary", "sticky")
+
+    with track_request():
+        set_user("user-1")
+        _read()
+    assert _reads("replica", "ok") == replica_reads + 1
+
+    with track_request():
+        set_user("user-1")
+        with database_optimization.get_db_connection():
+            pass
+        _read()
+    with track_request():
+        set_user("user-1")
+        _read()
+    with track_request():
+        set_user("user-2")
+        _read()
+
+    assert _reads("primary", "sticky") == sticky_reads + 2
+    assert _reads("replica", "ok") == replica_reads + 2
+
+
+def test_reference_data_on_primary_does_not_pin_user(replica):
+    replica_reads = _reads("replica", "ok")
+
+    with track_request() as context:
+        set_user("user-1")
+        ReferenceCache().get("active_users", ("users",), lambda cur: cur.execute("SELECT 1").fetchone())
+        assert not context.reads_from_primary
+        _read()
+
+    assert _reads("replica", "ok") == replica_reads + 1
+
+
+def test_lagging_replica_falls_back_to_primary(replica, monkeypatch):
+    monkeypatch.setattr(database_optimization, "REPLICA_LAG_SQL", "SELECT 60")
+    lag_reads, replica_reads = _reads("primary", "lag"), _reads("replica", "ok")
+
+    _read()
+    _read()
+
+    assert _reads("primary", "lag") == lag_reads + 2
+    assert _reads("replica", "ok") == replica_reads
+
+
+def test_tag_cached_endpoint_fills_from_primary(replica):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    replica_reads = _reads("replica", "ok")
+
+    assert TestClient(app).get("/api/users/admin-1").status_code == 200
+
+    assert _reads("replica", "ok") == replica_reads
+
+
+def test_async_stickiness_checks_redis_off_the_event_loop(replica, monkeypatch):
+    redis_threads = []
+
+    class _Redis:
+        def set(self, key, value, px):
+            redis_threads.append(threading.get_ident())
+
+        def exists(self, key):
+            redis_threads.append(threading.get_ident())
+            return 1  # user-2 wrote through another worker
+
+    monkeypatch.setattr(database_optimization, "get_redis_client", lambda: _Redis())
+
+    async def requests():
+        with track_request():
+            set_user("user-1")
+            await database_optimization._note_write_async()
+        with track_request():
+            set_user("user-2")
+            routed = await database_optimization._route_to_replica_async()
+        return routed, threading.get_ident()
+
+    routed, loop_thread = asyncio.run(requests())
+
+    assert routed is False
+    assert len(redis_threads) == 2
+    assert loop_thread not in redis_threads
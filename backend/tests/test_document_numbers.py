@@ -0,0 +1,75 @@
+"""
+Tests for the document number allocator.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from database_optimization import get_db_connection
+from document_numbers import (
+    allocate_numbers,
+    format_entry_code,
+    format_grn_code,
+    reserve_block,
+)
+
+
+def _series() -> str:
+    return f"test_{uuid4().hex[:8]}"
+
+
+def _cleanup(series: str) -> None:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM document_counters WHERE series = %s", (series,))
+        conn.commit()
+
+
+def _allocate_one(series: str) -> int:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            (seq,) = allocate_numbers(cur, series, "1025")
+        conn.commit()
+    return seq
+
+
+def test_concurrent_allocations_are_unique_and_gapless():
+    """Concurrent callers never receive the same number."""
+    series = _series()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            numbers = list(executor.map(lambda _: _allocate_one(series), range(40)))
+        assert sorted(numbers) == list(range(1, 41))
+    finally:
+        _cleanup(series)
+
+
+def test_rolled_back_allocation_is_reused():
+    """Numbers allocated in a rolled back transaction are handed out again."""
+    series = _series()
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                allocate_numbers(cur, series, "1025")
+            conn.rollback()
+        assert _allocate_one(series) == 1
+    finally:
+        _cleanup(series)
+
+
+def test_reserved_block_is_skipped_by_later_allocations():
+    """A reserved block is contiguous and later numbers continue after it."""
+    series = _series()
+    try:
+        assert _allocate_one(series) == 1
+        assert reserve_block(series, "1025", 100) == range(2, 102)
+        assert _allocate_one(series) == 102
+    finally:
+        _cleanup(series)
+
+
+def test_code_formats():
+    """Codes keep the formats the frontend already displays."""
+    assert format_entry_code("1025", 7) == "1025007"
+    assert format_entry_code("1025", 1234) == "10251234"
+    assert format_grn_code("25", 12) == "GRN-25-012"
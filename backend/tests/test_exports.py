@@ -0,0 +1,131 @@
+"""
+Tests for the streaming NDJSON/CSV exports.
+"""
+
+import json
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import psycopg
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from psycopg_pool import PoolTimeout
+
+import bulk_import
+import database_optimization
+from database_optimization import get_db_connection
+from exports import csv_chunks, export_response, iter_query, ndjson_chunks
+from main import app, get_current_user
+
+RECORDS = [
+    {"id": 1, "items": [{"qty": 2}], "price": Decimal("9.50"), "received": date(1975, 1, 2), "note": None},
+    {"id": 2, "items": [], "price": Decimal("1"), "received": date(1975, 1, 3), "note": "ok"},
+]
+SERIES_QUERY = "SELECT n FROM generate_series(1, %s) AS n ORDER BY n"
+
+
+def test_ndjson_encodes_json_decimal_and_dates():
+    body = b"".join(ndjson_chunks([RECORDS], "test"))
+
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert lines[0] == {"id": 1, "items": [{"qty": 2}], "price": 9.5, "received": "1975-01-02", "note": None}
+    assert len(lines) == 2
+
+
+def test_csv_has_header_and_encodes_values():
+    body = b"".join(csv_chunks([RECORDS[:1], RECORDS[1:]], "test")).decode()
+
+    assert body.splitlines() == [
+        "id,items,price,received,note",
+        '1,"[{""qty"": 2}]",9.50,1975-01-02,',
+        "2,[],1,1975-01-03,ok",
+    ]
+
+
+def test_rows_streamed_in_chunks():
+    batches = list(iter_query(SERIES_QUERY, (5,), lambda row: {"n": row[0]}, chunk_rows=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert len(list(ndjson_chunks(batches, "test"))) == 3
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(HTTPException) as exc:
+        export_response("test", "xlsx", SERIES_QUERY, (1,), lambda row: {"n": row[0]})
+
+    assert exc.value.status_code == 400
+
+
+class _ExhaustedPool:
+    def getconn(self):
+        raise PoolTimeout("timed out")
+
+
+def test_failures_raised_before_the_response_starts(monkeypatch):
+    with pytest.raises(psycopg.errors.UndefinedTable):
+        export_response("test", "csv", "SELECT * FROM no_such_table", (), lambda row: {})
+
+    monkeypatch.setattr(database_optimization, "_connection_pool", _ExhaustedPool())
+    with pytest.raises(HTTPException) as exc:
+        export_response("test", "csv", SERIES_QUERY, (1,), lambda row: {"n": row[0]})
+    assert exc.value.status_code == 503
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {"id": "admin-1", "role": "Plant Head"}
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user)
+
+
+@pytest.fixture
+def gate_entry():
+    plant_id = f"test-{uuid4().hex[:8]}"
+    user = {"id": "admin-1", "name": "Export Test"}
+    bulk_import.run_import(
+        "gate_entries",
+        [{
+            "material_name": "Lactose",
+            "vehicle_number": "TS09 AB 1234",
+            "plant_id": plant_id,
+            "created_at": "1975-01-02T08:00:00",
+        }],
+        user,
+    )
+    yield plant_id
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM gate_entries WHERE plant_id = %s", (plant_id,))
+            cur.execute("DELETE FROM document_counters WHERE period IN ('0175', '75')")
+            cur.execute("DELETE FROM import_jobs WHERE created_by_name = %s", (user["name"],))
+        conn.commit()
+
+
+def test_security_log_export(client, gate_entry):
+    range_1975 = {"created_from": "1975-01-01T00:00:00", "created_to": "1975-01-31T00:00:00"}
+
+    ndjson = client.get("/api/security/logs/export", params=range_1975)
+    csv_export = client.get("/api/security/logs/export", params=dict(range_1975, format="csv"))
+
+    assert ndjson.status_code == csv_export.status_code == 200
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert ndjson.headers["content-disposition"] == 'attachment; filename="gate_entries.ndjson"'
+    [record] = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert (record["material_name"], record["plant_id"]) == ("Lactose", gate_entry)
+    header, row = csv_export.text.splitlines()
+    assert header.split(",") == list(record)
+    assert gate_entry in row
+
+
+@pytest.mark.parametrize("path", ["/api/security/logs/export", "/api/grn/export", "/api/quality-tests/export"])
+def test_export_endpoints(client, path):
+    empty_range = {"created_from": "2100-01-01T00:00:00"}
+
+    response = client.get(path, params=dict(empty_range, format="csv"))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.text == ""
+    assert client.get(path, params={"format": "xml"}).status_code == 400
@@ -0,0 +1,81 @@
+"""
+Tests for the migration runner.
+"""
+
+from uuid import uuid4
+
+import psycopg
+import pytest
+
+from database_optimization import DATABASE_URL
+from migrations.runner import MigrationError, MigrationRunner
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    """A runner over an empty versions directory with its own bookkeeping table."""
+    suffix = uuid4().hex[:8]
+    runner = MigrationRunner(DATABASE_URL, tmp_path, table=f"test_migrations_{suffix}")
+    items = f"test_items_{suffix}"
+    yield runner, tmp_path, items
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {runner.table}, {items}")
+
+
+def _reload(runner: MigrationRunner) -> MigrationRunner:
+    return MigrationRunner(runner.database_url, runner.directory, table=runner.table)
+
+
+def test_applies_once_and_rejects_edited_migrations(scratch):
+    """Pending migrations run in order, once; changing an applied file is an error."""
+    runner, directory, items = scratch
+    (directory / "0001_create.sql").write_text(f"CREATE TABLE {items} (id INTEGER PRIMARY KEY, label TEXT);")
+    (directory / "0002_seed.sql").write_text(f"INSERT INTO {items} VALUES (1, 'one');")
+
+    assert [migration.version for migration in runner.upgrade()] == [1, 2]
+    assert _reload(runner).upgrade() == []
+    runner.check()
+
+    (directory / "0002_seed.sql").write_text(f"INSERT INTO {items} VALUES (2, 'two');")
+    with pytest.raises(MigrationError, match="0002_seed.sql"):
+        _reload(runner).check()
+
+
+def test_failed_transactional_migration_is_not_recorded(scratch):
+    """A failing SQL migration rolls back entirely and stays pending."""
+    runner, directory, items = scratch
+    (directory / "0001_broken.sql").write_text(
+        f"CREATE TABLE {items} (id INTEGER PRIMARY KEY); INSERT INTO {items} VALUES (1), (1);"
+    )
+
+    with pytest.raises(psycopg.errors.UniqueViolation):
+        runner.upgrade()
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        assert conn.execute("SELECT to_regclass(%s)", (items,)).fetchone()[0] is None
+        assert [migration.version for migration in runner.pending(conn)] == [1]
+
+
+def test_backfill_and_concurrent_index(scratch):
+    """Python migrations can backfill in batches and build indexes concurrently."""
+    runner, directory, items = scratch
+    (directory / "0001_create.sql").write_text(
+        f"CREATE TABLE {items} (id INTEGER PRIMARY KEY, label TEXT);"
+        f"INSERT INTO {items} SELECT n, NULL FROM generate_series(1, 25) AS n;"
+    )
+    (directory / "0002_backfill.py").write_text(
+        "TRANSACTIONAL = False\n"
+        "\n"
+        "def upgrade(ctx):\n"
+        f"    assert ctx.backfill('{items}', \"label = 'item-' || id\", 'label IS NULL', batch_size=10, pause=0) == 25\n"
+        f"    ctx.create_index_concurrently('{items}_label', '{items}', '(label)', unique=True)\n"
+    )
+
+    runner.upgrade()
+
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        assert conn.execute(f"SELECT COUNT(*) FROM {items} WHERE label IS NULL").fetchone()[0] == 0
+        valid = conn.execute(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s",
+            (f"{items}_label",),
+        ).fetchone()
+        assert valid == (True,)
@@ -0,0 +1,86 @@
+"""
+Tests for HTTP metric labelling and request logging.
+"""
+
+import logging
+import queue
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import monitoring
+from monitoring import OVERFLOW_ROUTE, UNMATCHED_ROUTE, record_http_request
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def metrics(request: Request, call_next):
+        response = await call_next(request)
+        record_http_request(request, response.status_code, 0.002)
+        return response
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        return {"id": item_id}
+
+    @app.get("/other")
+    def other():
+        return {}
+
+    return app
+
+
+def _count(endpoint: str, status_code: str = "200") -> float:
+    value = REGISTRY.get_sample_value(
+        "http_requests_total",
+        {"method": "GET", "endpoint": endpoint, "status_code": status_code},
+    )
+    return value or 0.0
+
+
+def test_requests_labelled_by_route_template():
+    client = TestClient(_app())
+    before = _count("/items/{item_id}")
+    for item_id in ("a", "b", "c"):
+        client.get(f"/items/{item_id}")
+    client.get("/missing/path")
+    assert _count("/items/{item_id}") - before == 3
+    assert _count("/items/a") == 0
+    assert _count(UNMATCHED_ROUTE, "404") >= 1
+    assert REGISTRY.get_sample_value(
+        "http_request_slo_total",
+        {"method": "GET", "endpoint": "/items/{item_id}", "outcome": "met"},
+    ) >= 3
+
+
+def test_new_routes_collapse_once_cap_is_reached(monkeypatch):
+    monkeypatch.setattr(monitoring, "_route_labels", {})
+    monkeypatch.setattr(monitoring, "HTTP_METRICS_MAX_ROUTES", 1)
+    client = TestClient(_app())
+    client.get("/items/a")
+    before = _count(OVERFLOW_ROUTE)
+    client.get("/other")
+    assert _count(OVERFLOW_ROUTE) - before == 1
+    assert _count("/other") == 0
+
+
+def test_access_log_sampling_keeps_errors_and_slow_requests(monkeypatch, caplog):
+    monkeypatch.setattr(monitoring, "LOG_ACCESS_SAMPLE_RATE", 0.0)
+    request = Request({"type": "http", "method": "GET", "path": "/items/a", "headers": [], "client": None})
+    with caplog.at_level("INFO", logger="viruj_erp"):
+        monitoring.log_request(request, 200, 0.001)
+        monitoring.log_request(request, 500, 0.001)
+        monitoring.log_request(request, 200, monitoring.HTTP_SLO_SECONDS + 1)
+    assert [record.status_code for record in caplog.records] == [500, 200]
+
+
+def test_full_log_queue_drops_instead_of_blocking():
+    handler = monitoring.DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = REGISTRY.get_sample_value("log_records_dropped_total", {"level": "INFO"}) or 0.0
+    for _ in range(3):
+        handler.handle(logging.LogRecord("viruj_erp", logging.INFO, __file__, 1, "hello %s", ("world",), None))
+    assert handler.queue.get_nowait().msg == "hello world"
+    assert REGISTRY.get_sample_value("log_records_dropped_total", {"level": "INFO"}) - before == 2
@@ -0,0 +1,65 @@
+"""
+Tests for set-based notification fan-out.
+"""
+
+from uuid import uuid4
+
+import notifications
+from database_optimization import get_db_connection, pipelined
+from notifications import fan_out_to_role, fan_out_to_users, notify_role
+
+
+def _count(cur, title: str) -> int:
+    cur.execute("SELECT COUNT(*) FROM notifications WHERE title = %s", (title,))
+    return cur.fetchone()[0]
+
+
+def test_role_fan_out_matches_active_users():
+    """One statement creates a notification per active user with the role."""
+    title = f"test-{uuid4().hex}"
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COUNT(*) FROM users WHERE role = %s AND is_active = true",
+                ("QC Manager",),
+            )
+            expected = cur.fetchone()[0]
+            assert fan_out_to_role(cur, "QC Manager", title, "message") == expected
+            assert _count(cur, title) == expected
+        conn.rollback()
+
+
+def test_user_fan_out_insert_and_copy_paths(monkeypatch):
+    """Explicit audiences work both below and above the COPY threshold."""
+    title = f"test-{uuid4().hex}"
+    user_ids = [f"user-{i}" for i in range(5)]
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            assert fan_out_to_users(cur, user_ids, title, "message") == 5
+            monkeypatch.setattr(notifications, "COPY_FANOUT_THRESHOLD", 3)
+            assert fan_out_to_users(cur, user_ids, title, "message") == 5
+            assert fan_out_to_users(cur, [], title, "message") == 0
+            assert _count(cur, title) == 10
+        conn.rollback()
+
+
+def test_pipelined_notify_records_rows_after_sync(monkeypatch):
+    """Inside a pipeline the fan-out is queued and its row count recorded on exit."""
+    title = f"test-{uuid4().hex}"
+    recorded = []
+    monkeypatch.setattr(notifications, "NOTIFICATION_FANOUT_MODE", "inline")
+    monkeypatch.setattr(notifications, "_record_fanout", lambda *args: recorded.append(args))
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT COUNT(*) FROM users WHERE role = %s AND is_active = true",
+                ("QC Manager",),
+            )
+            expected = cur.fetchone()[0]
+        with pipelined(conn) as pipeline:
+            assert notify_role(None, "QC Manager", title, "message", pipeline=pipeline) == 0
+            assert recorded == []
+        assert recorded == [("QC Manager", "inline", expected)]
+        with conn.cursor() as cur:
+            assert _count(cur, title) == expected
+        conn.rollback()
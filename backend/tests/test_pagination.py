@@ -0,0 +1,70 @@
+"""
+Tests for keyset pagination helpers.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import Keyset, clamp_page_size, paginate
+
+KEYSET = Keyset("things", (("created_at", "timestamptz"), ("id", "uuid")))
+
+
+def test_cursor_round_trip():
+    """Cursors decode back to the values they were built from."""
+    created_at = datetime(2025, 10, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = KEYSET.encode((created_at, "0f8fad5b-d9cb-469f-a165-70867728950e"))
+    assert KEYSET.decode(cursor) == [
+        created_at.isoformat(),
+        "0f8fad5b-d9cb-469f-a165-70867728950e",
+    ]
+
+
+def test_cursor_from_other_listing_is_rejected():
+    """A cursor issued for one listing cannot be replayed against another."""
+    other = Keyset("other", KEYSET.columns)
+    with pytest.raises(HTTPException) as exc_info:
+        KEYSET.decode(other.encode(("2025-10-01", "x")))
+    assert exc_info.value.status_code == 400
+
+
+def test_garbage_cursor_is_rejected():
+    """Malformed cursors produce a 400 instead of a server error."""
+    with pytest.raises(HTTPException):
+        KEYSET.decode("not-a-cursor")
+
+
+def test_tampered_cursor_value_is_rejected():
+    """Well-formed cursors carrying values of the wrong type produce a 400."""
+    for values in (("yesterday", "0f8fad5b-d9cb-469f-a165-70867728950e"), ("2025-10-01T00:00:00", "1 OR 1=1")):
+        with pytest.raises(HTTPException) as exc_info:
+            KEYSET.decode(KEYSET.encode(values))
+        assert exc_info.value.status_code == 400
+
+
+def test_after_clause_follows_direction():
+    """Descending keysets page with < and ascending ones with >."""
+    sql, params = KEYSET.after(["2025-10-01", "abc"])
+    assert sql == "(created_at, id) < (%s::timestamptz, %s::uuid)"
+    assert params == ["2025-10-01", "abc"]
+    ascending = Keyset("asc", KEYSET.columns, descending=False)
+    assert ascending.after(["a", "b"])[0].startswith("(created_at, id) >")
+    assert ascending.order_by() == "created_at ASC, id ASC"
+
+
+def test_paginate_uses_extra_row_to_detect_next_page():
+    """Only a fetched extra row produces a next cursor."""
+    keyset = Keyset("numbered", (("created_at", "timestamptz"), ("id", "integer")))
+    rows = [(i, f"2025-10-0{i}") for i in range(1, 4)]
+    page, next_cursor = paginate(rows, 2, keyset, lambda row: (row[1], row[0]))
+    assert page == rows[:2]
+    assert keyset.decode(next_cursor) == ["2025-10-02", "2"]
+    assert paginate(rows, 3, keyset, lambda row: (row[1], row[0]))[1] is None
+
+
+def test_clamp_page_size():
+    assert clamp_page_size(None) == 200
+    assert clamp_page_size(0) == 1
+    assert clamp_page_size(10_000) == 1000
@@ -0,0 +1,45 @@
+"""
+Tests for the bounded password hashing executor.
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from password_hashing import PasswordHasher
+
+
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def test_rejects_when_backlog_is_full():
+    hasher = PasswordHasher(_context(4), workers=1, max_queue=0)
+    release = threading.Event()
+    busy = hasher._submit("hash", release.wait, 5)
+    try:
+        with pytest.raises(HTTPException) as exc:
+            hasher.hash("secret")
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"] == "1"
+    finally:
+        release.set()
+        busy.result()
+    # Capacity is returned once the running operation finishes
+    deadline = time.monotonic() + 5
+    while hasher._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert hasher.verify("secret", hasher.hash("secret"))
+
+
+def test_verify_and_update_rehashes_to_configured_cost():
+    old_hash = _context(4).hash("secret")
+    hasher = PasswordHasher(_context(5), workers=1, max_queue=1)
+    valid, new_hash = hasher.verify_and_update("secret", old_hash)
+    assert valid
+    assert new_hash.startswith("$2b$05$")
+    assert hasher.verify_and_update("secret", new_hash) == (True, None)
+    assert hasher.verify_and_update("wrong", old_hash) == (False, None)
@@ -0,0 +1,89 @@
+"""
+Tests for the quality test lifecycle transitions.
+"""
+
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+import quality_workflow
+from database_optimization import get_db_connection
+from quality_workflow import apply_transition
+
+OPERATOR = {"id": "qc-op-1", "role": "QC Operator"}
+OTHER_OPERATOR = {"id": "qc-op-2", "role": "QC Operator"}
+MANAGER = {"id": "qc-man-1", "role": "QC Manager"}
+
+
+def _seed(cur, status: str = "Not Started", assigned_to: str = "qc-op-1") -> str:
+    sample_id, test_id = str(uuid4()), str(uuid4())
+    cur.execute(
+        "INSERT INTO quality_samples (id, product_name) VALUES (%s, 'Lactose');",
+        (sample_id,),
+    )
+    cur.execute(
+        """
+        INSERT INTO quality_tests (id, sample_id, test_name, status, assigned_to)
+        VALUES (%s, %s, 'Assay', %s, %s);
+        """,
+        (test_id, sample_id, status, assigned_to),
+    )
+    return test_id
+
+
+def _rejected(cur, *args, **kwargs) -> HTTPException:
+    with pytest.raises(HTTPException) as exc:
+        apply_transition(cur, *args, **kwargs)
+    return exc.value
+
+
+def test_transitions_check_owner_status_and_existence():
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            test_id = _seed(cur)
+
+            assert _rejected(cur, quality_workflow.START, test_id, OTHER_OPERATOR).status_code == 403
+            row = apply_transition(cur, quality_workflow.START, test_id, OPERATOR)
+            assert row[2] == "In Progress"
+            error = _rejected(cur, quality_workflow.START, test_id, OPERATOR)
+            assert (error.status_code, error.detail) == (400, "Cannot start test with status: In Progress")
+
+            # Only operators are limited to their own tests when submitting
+            apply_transition(
+                cur, quality_workflow.SUBMIT, test_id, MANAGER, values={"submitted_by": MANAGER["id"]}
+            )
+            cur.execute("SELECT status, submitted_on IS NOT NULL FROM quality_tests WHERE id = %s", (test_id,))
+            assert cur.fetchone() == ("Submitted for Review", True)
+
+            assert _rejected(cur, quality_workflow.START, str(uuid4()), OPERATOR).status_code == 404
+        conn.rollback()
+
+
+def test_guarded_transition_keeps_status_and_applies_once():
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            test_id = _seed(cur, status="Accepted - Warehouse")
+            row = apply_transition(
+                cur,
+                quality_workflow.WAREHOUSE_ACTION,
+                test_id,
+                MANAGER,
+                values={"warehouse_action": "Accepted", "warehouse_notes": None},
+                returning=("status", "warehouse_action"),
+            )
+            assert row == ("Accepted - Warehouse", "Accepted")
+            error = _rejected(
+                cur,
+                quality_workflow.WAREHOUSE_ACTION,
+                test_id,
+                MANAGER,
+                values={"warehouse_action": "Accepted"},
+            )
+            assert (error.status_code, error.detail) == (400, "Warehouse action already recorded.")
+        conn.rollback()
+
+
+def test_target_status_must_be_declared():
+    with pytest.raises(ValueError):
+        apply_transition(None, quality_workflow.REVIEW, "id", MANAGER, to_status="In Progress")
@@ -0,0 +1,84 @@
+"""
+Tests for the in-process reference cache.
+"""
+
+from contextlib import contextmanager
+
+import reference_cache as reference_module
+from reference_cache import ReferenceCache
+
+
+class FakeCursor:
+    def __init__(self, versions):
+        self.versions = versions
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return list(self.versions.items())
+
+
+class FakeConnection:
+    def __init__(self, versions):
+        self.versions = versions
+
+    def cursor(self):
+        return FakeCursor(self.versions)
+
+    def commit(self):
+        pass
+
+
+def _listening_cache(monkeypatch, versions):
+    @contextmanager
+    def connection(**kwargs):
+        yield FakeConnection(versions)
+
+    monkeypatch.setattr(reference_module, "get_db_connection", connection)
+    cache = ReferenceCache()
+    cache._tracked = frozenset({"users"})
+    cache._set_listening(True)
+    return cache
+
+
+def test_entries_evicted_by_change_notification(monkeypatch):
+    cache = _listening_cache(monkeypatch, {"users": 1})
+    loads = []
+
+    def loader(cur):
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get("active_users", ("users",), loader) == 1
+    assert cache.get("active_users", ("users",), loader) == 1
+    cache._apply("users:2")
+    assert cache.get("active_users", ("users",), loader) == 2
+    assert len(loads) == 2
+
+
+def test_load_racing_a_notification_is_not_stored(monkeypatch):
+    cache = _listening_cache(monkeypatch, {"users": 1})
+
+    def loader(cur):
+        # Another worker commits while this load is running
+        cache._apply("users:2")
+        return "stale"
+
+    assert cache.get("active_users", ("users",), loader) == "stale"
+    assert "active_users" not in cache._entries
+
+
+def test_not_cached_without_listener(monkeypatch):
+    cache = _listening_cache(monkeypatch, {"users": 1})
+    cache._set_listening(False)
+    calls = []
+    for _ in range(2):
+        cache.get("active_users", ("users",), lambda cur: calls.append(1))
+    assert len(calls) == 2
@@ -0,0 +1,89 @@
+"""
+Tests for the request middleware.
+"""
+
+import pytest
+from fastapi import Depends, FastAPI, Response
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import request_context
+import request_middleware
+from request_context import QueryBudgetExceeded, count_query, query_budget
+from request_middleware import RequestMiddleware
+from security_middleware import SECURITY_HEADERS
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestMiddleware)
+
+    @app.get("/mw/plain")
+    def plain():
+        return {"ok": True}
+
+    @app.get("/mw/framed")
+    def framed(response: Response):
+        response.headers["X-Frame-Options"] = "SAMEORIGIN"
+        return {}
+
+    @app.get("/mw/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/mw/queries", dependencies=[Depends(query_budget(2))])
+    def queries(n: int):
+        for _ in range(n):
+            count_query(0.001)
+        return {}
+
+    return app
+
+
+def _count(endpoint: str, status_code: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "http_requests_total",
+        {"method": "GET", "endpoint": endpoint, "status_code": status_code},
+    )
+    return value or 0.0
+
+
+def test_security_headers_added_once():
+    client = TestClient(_app())
+    response = client.get("/mw/plain")
+    for name, value in SECURITY_HEADERS.items():
+        assert response.headers[name] == value
+    framed = client.get("/mw/framed")
+    assert framed.headers.get_list("X-Frame-Options") == ["DENY"]
+
+
+def test_requests_and_failures_are_recorded():
+    client = TestClient(_app(), raise_server_exceptions=False)
+    before_ok, before_error = _count("/mw/plain", "200"), _count("/mw/boom", "500")
+    client.get("/mw/plain")
+    assert client.get("/mw/boom").status_code == 500
+    assert _count("/mw/plain", "200") - before_ok == 1
+    assert _count("/mw/boom", "500") - before_error == 1
+
+    with pytest.raises(RuntimeError):
+        TestClient(_app()).get("/mw/boom")
+
+
+def test_server_timing_only_when_enabled(monkeypatch):
+    assert "Server-Timing" not in TestClient(_app()).get("/mw/plain").headers
+
+    monkeypatch.setattr(request_middleware, "SERVER_TIMING", True)
+    response = TestClient(_app()).get("/mw/queries", params={"n": 2})
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith('db;dur=2.00;desc="2 queries"')
+    assert "app;dur=" in timing
+
+
+def test_query_budget_enforced(monkeypatch):
+    client = TestClient(_app())
+    assert client.get("/mw/queries", params={"n": 3}).status_code == 200
+
+    monkeypatch.setattr(request_context, "QUERY_BUDGET_ENFORCE", True)
+    assert client.get("/mw/queries", params={"n": 2}).status_code == 200
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/mw/queries", params={"n": 3})
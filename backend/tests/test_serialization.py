@@ -0,0 +1,63 @@
+"""
+Tests for the row serialization layer.
+"""
+
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from serialization import FastJSONResponse, RowSerializer, as_float, as_str
+
+ROW = RowSerializer(
+    "thing",
+    [
+        ("id", "id", as_str),
+        "name",
+        ("amount", "amount", as_float),
+        ("owner", RowSerializer("owner", [("id", "owner_id"), ("name", "owner_name")])),
+        ("removed", None),
+    ],
+)
+
+
+def test_fields_are_looked_up_by_column_name():
+    """Column order in the query does not matter."""
+    first = ROW.compile(("id", "name", "amount", "owner_id", "owner_name"))
+    second = ROW.compile(("owner_name", "amount", "owner_id", "name", "id"))
+    expected = {
+        "id": "7",
+        "name": "a",
+        "amount": 1.5,
+        "owner": {"id": "u1", "name": "Ann"},
+        "removed": None,
+    }
+    assert first((7, "a", Decimal("1.5"), "u1", "Ann")) == expected
+    assert second(("Ann", Decimal("1.5"), "u1", "a", 7)) == expected
+
+
+def test_compiled_functions_are_cached():
+    names = ("id", "name", "amount", "owner_id", "owner_name")
+    assert ROW.compile(names) is ROW.compile(list(names))
+
+
+def test_keyed_rows_carry_keyset_values():
+    keyed = ROW.with_key("created_at", "id")
+    payload, key = keyed.compile(
+        ("id", "name", "amount", "owner_id", "owner_name", "created_at")
+    )((7, "a", None, None, None, "2025-10-01"))
+    assert payload["amount"] is None
+    assert key == ("2025-10-01", 7)
+
+
+def test_missing_column_is_reported():
+    with pytest.raises(ValueError, match="owner_name"):
+        ROW.compile(("id", "name", "amount", "owner_id"))
+
+
+def test_fast_json_response_matches_pydantic_datetimes():
+    body = FastJSONResponse(
+        [{"at": datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc), "total": Decimal("2.50")}]
+    ).body
+    assert json.loads(body) == [{"at": "2025-10-01T12:00:00Z", "total": 2.5}]
@@ -0,0 +1,63 @@
+"""
+Tests for the multi-worker launcher.
+"""
+
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read()
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+def test_workers_share_metrics_and_drain_on_sigterm(tmp_path):
+    """Requests served by any worker show up in /metrics; SIGTERM exits cleanly."""
+    port = _free_port()
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), GRACEFUL_TIMEOUT="5")
+    master = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", "2"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                _get(f"{base}/health")
+                break
+            except OSError:
+                assert master.poll() is None and time.monotonic() < deadline
+                time.sleep(0.2)
+
+        for _ in range(40):
+            _get(f"{base}/health")
+
+        metrics = _get(f"{base}/metrics").decode()
+        served = re.search(r'http_requests_total\{endpoint="/health",method="GET",status_code="200"\} (\S+)', metrics)
+        assert served and float(served.group(1)) >= 41
+        assert len(set(re.findall(r'app_boot_seconds\{phase="total",pid="(\d+)"\}', metrics))) == 2
+    finally:
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
@@ -11,10 +11,10 @@ from typing import Optional
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -22,7 +22,8 @@ import psycopg
 
 from schemas import LoginRequest, LoginResponse, UserResponse, MessageResponse
 from monitoring import log_info, log_error, setup_monitoring
-from database import get_db_connection
+from database import check_schema, get_db_connection
+from password_hashing import password_hasher
 
 # Load environment
 ROOT_DIR = Path(__file__).resolve().parents[2]
@@ -56,8 +57,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 ALGORITHM = "HS256"
@@ -65,13 +64,13 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify a password against its hash (on the bounded hashing executor)."""
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+    """Hash a password (on the bounded hashing executor)."""
+    return password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -98,71 +97,105 @@ def verify_token(token: str) -> dict:
         )
 
 
+@app.on_event("startup")
+def verify_schema() -> None:
+    """Refuse to start against a database the migrations have not reached."""
+    version = check_schema()
+    log_info("Schema verified", version=version)
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
     return {"status": "ok", "service": SERVICE_NAME}
 
 
+def _find_login_user(email: str) -> Optional[tuple]:
+    """The active user with this email, on a connection released before the password check."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, name, email, role, department, plant_id, is_active, hashed_password
+                FROM users 
+                WHERE email = %s AND is_active = true
+                """,
+                (email,),
+            )
+            row = cur.fetchone()
+        conn.rollback()
+    return row
+
+
+def _store_rehash(user_id: str, new_hash: str, verified_hash: str) -> None:
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # Only replace the hash we verified, never a concurrent change
+            cur.execute(
+                """
+                UPDATE users SET hashed_password = %s
+                WHERE id = %s AND hashed_password = %s
+                """,
+                (new_hash, user_id, verified_hash),
+            )
+        conn.commit()
+
+
 @app.post("/api/auth/login", response_model=LoginResponse)
 @limiter.limit("5/minute")
-def login(request, login_data: LoginRequest) -> LoginResponse:
+async def login(request, login_data: LoginRequest) -> LoginResponse:
     """Authenticate user and return JWT token."""
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, name, email, role, department, plant_id, is_active, hashed_password
-                    FROM users 
-                    WHERE email = %s AND is_active = true
-                    """,
-                    (login_data.email.lower(),),
-                )
-                row = cur.fetchone()
-
-                if row is None:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid email or password",
-                    )
-
-                user_id, name, email, role, department, plant_id, is_active, hashed_password = row
-
-                # Verify password
-                if hashed_password:
-                    if not verify_password(login_data.password, hashed_password):
-                        raise HTTPException(
-                            status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Invalid email or password",
-                        )
-                elif login_data.password != "demo123":  # Demo mode fallback
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid email or password",
-                    )
-
-                # Create access token
-                access_token = create_access_token(data={"sub": user_id, "email": email})
-
-                user_response = UserResponse(
-                    id=user_id,
-                    name=name,
-                    email=email,
-                    role=role,
-                    department=department,
-                    plant_id=plant_id,
-                    is_active=is_active,
-                    created_at=datetime.utcnow(),
+        row = await run_in_threadpool(_find_login_user, login_data.email.lower())
+
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid email or password",
+            )
+
+        user_id, name, email, role, department, plant_id, is_active, hashed_password = row
+
+        # Verify password off the request path; rehash if the stored cost is outdated
+        if hashed_password:
+            valid, new_hash = await password_hasher.verify_and_update_async(
+                login_data.password, hashed_password
+            )
+            if not valid:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid email or password",
                 )
+            if new_hash:
+                await run_in_threadpool(_store_rehash, user_id, new_hash, hashed_password)
+                log_info("Password rehashed", user_id=str(user_id))
+        elif login_data.password != "demo123":  # Demo mode fallback
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid email or password",
+            )
+
+        # Create access token
+        access_token = create_access_token(data={"sub": user_id, "email": email})
+
+        user_response = UserResponse(
+            id=user_id,
+            name=name,
+            email=email,
+            role=role,
+            department=department,
+            plant_id=plant_id,
+            is_active=is_active,
+            created_at=datetime.utcnow(),
+        )
 
-                log_info("User logged in", {"user_id": user_id, "email": email})
+        log_info("User logged in", {"user_id": user_id, "email": email})
 
-                return LoginResponse(
-                    access_token=access_token,
-                    token_type="bearer",
-                    user=user_response,
-                )
+        return LoginResponse(
+            access_token=access_token,
+            token_type="bearer",
+            user=user_response,
+        )
     except HTTPException:
         raise
     except Exception as e:
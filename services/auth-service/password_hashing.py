@@ -0,0 +1,147 @@
+"""
+Bounded password hashing.
+
+bcrypt is deliberately slow. Running it inline in the request threadpool
+lets a burst of logins (shift change) occupy every worker thread and starve
+unrelated endpoints. Hashing therefore runs on a small dedicated executor
+with a bounded backlog; when the backlog is full, requests are rejected
+immediately with 503 instead of queueing behind everyone else.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+try:
+    from monitoring import (
+        password_hash_duration_seconds,
+        password_hash_pending,
+        password_hash_rejections_total,
+        password_hash_wait_seconds,
+    )
+except ImportError:
+    # Fallback if monitoring not available
+    password_hash_duration_seconds = None
+    password_hash_pending = None
+    password_hash_rejections_total = None
+    password_hash_wait_seconds = None
+
+# bcrypt cost; existing hashes at another cost are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so threads run hashes in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash requests allowed to wait for a worker before new ones are rejected
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+
+class PasswordHasher:
+    """Runs passlib operations on a bounded, dedicated thread pool."""
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int):
+        """
+        Args:
+            context: passlib context holding the configured scheme and cost
+            workers: Hashing threads
+            max_queue: Requests allowed to wait for a free thread
+        """
+        self.context = context
+        self.workers = max(1, workers)
+        self.max_pending = self.workers + max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="password-hash",
+                    )
+        return self._executor
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if password_hash_pending:
+                password_hash_pending.set(self._pending)
+
+    def _submit(self, operation: str, func: Callable[..., Any], *args: Any) -> Future:
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                if password_hash_rejections_total:
+                    password_hash_rejections_total.labels(operation=operation).inc()
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication is busy. Please retry shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            if password_hash_pending:
+                password_hash_pending.set(self._pending)
+
+        queued_at = time.perf_counter()
+
+        def run() -> Any:
+            started = time.perf_counter()
+            if password_hash_wait_seconds:
+                password_hash_wait_seconds.labels(operation=operation).observe(started - queued_at)
+            try:
+                return func(*args)
+            finally:
+                if password_hash_duration_seconds:
+                    password_hash_duration_seconds.labels(operation=operation).observe(
+                        time.perf_counter() - started
+                    )
+
+        try:
+            future = executor.submit(run)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def hash(self, password: str) -> str:
+        """Hash a password at the configured cost."""
+        return self._submit("hash", self.context.hash, password).result()
+
+    async def hash_async(self, password: str) -> str:
+        """Hash a password without blocking the event loop."""
+        return await asyncio.wrap_future(self._submit("hash", self.context.hash, password))
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash."""
+        return self._submit("verify", self.context.verify, password, hashed_password).result()
+
+    async def verify_and_update_async(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and, if the hash uses another cost, rehash it.
+
+        Returns:
+            (valid, new_hash) where new_hash is None unless the stored hash
+            should be replaced
+        """
+        return await asyncio.wrap_future(
+            self._submit("verify", self.context.verify_and_update, password, hashed_password)
+        )
+
+    def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Blocking variant of verify_and_update_async for sync handlers."""
+        return self._submit(
+            "verify", self.context.verify_and_update, password, hashed_password
+        ).result()
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
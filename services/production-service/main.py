@@ -9,7 +9,7 @@ from pathlib import Path
 from typing import Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -18,9 +18,10 @@ import psycopg
 
 from schemas import BatchResponse, BatchCreate, BatchUpdate
 from monitoring import log_info, log_error, setup_monitoring
-from database import get_db_connection
+from database import check_schema, get_db_connection
 from service_client import verify_token
 from event_bus import publish_event
+from pagination import DEFAULT_PAGE_SIZE, Keyset, clamp_page_size, paginate, set_next_cursor
 
 # Load environment
 ROOT_DIR = Path(__file__).resolve().parents[2]
@@ -31,6 +32,8 @@ AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001")
 SERVICE_NAME = "production-service"
 SERVICE_PORT = int(os.getenv("PRODUCTION_SERVICE_PORT", "8003"))
 
+BATCH_KEYSET = Keyset("batches", (("created_at", "timestamptz"), ("id", "text")))
+
 app = FastAPI(
     title="Production Service",
     version="1.0.0",
@@ -68,6 +71,13 @@ def get_current_user_id(authorization: Optional[str] = None) -> str:
     return user_info.get("user_id")
 
 
+@app.on_event("startup")
+def verify_schema() -> None:
+    """Refuse to start against a database the migrations have not reached."""
+    version = check_schema()
+    log_info("Schema verified", version=version)
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
@@ -76,32 +86,48 @@ def health_check():
 
 @app.get("/api/batches")
 @limiter.limit("100/minute")
-def get_batches(request, plant_id: Optional[str] = None, authorization: Optional[str] = None):
-    """Get production batches."""
-    get_current_user_id(authorization)
-    
+def get_batches(
+    request,
+    response: Response,
+    plant_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    authorization: Optional[str] = None,
+):
+    """Get production batches, newest first, one keyset page at a time."""
+    session = get_current_user_id(authorization)
+
+    page_size = clamp_page_size(limit)
+    after = BATCH_KEYSET.decode(cursor)
+    conditions = []
+    params = []
+    if plant_id:
+        conditions.append("plant_id = %s")
+        params.append(plant_id)
+    if after:
+        keyset_sql, keyset_params = BATCH_KEYSET.after(after)
+        conditions.append(keyset_sql)
+        params.extend(keyset_params)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(page_size + 1)
+
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(read_only=True, session=session) as conn:
             with conn.cursor() as cur:
-                if plant_id:
-                    cur.execute(
-                        """
-                        SELECT id, batch_number, product_name, status, plant_id, created_at
-                        FROM production_batches
-                        WHERE plant_id = %s
-                        ORDER BY created_at DESC
-                        """,
-                        (plant_id,)
-                    )
-                else:
-                    cur.execute(
-                        """
-                        SELECT id, batch_number, product_name, status, plant_id, created_at
-                        FROM production_batches
-                        ORDER BY created_at DESC
-                        """
-                    )
-                rows = cur.fetchall()
+                cur.execute(
+                    f"""
+                    SELECT id, batch_number, product_name, status, plant_id, created_at
+                    FROM production_batches
+                    {where_clause}
+                    ORDER BY {BATCH_KEYSET.order_by()}
+                    LIMIT %s
+                    """,
+                    params,
+                )
+                rows, next_cursor = paginate(
+                    cur.fetchall(), page_size, BATCH_KEYSET, lambda row: (row[5], row[0])
+                )
+                set_next_cursor(response, next_cursor)
                 return [
                     {
                         "id": row[0],
@@ -128,7 +154,7 @@ def create_batch(request, batch_data: BatchCreate, authorization: Optional[str]
     user_id = get_current_user_id(authorization)
     
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(session=user_id) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
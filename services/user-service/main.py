@@ -18,7 +18,7 @@ import psycopg
 
 from schemas import UserResponse, UserCreate, UserUpdate, MessageResponse
 from monitoring import log_info, log_error, setup_monitoring
-from database import get_db_connection
+from database import check_schema, get_db_connection
 from service_client import verify_token
 
 # Load environment
@@ -67,6 +67,13 @@ def get_current_user_id(authorization: Optional[str] = None) -> str:
     return user_info.get("user_id")
 
 
+@app.on_event("startup")
+def verify_schema() -> None:
+    """Refuse to start against a database the migrations have not reached."""
+    version = check_schema()
+    log_info("Schema verified", version=version)
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
@@ -78,10 +85,10 @@ def health_check():
 def get_users(request, authorization: Optional[str] = None):
     """Get all users."""
     # Verify authentication
-    get_current_user_id(authorization)
+    session = get_current_user_id(authorization)
     
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(read_only=True, session=session) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -117,10 +124,10 @@ def get_users(request, authorization: Optional[str] = None):
 @limiter.limit("100/minute")
 def get_user(request, user_id: str, authorization: Optional[str] = None):
     """Get user by ID."""
-    get_current_user_id(authorization)
+    session = get_current_user_id(authorization)
     
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(read_only=True, session=session) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -3,7 +3,8 @@
 Helper script that boots both FastAPI backend and Vite frontend.
 
 Usage:
-  python start.py            # runs both backend and frontend servers
+  python start.py               # runs both backend and frontend servers
+  python start.py --production  # backend through serve.py (multi-worker, no reload)
 """
 
 from __future__ import annotations
@@ -48,6 +49,8 @@ def load_env() -> None:
 
 
 def main() -> int:
+    production = "--production" in sys.argv[1:]
+
     if not BACKEND_DIR.exists():
         print("Backend folder not found. Expected path:", BACKEND_DIR, file=sys.stderr)
         return 1
@@ -79,17 +82,20 @@ def main() -> int:
     signal.signal(signal.SIGTERM, signal_handler)
 
     # Start backend
-    backend_cmd = [
-        python_exec,
-        "-m",
-        "uvicorn",
-        "main:app",
-        "--reload",
-        "--host",
-        backend_host,
-        "--port",
-        backend_port,
-    ]
+    if production:
+        backend_cmd = [python_exec, "serve.py", "--host", backend_host, "--port", backend_port]
+    else:
+        backend_cmd = [
+            python_exec,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--reload",
+            "--host",
+            backend_host,
+            "--port",
+            backend_port,
+        ]
 
     # Start frontend
     frontend_cmd = ["npm", "run", "dev"]